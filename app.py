@@ -2,279 +2,34 @@
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from ratios import FinancialInputs, compute_ratios
+import numpy as np
+from ratios import REGISTRY, fmt_number
+from scenarios import FieldDist, WhatIf, monte_carlo, sensitivity_grid, tornado
+from data_loader import load_cube, load_panel, load_peers
+from panel import COMPANY_COLUMN, YEAR_COLUMN
+from charts import trend_figure
+from formatting import format_numbers
+from export import cube_chunks, export_formats, write_report
+from render import (CARD_CSS, RESULT_GROUPS, card_detail_html, card_title, cards_grid_html, icons,
+                    improvements, simplified_views)
+from reports import cached_report, report_filename
+import streamlit.components.v1 as components
+from timing import span
+import timing
+import functools
+import json
 import os
+import tempfile
+import uuid
 import pandas as pd
 
-
-simplified_views = {
-    "Current Ratio": {
-        "ar": "👥 تبسيط: هذه النسبة توضح إذا كانت الشركة تملك ما يكفي من الأصول المتداولة (النقدية + المدينون + المخزون) لسداد التزاماتها القصيرة (الدائنون + القروض قصيرة الأجل). كلما ارتفعت كان الوضع أفضل.",
-        "en": "👥 Simple view: Measures if current assets (cash + receivables + inventory) are enough to cover short-term liabilities (payables + short-term loans). The higher, the safer."
-    },
-    "Quick Ratio": {
-        "ar": "👥 تبسيط: مثل نسبة التداول لكن تستبعد المخزون (لأنه قد يستغرق وقتًا للتحويل لنقد). تقيس قدرة الشركة على الوفاء بالتزاماتها باستخدام النقدية والذمم المدينة فقط.",
-        "en": "👥 Simple view: Like Current Ratio but excludes inventory (as it may take time to convert). Focuses on cash and receivables to cover short-term obligations."
-    },
-    "Cash Ratio": {
-        "ar": "👥 تبسيط: أدق مقياس للسيولة، يقارن النقد والنقد المعادل (Cash & Cash Equivalents) فقط مع الخصوم المتداولة. إذا كان منخفض جدًا فهذا يشير إلى مخاطر في السداد الفوري.",
-        "en": "👥 Simple view: Strict liquidity test, compares only cash and cash equivalents with current liabilities. Very low ratio may indicate immediate liquidity risk."
-    },
-    "Debt Ratio": {
-        "ar": "👥 تبسيط: يقيس نسبة الأصول الممولة بالديون (القروض قصيرة وطويلة الأجل) مقارنة بإجمالي الأصول. إذا زادت عن 60% فهذا قد يشكل عبء مالي على الشركة.",
-        "en": "👥 Simple view: Shows how much of assets are financed by debt (short & long-term loans). Above 60% can be financially risky."
-    },
-    "Debt to Equity Ratio (D/E)": {
-        "ar": "👥 تبسيط: يقيس اعتماد الشركة على الديون (Loans) مقارنة بحقوق الملاك (Equity). ارتفاعه يعني مخاطر أكبر على الاستقرار المالي.",
-        "en": "👥 Simple view: Measures reliance on debt vs equity. Higher ratio means higher financial risk."
-    },
-    "Interest Coverage": {
-        "ar": "👥 تبسيط: يوضح إذا كانت أرباح التشغيل (Operating Profit) تكفي لتغطية مصروفات الفوائد (Interest Expense). إذا كان أقل من 1 فالشركة في خطر كبير.",
-        "en": "👥 Simple view: Tells if operating profits are enough to cover interest expenses. Below 1 means financial distress."
-    },
-    "Gross Profit Margin": {
-        "ar": "👥 تبسيط: يقيس الربح الإجمالي (الإيرادات - تكلفة المبيعات) مقارنة بالمبيعات. ارتفاعه يعني كفاءة في التسعير أو الإنتاج.",
-        "en": "👥 Simple view: Gross profit (revenue - cost of goods sold) compared to sales. Higher margin = better pricing or efficiency."
-    },
-    "Operating Margin": {
-        "ar": "👥 تبسيط: يقيس نسبة الربح بعد خصم المصاريف التشغيلية (الإيجارات + الرواتب + المصاريف الإدارية). يعطي فكرة عن كفاءة الإدارة.",
-        "en": "👥 Simple view: Profit after operating expenses (rent + salaries + admin expenses). Reflects management efficiency."
-    },
-    "Net Profit Margin": {
-        "ar": "👥 تبسيط: النسبة النهائية للربح بعد جميع المصاريف (التشغيلية + التمويلية + الضريبة). توضح كم يبقى من كل 1 ريال مبيعات كربح صافٍ.",
-        "en": "👥 Simple view: Final profit after all expenses (operating + financing + taxes). Shows how much remains from each $1 of sales."
-    },
-    "Return on Assets (ROA)": {
-        "ar": "👥 تبسيط: هل الأصول (المباني + المعدات + النقدية) تحقق عائد جيد؟ كلما ارتفعت النسبة زادت كفاءة استغلال الأصول.",
-        "en": "👥 Simple view: Are assets (buildings + equipment + cash) generating good return? Higher means more efficient use of assets."
-    },
-    "Return on Equity (ROE)": {
-        "ar": "👥 تبسيط: يقيس العائد الذي يحصل عليه الملاك (Equity Holders) على استثماراتهم. ارتفاعه مؤشر إيجابي للمستثمرين.",
-        "en": "👥 Simple view: Measures return shareholders get on their equity investment. Higher is better for investors."
-    },
-    "Cash Conversion Ratio": {
-        "ar": "👥 تبسيط: يقارن بين الأرباح المحاسبية (Net Income) والتدفق النقدي من التشغيل (Operating Cash Flow). إذا كان منخفض فقد يعني أن الأرباح ليست نقدية فعلًا.",
-        "en": "👥 Simple view: Compares net income vs operating cash flow. Low ratio may mean profits are not turning into actual cash."
-    },
-    "Basic Earnings Power Ratio": {
-        "ar": "👥 تبسيط: يقيس قدرة الأصول (المباني + المعدات) على توليد أرباح تشغيلية قبل الفوائد والضرائب. يعطي صورة عن قوة النشاط الأساسي.",
-        "en": "👥 Simple view: Measures assets’ ability (buildings + equipment) to generate operating profit before interest and tax."
-    },
-    "Inventory Turnover Ratio": {
-        "ar": "👥 تبسيط: يوضح كم مرة يتم بيع وتجديد المخزون خلال السنة. كلما ارتفع يعني أن البضاعة تتحرك بسرعة.",
-        "en": "👥 Simple view: Shows how many times inventory is sold and replaced in a year. Higher = faster sales cycle."
-    },
-    "Accounts Receivable Turnover": {
-        "ar": "👥 تبسيط: يقيس سرعة تحصيل المدينين (العملاء). ارتفاعه يعني أن الشركة تجمع أموالها بسرعة.",
-        "en": "👥 Simple view: Measures how fast receivables (customers) are collected. Higher = faster collection."
-    },
-    "Fixed Assets Turnover Ratio": {
-        "ar": "👥 تبسيط: يقيس كفاءة الأصول الثابتة (المصانع + المعدات) في توليد المبيعات.",
-        "en": "👥 Simple view: Efficiency of fixed assets (plants + equipment) in generating sales."
-    },
-    "Earnings per Share (EPS) Ratio": {
-        "ar": "👥 تبسيط: نصيب كل سهم من صافي الربح. يساعد المستثمرين في تقييم العائد من امتلاك سهم واحد.",
-        "en": "👥 Simple view: Portion of net income allocated to each share. Useful for investors to assess return per share."
-    },
-    "Payout Ratio": {
-        "ar": "👥 تبسيط: يوضح نسبة الأرباح الموزعة نقدًا على المساهمين من صافي الربح. كلما ارتفعت زاد رضا المساهمين، لكن يقل التمويل المتاح للنمو.",
-        "en": "👥 Simple view: Shows portion of net income paid as dividends. Higher = happier shareholders but less reinvestment."
-    }
-}
+timings = timing.begin("app")  # ⏱️ زمن كل مرحلة في هذا التشغيل
 
 
 
-# 📌 تحسينات مقترحة لكل نسبة
-improvements = {
-    "Current Ratio": {
-        "ar": "زيادة الأصول المتداولة (النقدية + المدينون + المخزون) أو خفض الخصوم قصيرة الأجل (الدائنون + القروض قصيرة الأجل).",
-        "en": "Increase current assets (cash + receivables + inventory) or reduce short-term liabilities (payables + short-term loans)."
-    },
-    "Quick Ratio": {
-        "ar": "زيادة النقدية أو الذمم المدينة لتغطية الخصوم الفورية، مع تقليل الاعتماد على المخزون.",
-        "en": "Improve cash or receivables to cover immediate liabilities, reduce reliance on inventory."
-    },
-    "Cash Ratio": {
-        "ar": "الحفاظ على احتياطي نقدي كافٍ (Cash Reserves) لتغطية الالتزامات السريعة.",
-        "en": "Maintain sufficient cash reserves to meet urgent obligations."
-    },
-    "Debt Ratio": {
-        "ar": "تقليل الاعتماد على الديون (Loans) وزيادة التمويل الذاتي (Equity Financing).",
-        "en": "Reduce reliance on debt (loans) and increase equity financing."
-    },
-    "Debt to Equity Ratio (D/E)": {
-        "ar": "خفض الديون أو زيادة حقوق الملكية لتحقيق توازن أفضل بين الالتزامات والملاك.",
-        "en": "Lower debt or raise equity for a healthier balance."
-    },
-    "Interest Coverage": {
-        "ar": "زيادة الأرباح التشغيلية (Operating Profit) أو خفض مصروف الفوائد (Interest Expense).",
-        "en": "Boost operating profits or reduce interest expenses."
-    },
-    "Gross Profit Margin": {
-        "ar": "تحسين المبيعات (Revenue) أو خفض تكلفة المبيعات (COGS).",
-        "en": "Enhance sales (revenue) or reduce cost of goods sold (COGS)."
-    },
-    "Operating Margin": {
-        "ar": "تقليل المصاريف التشغيلية (الإيجارات + الرواتب + الإدارية) أو زيادة كفاءة التشغيل.",
-        "en": "Reduce operating expenses (rent + salaries + admin) or improve operational efficiency."
-    },
-    "Net Profit Margin": {
-        "ar": "زيادة الإيرادات أو التحكم في جميع المصروفات (التشغيلية + التمويلية + الضرائب).",
-        "en": "Increase revenues or control all expenses (operating + financing + taxes)."
-    },
-    "Return on Assets (ROA)": {
-        "ar": "زيادة الأرباح أو تحسين استغلال الأصول (المباني + المعدات + النقدية).",
-        "en": "Increase profits or utilize assets (buildings + equipment + cash) more effectively."
-    },
-    "Return on Equity (ROE)": {
-        "ar": "زيادة العائد للملاك عن طريق تحسين الربحية ورفع كفاءة إدارة الموارد.",
-        "en": "Increase shareholder return by improving profitability and resource efficiency."
-    },
-    "Cash Conversion Ratio": {
-        "ar": "تحسين التدفقات النقدية عبر تحصيل أسرع (Receivables Collection) وإدارة نفقات أفضل.",
-        "en": "Improve cash flow through faster receivables collection and better expense management."
-    },
-        "Basic Earnings Power Ratio": {
-        "ar": "زيادة كفاءة استخدام الأصول الثابتة (المصانع + المعدات) لرفع الأرباح التشغيلية.",
-        "en": "Improve utilization of fixed assets (plants + equipment) to increase operating profit."
-    },
-    "Inventory Turnover Ratio": {
-        "ar": "تحسين إدارة المخزون وتقليل البضاعة الراكدة لزيادة سرعة الدوران.",
-        "en": "Enhance inventory management, reduce obsolete stock to increase turnover speed."
-    },
-    "Accounts Receivable Turnover": {
-        "ar": "تسريع تحصيل العملاء وتقليل فترات الائتمان لتحسين التدفقات النقدية.",
-        "en": "Speed up customer collections, shorten credit terms to improve cash flow."
-    },
-    "Fixed Assets Turnover Ratio": {
-        "ar": "زيادة المبيعات أو تحسين استغلال الأصول الثابتة لرفع كفاءة الدوران.",
-        "en": "Increase sales or use fixed assets more efficiently to boost turnover."
-    },
-    "Earnings per Share (EPS) Ratio": {
-        "ar": "زيادة صافي الربح أو إعادة شراء الأسهم لرفع نصيب السهم من الأرباح.",
-        "en": "Increase net income or repurchase shares to raise EPS."
-    },
-    "Payout Ratio": {
-        "ar": "تحقيق توازن بين توزيع أرباح مناسبة للمساهمين والاحتفاظ بأرباح كافية للنمو.",
-        "en": "Balance between distributing dividends and retaining earnings for growth."
-    }
-}
-
 # 🎨 تنسيقات CSS شاملة + Cairo Font
 st.markdown("""
-    <style>
-    /* الخطوط */
-    @import url('https://fonts.googleapis.com/css2?family=Cairo:wght@400;600;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Tajawal:wght@500&display=swap');
-
-    html, body, [class*="css"] {
-        font-family: 'Cairo', sans-serif !important;
-        background-color: #ffffff !important;  /* خلفية فاتحة دائمًا */
-    }
-
-    /* نصوص عربية */
-    .arabic {
-        direction: rtl !important;
-        text-align: right !important;
-        font-family: 'Cairo', 'Tajawal', sans-serif;
-        font-size: 16px;
-        color: #212529 !important;  /* أسود */
-    }
-
-    /* نصوص إنجليزية */
-    .english {
-        direction: ltr;
-        text-align: left;
-        font-family: 'Cairo', sans-serif;
-        font-size: 15px;
-        color: #212529 !important;  /* أسود */
-    }
-
-    /* 📌 صندوق الشرح */
-    .explanation-box {
-        background: #FFCDD2 !important;   /* أحمر فاتح */
-        color: #B71C1C !important;        /* أحمر غامق */
-        padding: 12px;
-        border-radius: 8px;
-        margin: 6px 0;
-        box-shadow: inset 0px 1px 3px rgba(0,0,0,0.1);
-    }
-
-    /* 📐 المعادلات */
-    .equation-ar, .equation-en {
-        background: #BBDEFB !important;   /* أزرق فاتح */
-        color: #0D47A1 !important;        /* أزرق داكن */
-        padding: 12px;
-        border-radius: 8px;
-        font-weight: 600;
-        margin: 6px 0;
-        direction: rtl !important;
-        text-align: right !important;
-    }
-
-    /* 🧾 التحليل */
-    .analysis-box {
-        background: #C8E6C9 !important;   /* أخضر فاتح */
-        color: #1B5E20 !important;        /* أخضر غامق */
-        padding: 12px;
-        border-radius: 8px;
-        margin: 6px 0;
-        font-weight: 600;
-    }
-
-    /* 👥 التبسيط */
-    .simplified-box {
-        background: #FFE0B2 !important;   /* برتقالي فاتح */
-        color: #E65100 !important;        /* برتقالي غامق */
-        padding: 12px;
-        border-radius: 8px;
-        margin: 6px 0;
-    }
-
-    /* 🚀 التحسين */
-    .improvement-box {
-        display: block;
-        width: 100% !important;
-        box-sizing: border-box;
-        padding: 20px;
-        margin: 15px 0;
-        border-radius: 10px;
-        
-        background: linear-gradient(90deg, #FFECB3, #FFE082) !important;  /* أصفر برتقالي جذاب */
-        border: 2px solid #F57C00 !important;
-        color: #212121 !important;   /* أسود */
-        font-weight: 700;
-        font-size: 16px;
-        text-align: center;
-        font-family: 'Cairo', 'Tajawal', sans-serif !important;
-    }
-
-    .improvement-box p { margin: 5px 0; }
- 
-    .improvement-ar {
-        direction: rtl !important;
-        text-align: right !important;
-        font-family: 'Cairo', 'Tajawal', sans-serif !important;
-    }
-    
-    .improvement-en {
-        direction: ltr !important;
-        text-align: left !important;
-        font-family: 'Cairo', sans-serif !important;
-    }
-
-    .glow-text {
-    font-size: 32px;
-    font-weight: bold;
-    color: #c43939;  /* بنفسجي */
-    text-align: center;
-    text-shadow: 
-        0 0 5px #004461,
-        0 0 10px #9B59B6,
-        0 0 20px #6b4c12,
-        0 0 30px #000000;
-    }
-
+    <style>""" + CARD_CSS + """
 /* نخلي الشريط الجانبي نفسه مرجع تموضع */
 [data-testid="stSidebar"]{ position: relative; }
 
@@ -322,7 +77,11 @@ st.sidebar.header("⚙️ الفلاتر")
 file_path = "financial_data.xlsx"  # 👈 اسم ملفك اللي بالمجلد الرئيسي
 
 if os.path.exists(file_path):
-    df = pd.read_excel(file_path)
+    with span("load_data"):
+        panel = load_panel(file_path)  # لا يُعاد التحليل إلا إذا تغير محتوى الملف
+        cube = load_cube(file_path)    # كل النسب لكل الفترات، مرة واحدة لكل نسخة من الملف
+        peers = load_peers(file_path)  # ترتيب كل شركة بين نظيراتها (يُحسب مع المكعب)
+    df = panel.frame
 else:
     st.error("⚠️ ملف البيانات financial_data.xlsx غير موجود، يرجى رفعه أو إضافته للمجلد.")
     st.stop()
@@ -333,239 +92,319 @@ with st.expander("📑 البيانات المالية", expanded=False):
     st.dataframe(df, use_container_width=True)
 
 
+# 🟢 فلتر الشركات (يظهر فقط إذا احتوى الملف على أكثر من شركة)
+multi_company = len(panel.companies) > 1
+if multi_company:
+    selected_companies = st.sidebar.multiselect("اختر الشركات", panel.companies, default=panel.companies[:1])
+else:
+    selected_companies = panel.companies
+
 # 🟢 فلتر السنوات
-years = df["year"].unique().tolist()
+years = panel.years(selected_companies)
 selected_years = st.sidebar.multiselect("اختر السنوات للتحليل", years, default=years)
+show_timings = st.sidebar.checkbox("⏱️ التشخيص | Diagnostics", key="diag")
+
+# ⬇️ تصدير كل النسب (القيمة، الفئة، التحليل بالعربية والإنجليزية) للشركات والسنوات المختارة.
+# الملف يُكتب على دفعات إلى ملف مؤقت ولا يُبنى إلا عند النقر: data قابلة للاستدعاء
+# (Streamlit الحديث) تُنفذ عند التحميل فقط، فإعادة تشغيل الصفحة لا تقرأ أي ملف
+try:
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    DEFERRED_DOWNLOAD = hasattr(MediaFileManager, "add_deferred")
+except ImportError:
+    DEFERRED_DOWNLOAD = False
+
+
+def export_bytes(cube, companies, years, fmt):
+    """محتوى ملف التصدير: يُكتب إلى ملف مؤقت ثم يُقرأ مرة واحدة ويُحذف."""
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        write_report(cube_chunks(cube, companies, years), path, fmt)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+with st.sidebar.expander("⬇️ تصدير | Export"):
+    export_format = st.selectbox("الصيغة | Format", export_formats(), key="export-format")
+    export_args = (tuple(selected_companies), tuple(selected_years), export_format)
+    st.caption(f"{len(panel.keys(selected_companies, selected_years)) * len(cube.ratios):,} صف | rows")
+    if DEFERRED_DOWNLOAD:
+        st.download_button("⬇️ تحميل | Download", functools.partial(export_bytes, cube, *export_args),
+                           file_name=f"ratios.{export_format}", key="export-download", on_click="ignore")
+    elif st.button("تجهيز الملف | Prepare file", key="export-prepare"):
+        # الإصدارات الأقدم: الملف يُبنى في هذا التشغيل فقط، وزر التحميل يظهر حتى أول تفاعل بعده
+        st.download_button("⬇️ تحميل | Download", export_bytes(cube, *export_args),
+                           file_name=f"ratios.{export_format}", key="export-download")
 
 st.sidebar.image("1.png", use_container_width=True)
 
 st.sidebar.image("footer_logo.png", use_container_width=True)
 
 
-# 🟢 أيقونات لكل مجموعة نسب
-icons = {
-    "نسب الأصول": "🏦",
-    "نسب الخصوم": "💳",
-    "نسب المبيعات": "🛒",
-    "نسب الربحية": "📈",
+# 🧮 أسماء حقول المدخلات (لتبويب ماذا لو)
+field_labels = {
+    "sales": "المبيعات | Sales",
+    "cogs": "تكلفة المبيعات | COGS",
+    "opex": "المصاريف التشغيلية | Operating Expenses",
+    "interest_expense": "مصروف الفوائد | Interest Expense",
+    "tax_expense": "الزكاة والضريبة | Zakat & Tax",
+    "current_assets": "الأصول المتداولة | Current Assets",
+    "inventory": "المخزون | Inventory",
+    "cash": "النقدية | Cash",
+    "accounts_receivable": "الذمم المدينة | Receivables",
+    "current_liabilities": "الخصوم المتداولة | Current Liabilities",
+    "total_assets": "إجمالي الأصول | Total Assets",
+    "total_liabilities": "إجمالي الخصوم | Total Liabilities",
+    "equity": "حقوق الملكية | Equity",
 }
-tab1, tab2 = st.tabs(["🔎 نتائج التحليل", "📊 مقارنة السنوات"])
 
-with tab1:
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🔎 نتائج التحليل", "📊 مقارنة السنوات", "🧪 ماذا لو", "📉 اختبار الحساسية",
+                                        "🎲 محاكاة مونت كارلو"])
+
+# 🧩 تحريك عناصر جزء (fragment) يعيد تشغيله وحده بدل الصفحة كلها
+# (st.fragment منذ 1.37، وexperimental_fragment قبلها؛ الأقدم يعيد الصفحة كالمعتاد)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+
+# 📈 الأشكال مخزنة بمدخلاتها (st.cache_data): إعادة التشغيل بنفس البيانات لا تعيد بناءها
+@st.cache_data(max_entries=256, show_spinner=False)
+def period_figure(chart_df, title, dark):
+    fig = px.bar(
+        chart_df,
+        x="Ratio (EN)",
+        y="Value",
+        color="Ratio (EN)",
+        title=title,
+        text="Value",
+    )
+    fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+    fig.update_layout(
+        xaxis=dict(title="Ratio"),
+        yaxis=dict(title="Value"),
+        plot_bgcolor="#1C2833" if dark else "#f8f9f9",
+        paper_bgcolor="#17202A" if dark else "#ffffff",
+        font=dict(family="Cairo, sans-serif", size=14, color="#FDFEFE" if dark else "#2C3E50"),
+    )
+    return fig
+
+
+def period_chart(results, company, year):
+    """📈 رسم بياني باستخدام plotly لنسب فترة واحدة."""
+    with span("plotly"):
+        chart_df = pd.DataFrame([{
+            "Year": year,
+            "Ratio (AR)": r.name,
+            "Ratio (EN)": r.name_en,
+            "Value": r.value
+        } for r in results if r.value is not None])
+
+        if not chart_df.empty:
+            fig = period_figure(chart_df, f"📊 نسب السنة {year}" + (f" — {company}" if multi_company else ""),
+                                st.get_option("theme.base") == "dark")
+            st.plotly_chart(fig, use_container_width=True, key=f"bar-{company}-{year}")
+
+
+with tab1, span("results_tab"):
         
     if selected_years:
         st.subheader("🔎 نتائج التحليل")
+        periods = panel.keys(selected_companies, selected_years)
+        layout = st.radio(
+            "طريقة العرض | Layout", ["compact", "full"], horizontal=True, key="cards-layout",
+            format_func={"compact": "📄 فترة ومجموعة في كل مرة | One page at a time",
+                         "full": "📚 كل الفترات | Everything"}.get,
+        )
 
-        for year in selected_years:
-            st.markdown(f"## 📅 السنة: {year}")
-            row = df[df["year"] == year].iloc[0]
-
-            # تجهيز المدخلات
-            fi = FinancialInputs(
-                sales=row["Revenue"],
-                cogs=row["Cost of goods sold"],
-                opex=row.get("Total Operating expenses", 0),
-                interest_expense=row.get("Financial charges", 0),
-                tax_expense=row.get("Zakat", 0),
-                net_income=row["Profit/(Loss) for the period"],
-                current_assets=row["Current assets"],
-                inventory=row["Inventory"],
-                cash=row["Cash and Bank balances"],
-                accounts_receivable=row["Trade Receivable"],
-                accounts_payable=row["Current liabilities"],  
-                current_liabilities=row["Current liabilities"],
-                total_assets=row["Total assets"],
-                total_liabilities=row["Total liabilities"],
-                equity=row["Owners' equity"],
-                cfo=row.get("Cash flow", 0),
+        if layout == "compact":
+            # 📄 بطاقات مختصرة للفترة والمجموعة المختارتين فقط (كتلة HTML واحدة)،
+            # والتفاصيل تُرسل للبطاقة المفتوحة فقط
+            c1, c2 = st.columns([1, 3])
+            company, year = c1.selectbox(
+                "الفترة | Period", periods, key="cards-period",
+                format_func=lambda k: f"{k[1]} — {k[0]}" if multi_company else str(k[1]),
             )
-
-            results = compute_ratios(fi)
-
-            # 📊 عرض النتائج
-            for group in ["نسب الأصول", "نسب الخصوم", "نسب المبيعات", "نسب الربحية"]:
-                st.markdown(f"### {icons.get(group, '')} {group}")
-                group_items = [r for r in results if r["group"] == group]
-
-                for r in group_items:
-                    value_display = r["value"] if r["value"] is not None else "—"
-
-                    # 🟢 expander مع العنوان في المنتصف بخط Cairo
-                    with st.expander(
-                        f"{r['name']} | {r['name_en']} — {value_display}",  # 👈 بدون span هنا
-                        expanded=False
-                    ):
-
-                        # ✅ العنوان المنسق يظهر دائمًا (مطوي أو مفتوح)
-                        st.markdown(
-                            f"""
-                            <div class="glow-text">
-                                {r['name']} | {r['name_en']} — {value_display}
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-
-                        col1, col2 = st.columns(2)
-
-                        # 🟦 العمود الأيمن (AR)
-                        with col2:
-                            st.markdown(
-                                f"<div class='explanation-box arabic'><b>📌 الشرح:</b> {r['explain']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            st.markdown(
-                                f"<div class='equation-ar'>📐 {r['equation']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            st.markdown(
-                                f"<div class='analysis-box arabic'><b>🧾 التحليل:</b> {r['analysis']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            if r["name_en"] in simplified_views:
+            group = c2.radio("المجموعة | Group", RESULT_GROUPS, horizontal=True, key="cards-group",
+                             format_func=lambda g: f"{icons.get(g, '')} {g}")
+            st.markdown(f"## 📅 السنة: {year}" + (f" — 🏢 {company}" if multi_company else ""))
+
+            results = cube.results(company, year)
+            group_items = {r.name_en: r for r in results if r.group == group}
+
+            with span("render_cards"):
+                st.markdown(cards_grid_html(group_items.values()), unsafe_allow_html=True)
+                opened = st.selectbox(
+                    "🔍 التفاصيل | Details", [None, *group_items], key=f"cards-open-{group}",
+                    format_func=lambda k: "—" if k is None else card_title(group_items[k]),
+                )
+                if opened is not None:
+                    st.markdown(card_detail_html(group_items[opened], peers.context(company, year, opened)),
+                                unsafe_allow_html=True)
+
+            # 📄 التقرير الكامل للفترة: يُبنى مرة ويُقرأ بعدها من المخزن (reports.py)
+            if st.checkbox("📄 التقرير الكامل | Full report", key="report-show"):
+                with span("report"):
+                    report = cached_report(cube, company, year)
+                st.download_button("⬇️ تنزيل التقرير | Download report", report.encode("utf-8"),
+                                   file_name=report_filename(company, year), mime="text/html",
+                                   key="report-download")
+                components.html(report, height=900, scrolling=True)
+
+            period_chart(results, company, year)
+
+        else:
+            for company, year in periods:
+                st.markdown(f"## 📅 السنة: {year}" + (f" — 🏢 {company}" if multi_company else ""))
+
+                results = cube.results(company, year)  # محسوبة مسبقًا في المكعب
+
+                # 📊 عرض النتائج
+                with span("render_cards"):
+                    for group in RESULT_GROUPS:
+                        st.markdown(f"### {icons.get(group, '')} {group}")
+                        group_items = [r for r in results if r.group == group]
+
+                        for r in group_items:
+                            value_display = r.display
+
+                            # 🟢 expander مع العنوان في المنتصف بخط Cairo
+                            with st.expander(
+                                f"{r.name} | {r.name_en} — {value_display}",  # 👈 بدون span هنا
+                                expanded=False
+                            ):
+
+                                # ✅ العنوان المنسق يظهر دائمًا (مطوي أو مفتوح)
                                 st.markdown(
-                                    f"<div class='simplified-box arabic'>{simplified_views[r['name_en']]['ar']}</div>",
+                                    f"""
+                                    <div class="glow-text">
+                                        {r.name} | {r.name_en} — {value_display}
+                                    </div>
+                                    """,
                                     unsafe_allow_html=True
                                 )
+
+                                col1, col2 = st.columns(2)
+
+                                # 🟦 العمود الأيمن (AR)
+                                with col2:
+                                    st.markdown(
+                                        f"<div class='explanation-box arabic'><b>📌 الشرح:</b> {r.explain}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    st.markdown(
+                                        f"<div class='equation-ar'>📐 {r.equation}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    st.markdown(
+                                        f"<div class='analysis-box arabic'><b>🧾 التحليل:</b> {r.analysis}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    if r.name_en in simplified_views:
+                                        st.markdown(
+                                            f"<div class='simplified-box arabic'>{simplified_views[r.name_en]['ar']}</div>",
+                                            unsafe_allow_html=True
+                                        )
                         
-                        # 🟨 العمود الأيسر (EN)
-                        with col1:
-                            st.markdown(
-                                f"<div class='explanation-box english'><b>📌 Explanation:</b> {r['explain_en']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            st.markdown(
-                                f"<div class='equation-en'>📐 {r['equation_en']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            st.markdown(
-                                f"<div class='analysis-box english'><b>🧾 Analysis:</b> {r['analysis_en']}</div>",
-                                unsafe_allow_html=True
-                            )
-                            if r["name_en"] in simplified_views:
-                                st.markdown(
-                                    f"<div class='simplified-box english'>{simplified_views[r['name_en']]['en']}</div>",
-                                    unsafe_allow_html=True
-                                )
+                                # 🟨 العمود الأيسر (EN)
+                                with col1:
+                                    st.markdown(
+                                        f"<div class='explanation-box english'><b>📌 Explanation:</b> {r.explain_en}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    st.markdown(
+                                        f"<div class='equation-en'>📐 {r.equation_en}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    st.markdown(
+                                        f"<div class='analysis-box english'><b>🧾 Analysis:</b> {r.analysis_en}</div>",
+                                        unsafe_allow_html=True
+                                    )
+                                    if r.name_en in simplified_views:
+                                        st.markdown(
+                                            f"<div class='simplified-box english'>{simplified_views[r.name_en]['en']}</div>",
+                                            unsafe_allow_html=True
+                                        )
+
+
+
+                                # ✅ صندوق التحسينات
+                                if r.name_en in improvements:
+                                    st.markdown(
+                                        f"""
+                                        <div class="improvement-box">
+                                            <p class="improvement-ar">📌 <b>لتحسين النسبة  :</b> {improvements[r.name_en]['ar']}</p>
+                                            <p class="improvement-en">📌 <b>Improvement :</b> {improvements[r.name_en]['en']}</p>
+                                        </div>
+                                        """,
+                                        unsafe_allow_html=True
+                                    )
+
+                period_chart(results, company, year)
 
 
 
-                        # ✅ صندوق التحسينات
-                        if r["name_en"] in improvements:
-                            st.markdown(
-                                f"""
-                                <div class="improvement-box">
-                                    <p class="improvement-ar">📌 <b>لتحسين النسبة  :</b> {improvements[r['name_en']]['ar']}</p>
-                                    <p class="improvement-en">📌 <b>Improvement :</b> {improvements[r['name_en']]['en']}</p>
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-
-
-            # 📈 رسم بياني باستخدام plotly
-            chart_df = pd.DataFrame([{
-                "Year": year,
-                "Ratio (AR)": r["name"],
-                "Ratio (EN)": r["name_en"],
-                "Value": r["value"]
-            } for r in results if r["value"] is not None])
-
-            if not chart_df.empty:
-                fig = px.bar(
-                    chart_df,
-                    x="Ratio (EN)",
-                    y="Value",
-                    color="Ratio (EN)",
-                    title=f"📊 نسب السنة {year}",
-                    text="Value",
-                )
-                fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-                fig.update_layout(
-                    xaxis=dict(title="Ratio"),
-                    yaxis=dict(title="Value"),
-                    plot_bgcolor="#1C2833" if st.get_option("theme.base") == "dark" else "#f8f9f9",
-                    paper_bgcolor="#17202A" if st.get_option("theme.base") == "dark" else "#ffffff",
-                    font=dict(family="Cairo, sans-serif", size=14, color="#FDFEFE" if st.get_option("theme.base") == "dark" else "#2C3E50"),
-                )
-                st.plotly_chart(fig, use_container_width=True)
+##################################################################################################
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_trend_figure(trend, color):
+    return trend_figure(trend, color=color)
 
 
+@st.cache_data(max_entries=512, show_spinner=False)
+def ratio_line_figure(ratio_df, ratio):
+    fig = px.line(
+        ratio_df,
+        x="Year",
+        y="Value",
+        markers=True,
+        title=f"{ratio} Trend"
+    )
+    fig.update_traces(text=ratio_df["Value"].round(2), textposition="top center")
+    return fig
 
-##################################################################################################
-with tab2:
+
+with tab2, span("compare_tab"):
     st.subheader("📊 مقارنة السنوات المالية")
-    comparison_data = []
-
-    for year in selected_years:
-        row = df[df["year"] == year].iloc[0]
-        fi = FinancialInputs(
-            sales=row["Revenue"],
-            cogs=row["Cost of goods sold"],
-            opex=row.get("Total Operating expenses", 0),
-            interest_expense=row.get("Financial charges", 0),
-            tax_expense=row.get("Zakat", 0),
-            net_income=row["Profit/(Loss) for the period"],
-            current_assets=row["Current assets"],
-            inventory=row["Inventory"],
-            cash=row["Cash and Bank balances"],
-            accounts_receivable=row["Trade Receivable"],
-            accounts_payable=row["Current liabilities"],  
-            current_liabilities=row["Current liabilities"],
-            total_assets=row["Total assets"],
-            total_liabilities=row["Total liabilities"],
-            equity=row["Owners' equity"],
-            cfo=row.get("Cash flow", 0),
-        )
-        results = compute_ratios(fi)
-        for r in results:
-            # 🛠 نحول القيم لأرقام (حتى لو فيها % أو نصوص)
-            val = None
-            if r["value"] not in [None, "—"]:
-                try:
-                    val = float(str(r["value"]).replace("%", "").replace(",", ""))
-                    if "%" in str(r["value"]):
-                        val = val / 100  # نرجعها لنسبة عشرية
-                except:
-                    val = None
-
-            comparison_data.append({
-                "Year": year,
-                "Ratio (AR)": r["name"],
-                "Ratio (EN)": r["name_en"],
-                "Value": val,
-                "Analysis": r["analysis"],
-                "Analysis_EN": r["analysis_en"]
-            })
-
-    comp_df = pd.DataFrame(comparison_data)
+    # شريحة من المكعب (القيم رقمية خام)؛ التحليل النصي يُجلب فقط عند عرضه
+    comp_df = cube.long(selected_companies, selected_years).rename(columns={
+        COMPANY_COLUMN: "Company", YEAR_COLUMN: "Year", "name": "Ratio (AR)", "ratio": "Ratio (EN)", "value": "Value",
+    })[["Company", "Year", "Ratio (AR)", "Ratio (EN)", "Value"]]
 
     if not comp_df.empty:
-        for ratio in comp_df["Ratio (EN)"].unique():
-            ratio_df = comp_df[comp_df["Ratio (EN)"] == ratio].dropna(subset=["Value"]).sort_values("Year")
+        trend_layout = st.radio(
+            "طريقة العرض | Layout", ["combined", "separate"], horizontal=True, key="trend-layout",
+            format_func={"combined": "🧩 شكل واحد لكل النسب | One chart",
+                         "separate": "📈 شكل لكل نسبة | Chart per ratio"}.get,
+        )
+        if trend_layout == "combined":
+            # شكل واحد بخانة لكل نسبة بدل 17 شكلًا منفصلًا
+            with span("plotly"):
+                trend = comp_df[comp_df.groupby(["Company", "Ratio (EN)"])["Value"].transform("count") >= 2]
+                if not trend.empty:
+                    fig = cached_trend_figure(trend, "Company" if multi_company else None)
+                    st.plotly_chart(fig, use_container_width=True, key="trend-combined")
+
+        for (company, ratio), ratio_df in comp_df.groupby(["Company", "Ratio (EN)"], sort=False):
+            ratio_df = ratio_df.dropna(subset=["Value"]).sort_values("Year")
 
             if ratio_df.empty:
                 st.warning(f"⚠️ لا توجد بيانات كافية لمقارنة {ratio}")
                 continue
 
             # ✅ العنوان آمن لأن فيه بيانات
-            st.markdown(f"### {ratio_df.iloc[0]['Ratio (AR)']} | {ratio}")
+            st.markdown(f"### {ratio_df.iloc[0]['Ratio (AR)']} | {ratio}" + (f" — 🏢 {company}" if multi_company else ""))
 
             if len(ratio_df) < 2:
                 st.warning(f"⚠️ لا توجد بيانات كافية لعرض الاتجاه في {ratio}")
                 continue
 
-            fig = px.line(
-                ratio_df,
-                x="Year",
-                y="Value",
-                markers=True,
-                title=f"{ratio} Trend"
-            )
-            fig.update_traces(text=ratio_df["Value"].round(2), textposition="top center")
-            st.plotly_chart(fig, use_container_width=True)
+            if trend_layout == "separate":
+                with span("plotly"):
+                    fig = ratio_line_figure(ratio_df, ratio)
+                    st.plotly_chart(fig, use_container_width=True, key=f"trend-{company}-{ratio}")
 
             # 🔼 تحليل التغير
+            latest = cube.result(company, ratio_df.iloc[-1]["Year"], ratio)
             v1, v2 = ratio_df.iloc[0]["Value"], ratio_df.iloc[-1]["Value"]
             diff = v2 - v1
             direction = "✅ تحسنت" if diff > 0 else "❌ انخفضت"
@@ -578,8 +417,8 @@ with tab2:
                 f"""
                 <div class="improvement-box">
                     <p><b>{ratio}</b> {direction} بمقدار {diff:.2f}</p>
-                    <p>📝 التحليل (AR): {ratio_df.iloc[-1]['Analysis']}</p>
-                    <p>📝 Analysis (EN): {ratio_df.iloc[-1]['Analysis_EN']}</p>
+                    <p>📝 التحليل (AR): {latest.analysis}</p>
+                    <p>📝 Analysis (EN): {latest.analysis_en}</p>
                     <hr>
                     <p>ℹ️ <b>شرح إضافي:</b> التغير من {v1:.2f} في {ratio_df.iloc[0]['Year']} 
                     إلى {v2:.2f} في {ratio_df.iloc[-1]['Year']}.</p>
@@ -595,48 +434,238 @@ with tab2:
         st.warning("⚠️ لا توجد بيانات كافية للمقارنة")
 
 
+##################################################################################################
+def whatif_row(key):
+    """سطر HTML لنسبة واحدة في جدول ماذا لو (يُعاد بناؤه فقط إذا تأثرت النسبة)."""
+    base, new = st.session_state.whatif.base_results[key], st.session_state.whatif.results[key]
+    delta = st.session_state.whatif.delta(key)
+    color = "#1B5E20" if (delta or 0) > 0 else "#B71C1C" if (delta or 0) < 0 else "#212529"
+    delta_text = "—" if delta is None else fmt_number(delta, new.is_percent)
+    return (
+        f"<tr><td>{new.name} | {new.name_en}</td><td>{base.display}</td>"
+        f"<td><b>{new.display}</b></td><td style='color:{color};'>{delta_text}</td>"
+        f"<td>{new.analysis}<br>{new.analysis_en}</td></tr>"
+    )
+
+
+@fragment
+def whatif_panel(company, year):
+    """🎚️ المنزلقات والجدول فقط: تحريك منزلق يعيد هذا الجزء لا الصفحة كلها."""
+    # السيناريو محفوظ في الجلسة؛ يُبنى من جديد فقط عند تغيير الفترة الأساس
+    if st.session_state.get("whatif_key") != (company, year):
+        st.session_state.whatif = WhatIf(panel.inputs_for(company, year))
+        st.session_state.whatif_key = (company, year)
+        st.session_state.whatif_rows = {}
+    whatif = st.session_state.whatif
+
+    with st.expander("🎚️ تعديل المدخلات (%) | Adjust inputs (%)", expanded=True):
+        cols = st.columns(2)
+        changes = {}
+        for i, (name, label) in enumerate(field_labels.items()):
+            pct = cols[i % 2].slider(label, -100, 100, 0, step=5, key=f"whatif-{name}")
+            base_value = getattr(whatif.base, name)
+            changes[name] = base_value * (1 + pct / 100) if pct else base_value
+
+    # إعادة حساب وبناء HTML للنسب المتأثرة فقط، والباقي من الذاكرة
+    rows = st.session_state.whatif_rows
+    for key in whatif.update(**changes):
+        rows.pop(key, None)
+    for key in whatif.results:
+        if key not in rows:
+            rows[key] = whatif_row(key)
+
+    st.markdown(
+        "<table style='width:100%;'><tr><th>النسبة | Ratio</th><th>الأساس | Base</th>"
+        "<th>السيناريو | Scenario</th><th>التغير | Change</th><th>التحليل | Analysis</th></tr>"
+        + "".join(rows[key] for key in whatif.results) + "</table>",
+        unsafe_allow_html=True,
+    )
+
+
+with tab3, span("whatif_tab"):
+    st.subheader("🧪 ماذا لو؟ | What-if")
+    periods = panel.keys(selected_companies, selected_years)
+
+    if periods:
+        company, year = st.selectbox(
+            "الفترة الأساس | Base period", periods,
+            format_func=lambda k: f"{k[1]} — {k[0]}" if multi_company else str(k[1]),
+        )
+        whatif_panel(company, year)
+    else:
+        st.warning("⚠️ لا توجد بيانات كافية للمقارنة")
 
 
+##################################################################################################
+# 📉 الشبكة والتورنادو والمحاكاة مخزنة بمدخلاتها؛ وكل تبويب جزء (fragment) مستقل،
+# فتحريك منزلق فيه لا يعيد بقية الصفحة ولا يعيد الحساب لمدخلات سبق حسابها
+@st.cache_data(max_entries=64, show_spinner=False)
+def sensitivity_figure(base, ratio, x_field, y_field, x_range, y_range, steps):
+    ranges = {
+        x_field: 1 + np.linspace(*x_range, steps) / 100,
+        y_field: 1 + np.linspace(*y_range, steps) / 100,
+    }
+    grid = sensitivity_grid(base, ranges, select=ratio)
+    heat = grid.heatmap(ratio, x_field, y_field)
+    return px.imshow(
+        heat.to_numpy(),
+        x=[f"{(m - 1) * 100:+.0f}%" for m in heat.columns],
+        y=[f"{(m - 1) * 100:+.0f}%" for m in heat.index],
+        origin="lower", aspect="auto", color_continuous_scale="RdYlGn",
+        labels=dict(x=field_labels[x_field], y=field_labels[y_field], color=ratio),
+        title=f"{ratio} — {field_labels[x_field]} × {field_labels[y_field]}",
+    )
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def tornado_figure(base, ratio, x_range, steps):
+    """🌪️ أثر كل حقل منفردًا (±نطاق X) على النسبة؛ None إن لم يؤثر أي حقل."""
+    multipliers = 1 + np.linspace(*x_range, steps) / 100
+    tor = tornado(base, {name: multipliers for name in field_labels}, ratio)
+    tor = tor.dropna(subset=["swing"])
+    tor = tor[tor["swing"] > 0]
+    if tor.empty:
+        return None
+    tor["label"] = tor["field"].map(field_labels)
+    fig = px.bar(
+        tor.iloc[::-1], y="label", x="swing", base="low", orientation="h",
+        title=f"🌪️ {ratio} — Tornado ({x_range[0]}%…{x_range[1]}%)",
+        labels=dict(swing=ratio, label=""), hover_data=["low", "high"],
+    )
+    fig.add_vline(x=tor["base"].iloc[0], line_dash="dash")
+    return fig
+
+
+@fragment
+def sensitivity_panel(periods):
+    company, year = st.selectbox(
+        "الفترة الأساس | Base period", periods, key="sens-period",
+        format_func=lambda k: f"{k[1]} — {k[0]}" if multi_company else str(k[1]),
+    )
+    base = panel.inputs_for(company, year)
+    ratio = st.selectbox("النسبة | Ratio", list(REGISTRY.ratios), key="sens-ratio",
+                         format_func=lambda k: f"{REGISTRY.ratios[k].name} | {k}")
+
+    c1, c2 = st.columns(2)
+    x_field = c1.selectbox("المحور الأفقي | X", list(field_labels), index=0,
+                           format_func=field_labels.get, key="sens-x")
+    y_field = c2.selectbox("المحور الرأسي | Y", list(field_labels), index=3,
+                           format_func=field_labels.get, key="sens-y")
+    x_range = c1.slider("نطاق X (%)", -100, 300, (-30, 10), key="sens-x-range")
+    y_range = c2.slider("نطاق Y (%)", -100, 300, (0, 200), key="sens-y-range")
+    steps = st.slider("دقة الشبكة | Grid points per axis", 5, 201, 41, key="sens-steps")
+
+    if x_field == y_field:
+        st.warning("⚠️ اختر حقلين مختلفين للمحورين")
+    else:
+        fig = sensitivity_figure(base, ratio, x_field, y_field, x_range, y_range, steps)
+        st.plotly_chart(fig, use_container_width=True, key="sens-heatmap")
 
+    fig = tornado_figure(base, ratio, x_range, steps)
+    if fig is None:
+        st.info("ℹ️ لا يوجد حقل يؤثر على هذه النسبة ضمن النطاق المختار")
+    else:
+        st.plotly_chart(fig, use_container_width=True, key="sens-tornado")
 
 
+with tab4, span("sensitivity_tab"):
+    st.subheader("📉 اختبار الحساسية | Sensitivity")
+    periods = panel.keys(selected_companies, selected_years)
 
+    if periods:
+        sensitivity_panel(periods)
+    else:
+        st.warning("⚠️ لا توجد بيانات كافية للمقارنة")
 
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def simulate(base, ratio, uncertain, kind, spread, draws, rho, seed):
+    """🎲 ما يُعرض من المحاكاة فقط (المئينات، المدرج، احتمالات الفئات)؛ السحوبات نفسها لا تُخزن."""
+    sim = monte_carlo(
+        base, {name: FieldDist(kind, spread / 100) for name in uncertain}, n=draws,
+        corr={("sales", "cogs"): rho} if rho else None, seed=seed, select=ratio,
+    )
+    pct = sim.percentiles().loc[ratio]
+
+    # عينة من أول السحوبات تكفي للرسم (السحوبات مستقلة ومتماثلة التوزيع)
+    sample = sim.values[ratio][:50_000]
+    sample = sample[np.isfinite(sample)]
+    fig = None
+    if sample.size:
+        fig = px.histogram(x=sample, nbins=80, title=f"{ratio} — {draws:,} draws",
+                           labels=dict(x=ratio))
+        fig.add_vline(x=sim.base[ratio], line_dash="dash")
+
+    probs = None
+    if REGISTRY.ratios[ratio].bands is not None:
+        probs = sim.band_probabilities(ratio)
+        probs = probs[probs["probability"] > 0]
+    return pct, fig, probs
+
+
+@fragment
+def monte_carlo_panel(periods):
+    company, year = st.selectbox(
+        "الفترة الأساس | Base period", periods, key="mc-period",
+        format_func=lambda k: f"{k[1]} — {k[0]}" if multi_company else str(k[1]),
+    )
+    base = panel.inputs_for(company, year)
+    ratio = st.selectbox("النسبة | Ratio", list(REGISTRY.ratios), key="mc-ratio",
+                         index=list(REGISTRY.ratios).index("Gross Margin"),
+                         format_func=lambda k: f"{REGISTRY.ratios[k].name} | {k}")
+    uncertain = st.multiselect("الحقول غير المؤكدة | Uncertain fields", list(field_labels),
+                               default=["sales", "cogs"], format_func=field_labels.get, key="mc-fields")
+
+    c1, c2, c3 = st.columns(3)
+    kind = c1.selectbox("التوزيع | Distribution", ["normal", "lognormal", "uniform"], key="mc-kind")
+    spread = c2.slider("التذبذب | Spread (%)", 0, 100, 10, key="mc-spread")
+    draws = c3.select_slider("عدد السحوبات | Draws", [10_000, 100_000, 1_000_000], 100_000, key="mc-n")
+    rho = 0.0
+    if "sales" in uncertain and "cogs" in uncertain:
+        rho = st.slider("ارتباط المبيعات وتكلفة المبيعات | Sales–COGS correlation",
+                        -0.95, 0.95, 0.8, 0.05, key="mc-rho")
+    seed = st.number_input("البذرة | Seed", 0, 2 ** 31 - 1, 42, key="mc-seed")
+
+    if not uncertain:
+        st.info("ℹ️ اختر حقلًا واحدًا على الأقل")
+        return
+    pct, fig, probs = simulate(base, ratio, tuple(uncertain), kind, spread, draws, rho, int(seed))
+    spec = REGISTRY.ratios[ratio]
+    cols = st.columns(len(pct))
+    for col, (label, value) in zip(cols, pct.items()):
+        col.metric(label, fmt_number(None if np.isnan(value) else float(value), spec.is_percent))
+
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, key="mc-hist")
+
+    if probs is not None:
+        st.dataframe(
+            probs.assign(probability=format_numbers(probs["probability"], percent=True, decimals=1))
+                 .rename(columns={"band": "الفئة", "band_en": "Band", "probability": "الاحتمال | P"}),
+            hide_index=True, use_container_width=True,
+        )
 
 
+with tab5, span("monte_carlo_tab"):
+    st.subheader("🎲 محاكاة مونت كارلو | Monte Carlo")
+    periods = panel.keys(selected_companies, selected_years)
 
+    if periods:
+        monte_carlo_panel(periods)
+    else:
+        st.warning("⚠️ لا توجد بيانات كافية للمقارنة")
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+##################################################################################################
+# ⏱️ التشخيص: يُكتب التشغيل في سجل JSON-lines إذا ضُبط RATIOS_TIMING_LOG
+timings = timing.end()
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+timing.append_jsonl(timings, session=session_id)
+
+if show_timings:
+    with st.sidebar.expander("⏱️ زمن المراحل | Stage timings", expanded=True):
+        st.metric("إجمالي التشغيل | Total", f"{timings.total_ms:,.0f} ms")
+        st.dataframe(timings.summary().round(2), hide_index=True, use_container_width=True)
+        st.caption("الأزمنة شاملة للمراحل الداخلية | Times include nested stages")
+        st.download_button("⬇️ JSON", json.dumps(timings.to_record(session=session_id), ensure_ascii=False),
+                           file_name="timings.json", mime="application/json", key="diag-download")
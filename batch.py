@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# batch.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from panel import COMPANY_COLUMN, YEAR_COLUMN, Panel
+from ratios import Selection, compute_ratios_frame
+
+WORKBOOK_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv")
+SOURCE_COLUMN = "source"
+
+
+# ---------------- البحث عن الملفات ----------------
+def find_workbooks(root: str, recursive: bool = False) -> List[str]:
+    """ملفات البيانات في المجلد بترتيب أبجدي (تُستبعد ملفات القفل ~$ من Excel)."""
+    found = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(WORKBOOK_SUFFIXES) and not name.startswith("~$"):
+                found.append(os.path.join(folder, name))
+        if not recursive:
+            break
+    return found
+
+
+# ---------------- ملف واحد ----------------
+def read_table(path: str) -> pd.DataFrame:
+    if path.lower().endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def ratios_for_workbook(path: str, select: Selection = None) -> pd.DataFrame:
+    """نسب كل (شركة، سنة) في الملف بنفس منطق التطبيق (بما فيه أرصدة السنة السابقة)."""
+    panel = Panel(read_table(path))
+    out = compute_ratios_frame(panel.select(), select).reset_index()
+    out.insert(0, SOURCE_COLUMN, path)
+    return out
+
+
+@dataclass
+class FileResult:
+    """حالة ملف واحد: عدد الصفوف أو نص الخطأ."""
+    path: str
+    rows: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run_one(path: str, select: Selection) -> Tuple[FileResult, Optional[pd.DataFrame]]:
+    # يُنفذ داخل العامل: أي خطأ يُسجل لهذا الملف فقط ولا يوقف الدفعة
+    start = time.perf_counter()
+    try:
+        df = ratios_for_workbook(path, select)
+    except Exception as exc:
+        return FileResult(path, 0, time.perf_counter() - start, f"{type(exc).__name__}: {exc}"), None
+    return FileResult(path, len(df), time.perf_counter() - start), df
+
+
+# ---------------- الدفعة ----------------
+Progress = Callable[[int, int, FileResult], None]
+
+
+def run_batch(paths: Sequence[str], workers: Optional[int] = None, select: Selection = None,
+              progress: Optional[Progress] = None) -> Tuple[pd.DataFrame, List[FileResult]]:
+    """حساب النسب لكل الملفات وتجميعها في إطار واحد بترتيب paths.
+
+    workers عدد العمليات (الافتراضي عدد المعالجات؛ 1 يعني التنفيذ في نفس
+    العملية). progress(done, total, result) تُستدعى عند انتهاء كل ملف.
+    الملفات الفاشلة لا تدخل الناتج وتظهر في قائمة النتائج مع الخطأ.
+    """
+    total = len(paths)
+    results: List[Optional[FileResult]] = [None] * total
+    frames: List[Optional[pd.DataFrame]] = [None] * total
+
+    def finish(i: int, result: FileResult, df: Optional[pd.DataFrame], done: int) -> None:
+        results[i], frames[i] = result, df
+        if progress is not None:
+            progress(done, total, result)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or total <= 1:
+        for done, (i, path) in enumerate(enumerate(paths), 1):
+            finish(i, *_run_one(path, select), done)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+            futures = {pool.submit(_run_one, path, select): i for i, path in enumerate(paths)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    result, df = future.result()
+                except Exception as exc:  # توقف العامل نفسه (نفاد الذاكرة مثلًا)
+                    result, df = FileResult(paths[i], error=f"{type(exc).__name__}: {exc}"), None
+                finish(i, result, df, done)
+
+    ok = [df for df in frames if df is not None]
+    columns = [SOURCE_COLUMN, COMPANY_COLUMN, YEAR_COLUMN]
+    combined = pd.concat(ok, ignore_index=True) if ok else pd.DataFrame(columns=columns)
+    return combined, results
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    """CSV أو Parquet حسب امتداد الملف (Parquet يحتاج pyarrow)."""
+    if path.lower().endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+# benchmarks.py — قياس المسارات الساخنة: python -m ratios bench --sizes 1000 100000
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from cube import RatioCube
+from formatting import format_numbers
+from panel import COMPANY_COLUMN, SECTOR_COLUMN, YEAR_COLUMN, Panel
+from peers import PeerRanks
+from ratios import (MEMO_SIZE, FinancialInputsBatch, WORKBOOK_COLUMNS, compute_ratios, compute_ratios_cached,
+                    compute_ratios_frame, compute_values, fmt_number, format_equation, inputs_from_workbook, interpret_frame,
+                    interpret_cash_ratio, interpret_current_ratio, interpret_debt_ratio, interpret_dte,
+                    interpret_margin, interpret_quick_ratio, memo_clear)
+from render import card_detail_html, cards_grid_html
+
+DEFAULT_SIZES = (1, 1_000, 100_000, 1_000_000)
+SCALAR_LIMIT = 20_000   # المسارات الفردية (كائن لكل فترة) تُقاس على أول N فترة فقط
+RENDER_LIMIT = 2_000     # تجهيز العرض (إطار لكل فترة) أبطأ بكثير
+WORKBOOK_LIMIT = 20_000  # كتابة xlsx بحجم مليون صف وحدها تستغرق دقائق
+SECTORS = ("Energy", "Materials", "Industrials", "Consumer", "Health", "Financials", "Technology", "Utilities")
+
+
+# ---------------- بيانات صناعية ----------------
+def synthetic_statements(n: int, seed: int = 0, years: int = 10, missing: float = 0.0) -> pd.DataFrame:
+    """n فترة (شركة × سنة) بنفس أعمدة ملف البيانات وعلاقات واقعية بين البنود.
+
+    كل شركة لها حجم مبيعات (توزيع لوغاريتمي طبيعي) ينمو سنويًا، وبقية البنود
+    نسب عشوائية منه (تكلفة، مصاريف، أصول، خصوم...). missing نسبة الخلايا
+    الفارغة عشوائيًا. لكل شركة قطاع من SECTORS. نفس seed يعطي نفس البيانات.
+    """
+    rng = np.random.default_rng(seed)
+    companies = -(-n // years)
+    company = np.repeat(np.arange(companies), years)[:n]
+    year = (2024 - years + 1 + np.tile(np.arange(years), companies))[:n]
+
+    size = rng.lognormal(17, 1.5, companies)[company]
+    growth = np.cumprod(1 + rng.normal(0.05, 0.1, (companies, years)).clip(-0.5), axis=1).ravel()[:n]
+    sales = size * growth
+
+    def share(lo, hi):
+        return rng.uniform(lo, hi, n)
+
+    cogs = sales * share(0.45, 0.85)
+    opex = sales * share(0.05, 0.25)
+    interest = sales * share(0, 0.05) * (rng.random(n) > 0.1)
+    ebit = sales - cogs - opex
+    zakat = np.maximum(ebit, 0) * 0.025
+    total_assets = sales * share(0.6, 2.0)
+    current_assets = total_assets * share(0.3, 0.7)
+    total_liabilities = total_assets * share(0.2, 0.8)
+    net_income = ebit - interest - zakat
+
+    columns = {
+        "sales": sales, "cogs": cogs, "opex": opex, "interest_expense": interest, "tax_expense": zakat,
+        "net_income": net_income, "current_assets": current_assets,
+        "inventory": current_assets * share(0.1, 0.4), "cash": current_assets * share(0.05, 0.3),
+        "accounts_receivable": current_assets * share(0.1, 0.3),
+        "current_liabilities": total_liabilities * share(0.3, 0.8),
+        "total_assets": total_assets, "total_liabilities": total_liabilities,
+        "equity": total_assets - total_liabilities, "cfo": net_income * share(0.2, 1.2),
+    }
+    df = pd.DataFrame({COMPANY_COLUMN: [f"Co-{c:06d}" for c in company], YEAR_COLUMN: year})
+    for name, values in columns.items():
+        values = values.round(2)
+        if missing:
+            values[rng.random(n) < missing] = np.nan
+        df[WORKBOOK_COLUMNS[name]] = values
+    df[SECTOR_COLUMN] = np.array(SECTORS, dtype=object)[rng.integers(0, len(SECTORS), companies)][company]
+    return df
+
+
+# ---------------- القياس ----------------
+@dataclass
+class BenchResult:
+    name: str
+    size: int        # حجم البيانات المطلوب
+    items: int       # ما قيس فعلًا (قد يكون أقل، انظر *_LIMIT)
+    repeat: int
+    min: float
+    median: float
+    mean: float
+
+    @property
+    def per_item_us(self) -> float:
+        return self.min / max(self.items, 1) * 1e6
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _result(name: str, size: int, items: int, times: List[float]) -> BenchResult:
+    return BenchResult(name, size, items, len(times), min(times), statistics.median(times), statistics.fmean(times))
+
+
+def _prepare_year(cube: RatioCube, key) -> pd.DataFrame:
+    # نفس ما يجهزه تبويب النتائج في app.py لكل فترة (البطاقات والتفاصيل والرسم)، بدون Streamlit
+    results = cube.results(*key)
+    cards_grid_html(results)
+    for r in results:
+        card_detail_html(r)
+    return pd.DataFrame([{"Year": key[1], "Ratio (AR)": r.name, "Ratio (EN)": r.name_en, "Value": r.value}
+                         for r in results if r.value is not None])
+
+
+# أسماء القياسات بترتيب التشغيل؛ لكل اسم دالة case_<الاسم> داخل _cases
+BENCHMARKS = ("compute_ratios", "compute_ratios_text", "compute_ratios_select", "compute_values",
+              "compute_ratios_cached", "compute_ratios_frame", "fmt_number", "format_numbers", "format_equation",
+              "interpret", "interpret_frame", "panel", "ratio_cube", "cube_results_text", "peer_ranks",
+              "prepare_year", "load_workbook_excel", "load_workbook_sidecar", "load_workbook_warm")
+
+
+def _cases(df: pd.DataFrame, workdir: str) -> Dict[str, Callable[[], tuple]]:
+    """اسم ← دالة تجهيز تعيد (دالة القياس، عدد العناصر). التجهيز خارج التوقيت."""
+    n = len(df)
+    k = min(n, SCALAR_LIMIT)
+
+    def scalar_inputs(limit=k):
+        return list(FinancialInputsBatch.from_frame(inputs_from_workbook(df.iloc[:limit])))
+
+    def case_compute_ratios():
+        items = scalar_inputs()
+        return (lambda: [compute_ratios(fi) for fi in items]), k
+
+    def case_compute_ratios_text():
+        # كل النصوص (القيمة المنسقة، المعادلة، التحليل) كما كانت تُبنى دائمًا قبل تأجيلها
+        items = scalar_inputs()
+        return (lambda: [[r.as_dict() for r in compute_ratios(fi)] for fi in items]), k
+
+    def case_compute_ratios_select():
+        # مقارنة بـ compute_ratios (select=None): الاختيار لا يضيف كلفة على المسار الكامل
+        items = scalar_inputs()
+        return (lambda: [compute_ratios(fi, "نسب الأصول") for fi in items]), k
+
+    def case_compute_values():
+        items = scalar_inputs()
+        return (lambda: [compute_values(fi) for fi in items]), k
+
+    def case_compute_ratios_cached():
+        items = scalar_inputs(min(k, MEMO_SIZE))  # كلها داخل الذاكرة: قياس الإصابة فقط
+        memo_clear()
+        for fi in items:
+            compute_ratios_cached(fi)
+        return (lambda: [compute_ratios_cached(fi) for fi in items]), len(items)
+
+    def case_compute_ratios_frame():
+        inputs = inputs_from_workbook(df)
+        return (lambda: compute_ratios_frame(inputs)), n
+
+    def case_fmt_number():
+        values = df[WORKBOOK_COLUMNS["sales"]].to_numpy()[:k].tolist()
+        return (lambda: [fmt_number(v) for v in values] + [fmt_number(v / 1e9, True) for v in values]), 2 * k
+
+    def case_format_numbers():
+        values = df[WORKBOOK_COLUMNS["sales"]].to_numpy()
+        return (lambda: (format_numbers(values), format_numbers(values / 1e9, percent=True))), 2 * n
+
+    def case_format_equation():
+        values = df[WORKBOOK_COLUMNS["sales"]].to_numpy()[:k].tolist()
+        return (lambda: [format_equation("المبيعات ÷ الأصول", "Sales ÷ Assets",
+                                         f"{fmt_number(v)} ÷ {fmt_number(v * 2)}") for v in values]), k
+
+    def case_interpret():
+        values = (df[WORKBOOK_COLUMNS["current_assets"]] / df[WORKBOOK_COLUMNS["current_liabilities"]])
+        values = values.to_numpy()[:k].tolist()
+        fns = (interpret_current_ratio, interpret_quick_ratio, interpret_cash_ratio,
+               interpret_debt_ratio, interpret_dte)
+
+        def run():
+            for fn in fns:
+                for v in values:
+                    fn(v)
+            for v in values:
+                interpret_margin(v / 4, "هامش", "Margin")
+        return run, 6 * k
+
+    def case_interpret_frame():
+        values = compute_ratios_frame(inputs_from_workbook(df))
+        return (lambda: interpret_frame(values)), values.size
+
+    def case_panel():
+        return (lambda: Panel(df)), n
+
+    def case_ratio_cube():
+        panel = Panel(df)
+        return (lambda: RatioCube(panel)), n
+
+    def case_cube_results_text():
+        # أول عرض لكل فترة في التطبيق: نتائج المكعب بكل نصوصها (بعده تُقرأ من المخزن)
+        cube = RatioCube(Panel(df.iloc[:k]))
+        keys = cube.panel.keys()
+
+        def run():
+            cube._results.clear()
+            return [[r.as_dict() for r in cube.results(*key)] for key in keys]
+        return run, len(keys)
+
+    def case_peer_ranks():
+        cube = RatioCube(Panel(df))
+        return (lambda: PeerRanks(cube)), n
+
+    def case_prepare_year():
+        # إعادة تشغيل التطبيق: النتائج ونصوصها محفوظة في المكعب بعد أول عرض (انظر cube_results_text)
+        cube = RatioCube(Panel(df.iloc[:min(n, RENDER_LIMIT)]))
+        keys = cube.panel.keys()
+        return (lambda: [_prepare_year(cube, key) for key in keys]), len(keys)
+
+    def workbook():
+        path = os.path.join(workdir, f"bench-{n}.xlsx")
+        if not os.path.exists(path):
+            df.iloc[:WORKBOOK_LIMIT].to_excel(path, index=False)
+        return path, min(n, WORKBOOK_LIMIT)
+
+    def case_load_workbook_excel():
+        path, rows = workbook()
+
+        def run():
+            data_loader.clear_cache()
+            return data_loader.load_workbook(path, sidecar=False)
+        return run, rows
+
+    def case_load_workbook_sidecar():
+        path, rows = workbook()
+        data_loader.clear_cache()
+        data_loader.load_workbook(path)  # ينشئ الملف الجانبي
+
+        def run():
+            data_loader.clear_cache()
+            return data_loader.load_workbook(path)
+        return run, rows
+
+    def case_load_workbook_warm():
+        path, rows = workbook()
+        data_loader.load_workbook(path)
+        return (lambda: data_loader.load_workbook(path)), rows
+
+    cases = {name[len("case_"):]: fn for name, fn in locals().items() if name.startswith("case_")}
+    return {name: cases[name] for name in BENCHMARKS}
+
+
+def run_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, repeat: int = 5, seed: int = 0,
+                   only: Optional[Iterable[str]] = None,
+                   progress: Optional[Callable[[BenchResult], None]] = None) -> List[BenchResult]:
+    """تشغيل كل القياسات (أو only) لكل حجم في sizes."""
+    only = set(only or BENCHMARKS)
+    unknown = only - set(BENCHMARKS)
+    if unknown:
+        raise KeyError(f"قياسات غير معروفة: {sorted(unknown)}")
+    out = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            df = synthetic_statements(size, seed)
+            for name, setup in _cases(df, workdir).items():
+                if name not in only:
+                    continue
+                fn, items = setup()
+                fn()  # تسخين
+                result = _result(name, size, items, _time(fn, repeat))
+                out.append(result)
+                if progress is not None:
+                    progress(result)
+    data_loader.clear_cache()
+    memo_clear()
+    return out
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def to_json(results: Sequence[BenchResult]) -> Dict[str, object]:
+    """الشكل المحفوظ: بيئة التشغيل + صف لكل (قياس، حجم) بالثواني."""
+    return {
+        "environment": environment(),
+        "results": [{**asdict(r), "per_item_us": r.per_item_us} for r in results],
+    }
+
+
+def write_json(results: Sequence[BenchResult], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_json(results), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# charts.py — رسوم Plotly مبنية من جدول نسب طويل (صف لكل شركة × سنة × نسبة)
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+MAX_POINTS = 400         # أقصى عدد نقاط لكل خط بعد التقليل
+WEBGL_THRESHOLD = 2_000  # فوق هذا العدد الكلي من النقاط نستخدم scattergl
+
+
+# ---------------- تقليل النقاط ----------------
+def downsample_indices(y: np.ndarray, max_points: int = MAX_POINTS) -> np.ndarray:
+    """مواضع النقاط المحتفظ بها: أدنى وأعلى قيمة في كل شريحة + أول وآخر نقطة.
+
+    يحافظ على القمم والقيعان (شكل الخط) بعكس أخذ كل n-ـة نقطة.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    # نقطتان لكل شريحة مع حجز مكان للطرفين، فلا يتجاوز الناتج max_points (والطرفان دائمًا)
+    edges = np.linspace(0, n, max((max_points - 2) // 2, 0) + 1).astype(np.intp)
+    keep = [0, n - 1]
+    for a, b in zip(edges[:-1], edges[1:]):
+        if b > a:
+            part = y[a:b]
+            keep += [a + int(np.argmin(part)), a + int(np.argmax(part))]
+    return np.unique(keep)
+
+
+def downsample_long(df: pd.DataFrame, x: str, y: str, by, max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """تقليل كل خط (مجموعة by) على حدة بعد ترتيبه حسب x؛ الخطوط القصيرة كما هي."""
+    df = df.sort_values([*by, x], kind="stable")
+    sizes = df.groupby(list(by), sort=False)[y].transform("size").to_numpy()
+    if (sizes <= max_points).all():
+        return df
+    parts = []
+    for _, part in df.groupby(list(by), sort=False):
+        parts.append(part.iloc[downsample_indices(part[y].to_numpy(), max_points)])
+    return pd.concat(parts)
+
+
+# ---------------- اتجاه كل النسب في شكل واحد ----------------
+def trend_figure(long: pd.DataFrame, x: str = "Year", y: str = "Value", facet: str = "Ratio (EN)",
+                 color: Optional[str] = None, wrap: int = 3, max_points: int = MAX_POINTS) -> go.Figure:
+    """شكل واحد بخانة (facet) لكل نسبة بدل شكل مستقل لكل نسبة.
+
+    كل خانة لها محور y مستقل، والخطوط الطويلة تُقلل على الخادم قبل الإرسال،
+    ومع كثرة النقاط يُرسم بـ WebGL.
+    """
+    by = [facet] + ([color] if color else [])
+    order = list(dict.fromkeys(long[facet]))
+    data = downsample_long(long[[*by, x, y]].dropna(subset=[y]), x, y, by, max_points)
+    webgl = len(data) > WEBGL_THRESHOLD
+    rows = -(-data[facet].nunique() // wrap)
+
+    fig = px.line(
+        data, x=x, y=y, color=color, facet_col=facet, facet_col_wrap=wrap,
+        facet_row_spacing=min(0.08, 0.9 / max(rows - 1, 1)), facet_col_spacing=0.06,
+        markers=not webgl, render_mode="webgl" if webgl else "svg",
+        category_orders={facet: order},
+    )
+    fig.update_yaxes(matches=None, showticklabels=True, title=None)
+    fig.update_xaxes(title=None, showticklabels=True)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+    fig.update_layout(height=max(260, 230 * rows), showlegend=color is not None, margin=dict(t=40))
+    return fig
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# cli.py — تشغيل بدون واجهة: python -m ratios <command>
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from batch import FileResult, find_workbooks, run_batch, write_table
+
+
+# ---------------- batch ----------------
+def _print_progress(done: int, total: int, result: FileResult) -> None:
+    status = f"{result.rows} rows" if result.ok else f"FAILED {result.error}"
+    print(f"[{done}/{total}] {os.path.basename(result.path)}: {status} ({result.seconds:.2f}s)",
+          file=sys.stderr, flush=True)
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+    paths = find_workbooks(args.directory, args.recursive)
+    if not paths:
+        print(f"no workbooks found in {args.directory}", file=sys.stderr)
+        return 1
+
+    progress = None if args.quiet else _print_progress
+    df, results = run_batch(paths, args.workers, args.select, progress)
+    write_table(df, args.output)
+
+    failed = [r for r in results if not r.ok]
+    if args.errors and failed:
+        import pandas as pd
+        pd.DataFrame({"path": [r.path for r in failed], "error": [r.error for r in failed]}).to_csv(
+            args.errors, index=False, encoding="utf-8-sig")
+    print(f"{len(results) - len(failed)}/{len(results)} files, {len(df)} rows -> {args.output}",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+# ---------------- bench ----------------
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from benchmarks import run_benchmarks, write_json
+
+    def report(r):
+        print(f"{r.name:<24} {r.size:>9,} {r.items:>9,} {r.min:>10.4f}s {r.per_item_us:>10.2f}us/item",
+              file=sys.stderr, flush=True)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, args.only, None if args.quiet else report)
+    write_json(results, args.output)
+    print(f"{len(results)} results -> {args.output}", file=sys.stderr)
+    return 0
+
+
+# ---------------- export ----------------
+def _cmd_export(args: argparse.Namespace) -> int:
+    from export import CHUNK_SIZE, cube_chunks, file_chunks, write_report
+
+    if args.stream:
+        chunks = file_chunks(args.workbook, args.company, args.year, args.select, args.chunk_size or CHUNK_SIZE)
+    else:
+        from batch import read_table
+        from cube import RatioCube
+        from panel import Panel
+
+        cube = RatioCube(Panel(read_table(args.workbook)))
+        chunks = cube_chunks(cube, args.company, args.year, args.select, args.chunk_size or CHUNK_SIZE)
+    rows = write_report(chunks, args.output)
+    print(f"{rows} rows -> {args.output}", file=sys.stderr)
+    return 0 if rows else 1  # لا فترة مطابقة لـ --company/--year
+
+
+# ---------------- reports ----------------
+def _cmd_reports(args: argparse.Namespace) -> int:
+    from batch import read_table
+    from cube import RatioCube
+    from panel import Panel
+    from reports import build_reports, cache_dir
+
+    def report(done: int, total: int) -> None:
+        if done == total or done % 100 == 0:
+            print(f"[{done}/{total}]", file=sys.stderr, flush=True)
+
+    cube = RatioCube(Panel(read_table(args.workbook)))
+    stats = build_reports(cube, args.company, args.year, args.cache, args.output, None if args.quiet else report)
+    target = args.output or cache_dir(args.cache)
+    print(f"{stats.built} built, {stats.cached} cached ({stats.seconds:.2f}s) -> {target}", file=sys.stderr)
+    return 0
+
+
+# ---------------- الواجهة ----------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ratios", description="Financial ratio analysis")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("batch", help="compute ratios for every workbook in a directory")
+    p.add_argument("directory")
+    p.add_argument("-o", "--output", default="ratios.csv", help="output file (.csv or .parquet)")
+    p.add_argument("-j", "--workers", type=int, default=None,
+                   help="worker processes (default: CPU count, 1 = no pool)")
+    p.add_argument("-r", "--recursive", action="store_true", help="include sub-directories")
+    p.add_argument("-s", "--select", action="append", default=None,
+                   help="ratio name or group to compute (repeatable, default: all)")
+    p.add_argument("--errors", help="write failed files and their errors to this CSV")
+    p.add_argument("-q", "--quiet", action="store_true", help="no per-file progress")
+    p.set_defaults(func=_cmd_batch)
+
+    p = sub.add_parser("bench", help="benchmark the hot paths on synthetic statements")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1, 1_000, 100_000, 1_000_000],
+                   help="company-years per run")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--only", nargs="+", help="benchmark names (default: all)")
+    p.add_argument("-o", "--output", default="bench.json", help="JSON results file")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=_cmd_bench)
+
+    p = sub.add_parser("export", help="write every ratio with its band and interpretation for one workbook")
+    p.add_argument("workbook", help=".xlsx or .csv")
+    p.add_argument("-o", "--output", default="report.xlsx", help="output file (.xlsx, .csv or .parquet)")
+    p.add_argument("-s", "--select", action="append", default=None,
+                   help="ratio name or group to export (repeatable, default: all)")
+    p.add_argument("--company", action="append", default=None, help="company to export (repeatable)")
+    p.add_argument("--year", type=int, action="append", default=None, help="year to export (repeatable)")
+    p.add_argument("--stream", action="store_true",
+                   help="read the workbook in chunks (bounded memory; each company's years must be in order)")
+    p.add_argument("--chunk-size", type=int, default=None, help="company-years per chunk")
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("reports", help="pre-render the HTML report of every company-year into the cache")
+    p.add_argument("workbook", help=".xlsx or .csv")
+    p.add_argument("--cache", default=None, help="cache directory (default: $RATIOS_REPORT_CACHE or .report_cache)")
+    p.add_argument("-o", "--output", default=None, help="also copy each report here as <company>_<year>.html")
+    p.add_argument("--company", action="append", default=None, help="company to render (repeatable)")
+    p.add_argument("--year", type=int, action="append", default=None, help="year to render (repeatable)")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.set_defaults(func=_cmd_reports)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, KeyError, ValueError) as e:
+        # ملف غير موجود، نسبة غير معروفة، صيغة غير مدعومة...: رسالة ورمز خروج بدل traceback
+        print(f"error: {e.args[0] if isinstance(e, KeyError) and e.args else e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# cube.py
+from collections.abc import Mapping as MappingABC
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from panel import COMPANY_COLUMN, YEAR_COLUMN, Panel
+from ratios import REGISTRY, ArrayOps, RatioRegistry, FormattedOperands, RatioResult, Selection
+from timing import timed
+
+NO_CODE = -1  # بلا قيمة، أو نسبة بلا جدول تفسير
+
+
+class _Row(MappingABC):
+    """قيم صف واحد من أعمدة الحساب (NaN ← None كما في المسار الفردي)."""
+    __slots__ = ("_ns", "_i")
+
+    def __init__(self, ns: Dict[str, np.ndarray], i: int):
+        self._ns, self._i = ns, i
+
+    def __getitem__(self, name):
+        v = self._ns[name]
+        v = float(v[self._i] if v.ndim else v)
+        return None if v != v else v
+
+    def __iter__(self):
+        return iter(self._ns)
+
+    def __len__(self):
+        return len(self._ns)
+
+
+class RatioCube:
+    """كل النسب لكل (شركة، سنة) محسوبة مرة واحدة بعملية متجهة واحدة.
+
+    values وcodes مصفوفتان (صف لكل صف في Panel × عمود لكل نسبة): القيمة
+    الرقمية ورمز فئة التفسير (NO_CODE إن لم تتوفر). كل العروض (البطاقات،
+    الرسوم، المقارنة، التصدير) تقتطع منها بدل إعادة الحساب، والمكعب نفسه
+    يُخزن لكل نسخة من الملف (data_loader.load_cube).
+    """
+
+    @timed("ratio_cube")
+    def __init__(self, panel: Panel, registry: RatioRegistry = REGISTRY):
+        self.panel = panel
+        self.registry = registry
+        n = len(panel.batch)
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            ns, out = registry.evaluate(panel.batch.columns, ArrayOps, with_text=True)
+        self.ratios: Tuple[str, ...] = tuple(out)
+        self._column = {k: j for j, k in enumerate(self.ratios)}
+        self.values = np.empty((n, len(self.ratios)), dtype=np.float64)
+        self.codes = np.full((n, len(self.ratios)), NO_CODE, dtype=np.int8)
+        for j, key in enumerate(self.ratios):
+            self.values[:, j] = out[key]
+            table = registry.ratios[key].table
+            if table is not None:
+                self.codes[:, j] = table.codes(self.values[:, j])
+        self._ns = {k: np.asarray(v) for k, v in ns.items()}
+        self._results: Dict[int, List[RatioResult]] = {}
+
+    # ---------------- التقطيع ----------------
+    def columns(self, select: Selection = None) -> Tuple[str, ...]:
+        """مفاتيح النسب المختارة (نسبة أو مجموعة) بترتيب السجل؛ None = الكل."""
+        keys = self.registry.resolve(select)
+        return self.ratios if keys is None else keys
+
+    def frame(self, companies: Optional[Iterable[Hashable]] = None, years: Optional[Iterable[Hashable]] = None,
+              select: Selection = None) -> pd.DataFrame:
+        """إطار عريض: فهرس (company, year) وعمود لكل نسبة."""
+        keys = self.panel.keys(companies, years)
+        cols = self.columns(select)
+        rows = self.panel.positions(keys)
+        data = self.values[np.ix_(rows, [self._column[k] for k in cols])]
+        index = pd.MultiIndex.from_tuples(keys, names=[COMPANY_COLUMN, YEAR_COLUMN])
+        return pd.DataFrame(data, index=index, columns=list(cols))
+
+    def long(self, companies: Optional[Iterable[Hashable]] = None, years: Optional[Iterable[Hashable]] = None,
+             select: Selection = None) -> pd.DataFrame:
+        """جدول طويل: صف لكل (شركة، سنة، نسبة) بالقيمة ورمز الفئة، بترتيب الفترات ثم السجل."""
+        keys = self.panel.keys(companies, years)
+        cols = self.columns(select)
+        rows = self.panel.positions(keys)
+        j = np.fromiter((self._column[k] for k in cols), dtype=np.intp, count=len(cols))
+        specs = [self.registry.ratios[k] for k in cols]
+        return pd.DataFrame({
+            COMPANY_COLUMN: pd.Index([k[0] for k in keys]).repeat(len(cols)),
+            YEAR_COLUMN: pd.Index([k[1] for k in keys]).repeat(len(cols)),
+            "ratio": np.tile(np.array(cols, dtype=object), len(keys)),
+            "name": np.tile(np.array([s.name for s in specs], dtype=object), len(keys)),
+            "group": np.tile(np.array([s.group for s in specs], dtype=object), len(keys)),
+            "value": self.values[np.ix_(rows, j)].ravel(),
+            "code": self.codes[np.ix_(rows, j)].ravel(),
+        })
+
+    # ---------------- النتائج للعرض ----------------
+    def results(self, company: Hashable, year: Hashable) -> List[RatioResult]:
+        """نفس ناتج compute_ratios للفترة لكن من القيم المحسوبة مسبقًا.
+
+        النتائج محفوظة مع المكعب، فالنصوص (المعادلة، التحليل) تُبنى مرة واحدة
+        لكل نسخة من البيانات مهما تكرر العرض.
+        """
+        i = self.panel.positions([(company, year)])[0]
+        cached = self._results.get(i)
+        if cached is None:
+            row = self.values[i].tolist()  # أرقام بايثون: المقارنة والتحويل أسرع من عناصر NumPy
+            operands = _Row(self._ns, i)
+            numbers = FormattedOperands(operands, self.registry.substitution_names(self.ratios))
+            specs = self.registry.ratios
+            cached = [RatioResult(specs[k], None if v != v else v, operands, numbers)
+                      for k, v in zip(self.ratios, row)]
+            self._results[i] = cached
+        return cached
+
+    def result(self, company: Hashable, year: Hashable, key: str) -> RatioResult:
+        return self.results(company, year)[self._column[key]]
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+# data_loader.py
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import openpyxl
+import pandas as pd
+
+from cube import RatioCube
+from panel import COMPANY_COLUMN, DEFAULT_COMPANY, PRIOR_FIELDS, YEAR_COLUMN, Panel, add_prior_period
+from peers import PeerRanks
+from ratios import REGISTRY, WORKBOOK_COLUMNS, compute_ratios_frame, inputs_from_workbook
+from timing import span
+
+try:  # اختياري: بدونه نقرأ ملف Excel مباشرة في كل تشغيل بارد
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover
+    pa = None
+
+# ---------------- بصمة الملف ----------------
+Signature = Tuple[int, int]  # (mtime_ns, size)
+
+_lock = threading.Lock()  # يحمي القواميس فقط؛ لا يُمسك أثناء القراءة أو البناء
+_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_hashes: Dict[str, Tuple[Signature, str]] = {}
+_frames: Dict[str, Tuple[str, pd.DataFrame]] = {}
+_panels: Dict[str, Tuple[str, Panel]] = {}
+_cubes: Dict[str, Tuple[str, RatioCube]] = {}
+_peers: Dict[str, PeerRanks] = {}
+
+
+def file_signature(path: str) -> Signature:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def data_version(path: str) -> str:
+    """بصمة محتوى الملف (sha256). لا يُعاد حسابها إلا إذا تغير وقت التعديل أو الحجم."""
+    key = os.path.abspath(path)
+    sig = file_signature(key)
+    with _lock:
+        cached = _hashes.get(key)
+        if cached and cached[0] == sig:
+            return cached[1]
+    with span("sha256"):
+        digest = _sha256(key)
+    with _lock:
+        _hashes[key] = (sig, digest)
+    return digest
+
+
+# ---------------- الملف الجانبي (Feather) ----------------
+SIDECAR_SUFFIX = ".feather"
+_SOURCE_KEY = b"source_sha256"
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+def _read_sidecar(path: str, version: str) -> Optional[pd.DataFrame]:
+    """قراءة الملف الجانبي إن وُجد وكان مطابقًا لنسخة المصدر، وإلا None."""
+    side = sidecar_path(path)
+    if pa is None or not os.path.exists(side):
+        return None
+    try:
+        table = feather.read_table(side, memory_map=True)
+    except (OSError, pa.ArrowException):
+        return None
+    meta = table.schema.metadata or {}
+    if meta.get(_SOURCE_KEY) != version.encode():
+        return None  # قديم: تغير ملف Excel بعد إنشائه
+    return table.to_pandas()
+
+
+def _write_sidecar(path: str, version: str, df: pd.DataFrame) -> None:
+    if pa is None:
+        return
+    side = sidecar_path(path)
+    tmp = side + ".tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _SOURCE_KEY: version.encode()})
+        # بدون ضغط حتى تُقرأ الأعمدة مباشرة من الذاكرة المعيّنة (memory map)
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, side)
+    except (OSError, pa.ArrowException):
+        # مجلد للقراءة فقط أو أعمدة بأنواع مختلطة: نكتفي بـ Excel
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_source(path: str, version: str, sidecar: bool = True) -> pd.DataFrame:
+    """الملف الجانبي إن كان صالحًا، وإلا قراءة Excel وتحديث الملف الجانبي."""
+    if sidecar:
+        with span("read_sidecar"):
+            df = _read_sidecar(path, version)
+        if df is not None:
+            return df
+    with span("read_excel"):
+        df = pd.read_excel(path)
+    if sidecar:
+        with span("write_sidecar"):
+            _write_sidecar(path, version, df)
+    return df
+
+
+# ---------------- التحميل مع التخزين المؤقت ----------------
+def _build_lock(kind: str, key: str) -> threading.Lock:
+    """قفل لكل (نوع، ملف): جلستان على نفس الملف تنتظران بناءً واحدًا،
+    وملف آخر أو نوع آخر لا ينتظر."""
+    with _lock:
+        return _build_locks.setdefault((kind, key), threading.Lock())
+
+
+def _load_frame(key: str, sidecar: bool) -> Tuple[str, pd.DataFrame]:
+    """(النسخة، الإطار): النسخة هي التي قُرئ بها الإطار فعلًا."""
+    version = data_version(key)
+    with _build_lock("frame", key):
+        with _lock:
+            cached = _frames.get(key)
+        if cached and cached[0] == version:
+            return cached
+        df = read_source(key, version, sidecar)
+        with _lock:
+            _frames[key] = (version, df)  # نسخة واحدة لكل ملف؛ القديمة تُستبدل
+        return version, df
+
+
+def _load_panel(key: str, sidecar: bool) -> Tuple[str, Panel]:
+    # المفتاح نسخة الإطار الذي بُني منه Panel لا data_version من جديد: لو تغير
+    # الملف بين الخطوتين لا يُخزن Panel قديم تحت بصمة المحتوى الجديد
+    version, df = _load_frame(key, sidecar)
+    with _build_lock("panel", key):
+        with _lock:
+            cached = _panels.get(key)
+        if cached and cached[0] == version:
+            return cached
+        panel = Panel(df)
+        with _lock:
+            _panels[key] = (version, panel)
+        return version, panel
+
+
+def _load_cube(key: str, sidecar: bool) -> Tuple[str, RatioCube]:
+    version, panel = _load_panel(key, sidecar)
+    with _build_lock("cube", key):
+        with _lock:
+            cached = _cubes.get(key)
+        if cached and cached[0] == version and cached[1].ratios == tuple(REGISTRY.ratios):
+            return cached
+        cube = RatioCube(panel)
+        with _lock:
+            _cubes[key] = (version, cube)
+        return version, cube
+
+
+def load_workbook(path: str, sidecar: bool = True) -> pd.DataFrame:
+    """قراءة ملف البيانات مرة واحدة لكل نسخة من محتواه.
+
+    الإطار المعاد مشترك بين كل المستدعين (وبين جلسات Streamlit في نفس
+    العملية)، لذا يجب عدم تعديله مباشرة. عند التشغيل البارد يُقرأ الملف
+    الجانبي <path>.feather إن كان مطابقًا لنسخة الملف.
+    """
+    return _load_frame(os.path.abspath(path), sidecar)[1]
+
+
+def load_panel(path: str, sidecar: bool = True) -> Panel:
+    """Panel (فهرس الشركة × السنة) مبني مرة واحدة لكل نسخة من الملف."""
+    return _load_panel(os.path.abspath(path), sidecar)[1]
+
+
+def load_cube(path: str, sidecar: bool = True) -> RatioCube:
+    """كل النسب لكل الفترات، محسوبة مرة واحدة لكل نسخة من الملف.
+
+    يُعاد بناؤه أيضًا إذا أُضيفت نسبة إلى السجل بعد بنائه (register_ratio).
+    """
+    return _load_cube(os.path.abspath(path), sidecar)[1]
+
+
+def load_peers(path: str, sidecar: bool = True) -> PeerRanks:
+    """ترتيب الشركات مقابل نظيراتها، يُعاد حسابه فقط مع كل مكعب جديد."""
+    key = os.path.abspath(path)
+    cube = load_cube(key, sidecar)
+    with _build_lock("peers", key):
+        with _lock:
+            cached = _peers.get(key)
+        if cached is not None and cached.cube is cube:
+            return cached
+        peers = PeerRanks(cube)
+        with _lock:
+            _peers[key] = peers
+        return peers
+
+
+def clear_cache() -> None:
+    with _lock:
+        _hashes.clear()
+        _frames.clear()
+        _panels.clear()
+        _cubes.clear()
+        _peers.clear()
+
+
+# ---------------- القراءة المتدفقة للملفات الكبيرة ----------------
+KEY_COLUMNS = (COMPANY_COLUMN, YEAR_COLUMN)
+
+
+def _wanted_columns() -> Dict[str, List[str]]:
+    """عمود الملف ← حقول FinancialInputs التي تُعبأ منه (عمود واحد قد يغذي أكثر من حقل)."""
+    wanted: Dict[str, List[str]] = {}
+    for name, column in WORKBOOK_COLUMNS.items():
+        wanted.setdefault(column, []).append(name)
+    for key in KEY_COLUMNS:
+        wanted.setdefault(key, []).append(key)
+    return wanted
+
+
+def _records_to_frame(records: List[tuple], names: List[List[str]]) -> pd.DataFrame:
+    data = {}
+    for targets, values in zip(names, zip(*records)):
+        for target in targets:
+            data[target] = values
+    return pd.DataFrame(data)
+
+
+def _iter_xlsx(path: str, chunk_size: int, sheets: Optional[Iterable[str]]) -> Iterator[pd.DataFrame]:
+    wanted = _wanted_columns()
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in (sheets or wb.sheetnames):
+            rows = wb[sheet].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            # أول ظهور لكل عمود (مثل pandas الذي يسمي المكرر "Total assets.1")
+            positions: Dict[str, int] = {}
+            for i, title in enumerate(header):
+                if title in wanted and title not in positions:
+                    positions[title] = i
+            idx = list(positions.values())
+            names = [wanted[title] for title in positions]
+
+            buf: List[tuple] = []
+            for row in rows:
+                if not any(v is not None for v in row):
+                    continue
+                buf.append(tuple(row[i] if i < len(row) else None for i in idx))
+                if len(buf) >= chunk_size:
+                    yield _records_to_frame(buf, names).assign(sheet=sheet)
+                    buf = []
+            if buf:
+                yield _records_to_frame(buf, names).assign(sheet=sheet)
+    finally:
+        wb.close()
+
+
+def _iter_csv(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    wanted = _wanted_columns()
+    for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in wanted):
+        yield inputs_from_workbook(chunk).join(chunk[[k for k in KEY_COLUMNS if k in chunk.columns]])
+
+
+def iter_input_chunks(path: str, chunk_size: int = 50_000,
+                      sheets: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """إطارات متتالية بأعمدة حقول FinancialInputs (مع company/year إن وُجدا).
+
+    لا يُحمّل الملف كاملًا في الذاكرة: xlsx عبر وضع القراءة فقط في openpyxl
+    (مع عمود sheet لكل ورقة)، وcsv عبر القراءة المجزأة في pandas.
+    """
+    if path.lower().endswith(".csv"):
+        return _iter_csv(path, chunk_size)
+    return _iter_xlsx(path, chunk_size, sheets)
+
+
+def _last_year_rows(keyed: pd.DataFrame) -> pd.DataFrame:
+    """صفوف آخر سنة ظهرت لكل شركة بترتيب الملف (كلها إن تكررت، فيبقى أولها المعتمد كما في Panel)."""
+    last = keyed.drop_duplicates(COMPANY_COLUMN, keep="last").set_index(COMPANY_COLUMN)[YEAR_COLUMN]
+    return keyed[(keyed[YEAR_COLUMN] == keyed[COMPANY_COLUMN].map(last)).to_numpy()]
+
+
+def _prior_ratios(pool: pd.DataFrame, context: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """نسب صفوف pool بعد add_prior_period، وcontext صفوف سابقة تُستخدم للبحث فقط."""
+    both = pool if context is None else pd.concat([context, pool], ignore_index=True)
+    inputs = add_prior_period(both, both[COMPANY_COLUMN], both[YEAR_COLUMN]).iloc[len(both) - len(pool):]
+    return pool[list(KEY_COLUMNS)].join(compute_ratios_frame(inputs.reset_index(drop=True)))
+
+
+def iter_ratio_chunks(path: str, chunk_size: int = 50_000,
+                      sheets: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """حساب النسب دفعةً دفعة: company وyear ثم عمود لكل نسبة (مثل RatioCube).
+
+    أعمدة prev_* تُعبأ بـ add_prior_period كما في Panel، وعبر حدود الدفعات
+    أيضًا: آخر سنة لكل شركة تُحمل إلى الدفعة التالية (ملف تصاعدي)، وآخر صف
+    للشركة لم تظهر سنته السابقة بعد ينتظر صفها التالي (ملف تنازلي) أو نهاية
+    الملف. النتيجة مطابقة للتحميل الكامل ما دامت سنوات كل شركة مرتبة
+    (تصاعديًا أو تنازليًا) في الملف؛ الصف المنتظر قد يخرج في دفعة لاحقة.
+    بدون عمود company تأخذ كل الصفوف DEFAULT_COMPANY.
+    """
+    carry: Optional[pd.DataFrame] = None    # آخر سنة لكل شركة: المفاتيح وحقول PRIOR_FIELDS فقط
+    pending: Optional[pd.DataFrame] = None  # آخر صف لكل شركة لم تظهر سنته السابقة بعد (كاملًا)
+    for chunk in iter_input_chunks(path, chunk_size, sheets):
+        chunk = chunk.reset_index(drop=True)
+        if COMPANY_COLUMN not in chunk.columns:
+            chunk[COMPANY_COLUMN] = DEFAULT_COMPANY
+        keyed = chunk[[*KEY_COLUMNS, *(src for src in PRIOR_FIELDS.values() if src in chunk.columns)]]
+        pool = chunk if pending is None else pd.concat([pending, chunk], ignore_index=True)
+        context = None if carry is None else carry[carry[COMPANY_COLUMN].isin(pool[COMPANY_COLUMN])]
+
+        # الصف ينتظر إن لم تظهر سنته السابقة ولم يأت بعده صف بسنة أخرى لنفس الشركة
+        seen = pool[list(KEY_COLUMNS)] if context is None else pd.concat([context, pool])[list(KEY_COLUMNS)]
+        seen = pd.MultiIndex.from_arrays([seen[COMPANY_COLUMN], pd.to_numeric(seen[YEAR_COLUMN], errors="coerce")])
+        prior = pd.MultiIndex.from_arrays([pool[COMPANY_COLUMN], pd.to_numeric(pool[YEAR_COLUMN], errors="coerce") - 1])
+        last = pool.drop_duplicates(COMPANY_COLUMN, keep="last").set_index(COMPANY_COLUMN)[YEAR_COLUMN]
+        waiting = ~prior.isin(seen) & (pool[YEAR_COLUMN] == pool[COMPANY_COLUMN].map(last)).to_numpy()
+        if not waiting.all():
+            yield _prior_ratios(pool, context)[~waiting].reset_index(drop=True)
+        pending = pool[waiting].reset_index(drop=True)
+        carry = _last_year_rows(keyed if carry is None else pd.concat([carry, keyed], ignore_index=True))
+    if pending is not None and len(pending):
+        # نهاية الملف: السنة السابقة لن تظهر، فيُحسب برصيد نهاية الفترة كما في Panel
+        context = carry[carry[COMPANY_COLUMN].isin(pending[COMPANY_COLUMN])]
+        yield _prior_ratios(pending, context)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# export.py — تصدير كل النسب مع فئاتها وتفسيرها إلى xlsx/csv/parquet على دفعات
+import os
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from cube import RatioCube
+from data_loader import KEY_COLUMNS, iter_ratio_chunks
+from formatting import number_format
+from panel import COMPANY_COLUMN, YEAR_COLUMN
+from ratios import REGISTRY, RatioRegistry, Selection
+from timing import timed
+
+try:  # اختياري: بدونه لا يتوفر Parquet ويُكتب CSV عبر pandas (أبطأ)
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+
+CHUNK_SIZE = 10_000           # فترات (شركة × سنة) في كل دفعة؛ الصفوف = الفترات × عدد النسب
+XLSX_MAX_ROWS = 1_048_575     # حد الورقة في Excel بدون سطر العناوين؛ الزائد في ورقة جديدة
+REPORT_COLUMNS = ["group", "ratio", "ratio_en", "value", "display", "band", "analysis", "analysis_en"]
+
+
+# ---------------- صفوف التقرير ----------------
+def report_rows(wide: pd.DataFrame, registry: RatioRegistry = REGISTRY) -> pd.DataFrame:
+    """إطار عريض (أعمدة مفاتيح + عمود لكل نسبة) ← صف لكل (فترة، نسبة).
+
+    value رقمية خام، display منسقة، band رمز الفئة (‎-1 بلا قيمة)، والتفسير
+    بالعربية والإنجليزية يُجلب من جدول الفئات بفهرسة واحدة لكل نسبة.
+    """
+    ratio_cols = [c for c in wide.columns if c in registry.ratios]
+    key_cols = [c for c in wide.columns if c not in registry.ratios]
+    m, r = len(wide), len(ratio_cols)
+    specs = [registry.ratios[k] for k in ratio_cols]
+    values = wide[ratio_cols].to_numpy(dtype=np.float64)
+
+    display = np.empty((m, r), dtype=object)
+    codes = np.full((m, r), -1, dtype=np.int8)
+    ar = np.empty((m, r), dtype=object)
+    en = np.empty((m, r), dtype=object)
+    for j, spec in enumerate(specs):
+        column = values[:, j]
+        display[:, j] = number_format(percent=spec.is_percent).many(column)
+        table = spec.table
+        if table is not None:
+            codes[:, j] = table.codes(column)
+            ar[:, j] = table.texts(codes[:, j], "ar")
+            en[:, j] = table.texts(codes[:, j], "en")
+        else:  # تفسير مخصص (register_ratio بدالة): قيمة قيمة
+            pairs = [spec.analysis(None if v != v else float(v)) for v in column.tolist()]
+            ar[:, j] = [p[0] for p in pairs]
+            en[:, j] = [p[1] for p in pairs]
+
+    out = {k: np.repeat(wide[k].to_numpy(), r) for k in key_cols}
+    out.update({
+        "group": np.tile(np.array([s.group for s in specs], dtype=object), m),
+        "ratio": np.tile(np.array([s.name for s in specs], dtype=object), m),
+        "ratio_en": np.tile(np.array([s.name_en for s in specs], dtype=object), m),
+        "value": values.ravel(),
+        "display": display.ravel(),
+        "band": codes.ravel(),
+        "analysis": ar.ravel(),
+        "analysis_en": en.ravel(),
+    })
+    return pd.DataFrame(out)
+
+
+# ---------------- المصادر ----------------
+def cube_chunks(cube: RatioCube, companies: Optional[Iterable[Hashable]] = None,
+                years: Optional[Iterable[Hashable]] = None, select: Selection = None,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """شرائح عريضة من المكعب للفترات المختارة، chunk_size فترة في كل مرة."""
+    keys = cube.panel.keys(companies, years)
+    cols = cube.columns(select)
+    j = np.fromiter((cube.ratios.index(k) for k in cols), dtype=np.intp, count=len(cols))
+    for start in range(0, len(keys), chunk_size):
+        part = keys[start:start + chunk_size]
+        wide = pd.DataFrame(cube.values[np.ix_(cube.panel.positions(part), j)], columns=list(cols))
+        wide.insert(0, COMPANY_COLUMN, [k[0] for k in part])
+        wide.insert(1, YEAR_COLUMN, [k[1] for k in part])
+        yield wide
+
+
+def file_chunks(path: str, companies: Optional[Iterable[Hashable]] = None,
+                years: Optional[Iterable[Hashable]] = None, select: Selection = None,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """نفس الشرائح (company، year ثم النسب) مباشرة من ملف كبير دون تحميله كاملًا.
+
+    القيم مطابقة لـ cube_chunks بما فيها متوسطات السنة السابقة (انظر
+    iter_ratio_chunks)، لكن الفترات بترتيب الملف لا بترتيب Panel.
+    """
+    keep = REGISTRY.resolve(select)
+    # مرة واحدة قبل الحلقة: المولّد يُستهلك في أول دفعة
+    companies = None if companies is None else list(companies)
+    years = None if years is None else list(years)
+    for chunk in iter_ratio_chunks(path, chunk_size):
+        mask = np.ones(len(chunk), dtype=bool)
+        if companies is not None:
+            mask &= chunk[COMPANY_COLUMN].isin(companies).to_numpy()
+        if years is not None:
+            mask &= chunk[YEAR_COLUMN].isin(years).to_numpy()
+        if keep is not None:
+            chunk = chunk[[c for c in chunk.columns if c not in REGISTRY.ratios or c in keep]]
+        if mask.any():
+            yield chunk[mask]
+
+
+# ---------------- الكتابة ----------------
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=[*KEY_COLUMNS, *REPORT_COLUMNS])
+
+
+def _cells(df: pd.DataFrame) -> List[list]:
+    """أعمدة كقوائم بايثون لـ openpyxl (NaN ← خلية فارغة)."""
+    columns = []
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if values.dtype.kind == "f":
+            values = values.astype(object)
+            values[pd.isna(values)] = None
+        columns.append(values.tolist())
+    return columns
+
+
+def _write_csv(frames: Iterator[pd.DataFrame], path: str) -> int:
+    if pa is not None:
+        return _write_csv_arrow(frames, path)
+    rows = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        first = True
+        for df in frames:
+            df.to_csv(f, header=first, index=False)
+            first = False
+            rows += len(df)
+        if first:
+            _empty().to_csv(f, index=False)
+    return rows
+
+
+def _write_csv_arrow(frames: Iterator[pd.DataFrame], path: str) -> int:
+    # نفس الملف (UTF-8 مع BOM ليفتحه Excel بالعربية) لكن أسرع بكثير من to_csv
+    with open(path, "wb") as f:
+        f.write("\ufeff".encode("utf-8"))
+        return _write_arrow(frames, lambda schema: pa_csv.CSVWriter(f, schema))
+
+
+def _write_xlsx(frames: Iterator[pd.DataFrame], path: str) -> int:
+    # وضع الكتابة فقط: كل صف يُكتب للقرص مباشرة ولا تبقى الورقة في الذاكرة
+    wb = openpyxl.Workbook(write_only=True)
+    ws, sheets, used, header, rows = None, 0, 0, None, 0
+    for df in frames:
+        header = list(df.columns)
+        for row in zip(*_cells(df)):
+            if ws is None or used >= XLSX_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet("ratios" if sheets == 1 else f"ratios ({sheets})")
+                ws.append(header)
+                used = 0
+            ws.append(row)
+            used += 1
+        rows += len(df)
+    if ws is None:
+        wb.create_sheet("ratios").append(header or list(_empty().columns))
+    wb.save(path)
+    return rows
+
+
+def _write_parquet(frames: Iterator[pd.DataFrame], path: str) -> int:
+    if pa is None:
+        raise ImportError("التصدير إلى Parquet يحتاج مكتبة pyarrow.")
+    return _write_arrow(frames, lambda schema: pq.ParquetWriter(path, schema))
+
+
+def _write_arrow(frames: Iterator[pd.DataFrame], open_writer: Callable) -> int:
+    """كتابة متزايدة بكاتب Arrow؛ الدفعات اللاحقة تُحوّل لمخطط الدفعة الأولى."""
+    writer, rows = None, 0
+    try:
+        for df in frames:
+            if writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                writer, schema = open_writer(table.schema), table.schema
+            else:
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(df)
+        if writer is None:  # لا صفوف: ملف بالعناوين فقط
+            table = pa.Table.from_pandas(_empty(), preserve_index=False)
+            writer = open_writer(table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+WRITERS: Dict[str, Callable[[Iterator[pd.DataFrame], str], int]] = {
+    "xlsx": _write_xlsx,
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+}
+
+
+def export_formats() -> List[str]:
+    """الصيغ المتاحة في هذه البيئة (parquet فقط مع pyarrow)."""
+    return [f for f in WRITERS if f != "parquet" or pa is not None]
+
+
+@timed("export")
+def write_report(chunks: Iterable[pd.DataFrame], path: str, fmt: Optional[str] = None,
+                 registry: RatioRegistry = REGISTRY) -> int:
+    """كتابة صفوف التقرير دفعةً دفعة إلى path؛ الصيغة من الامتداد إن لم تُحدد.
+
+    لا يبقى في الذاكرة إلا دفعة واحدة في كل لحظة. يعيد عدد الصفوف المكتوبة.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"صيغة تصدير غير مدعومة: {fmt or path}")
+    return WRITERS[fmt]((report_rows(c, registry) for c in chunks), path)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# formatting.py — تنسيق أعمدة أرقام كاملة دفعة واحدة (للجداول والتصدير)
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+MISSING = "—"
+_ARABIC = {"digits": 0x0660, ".": "٫", ",": "٬", "%": "٪"}  # الأرقام الهندية وفواصلها
+_POWERS = 10 ** np.arange(1, 19, dtype=np.int64)
+_FAST_LIMIT = 1e12  # فوق هذا (بعد الضرب في 10^decimals) لا تكفي دقة float64 للتقريب المتجه
+
+
+@dataclass(frozen=True)
+class NumberFormat:
+    """تنسيق أرقام ثابت: عدد الخانات العشرية، نسبة مئوية، فواصل الآلاف، أرقام هندية.
+
+    القيمة الواحدة (__call__) تعطي نفس ناتج fmt_number؛ many() تنسق مصفوفة
+    كاملة ببناء الحروف عدديًا في NumPy بدل f-string لكل خلية، مع الرجوع
+    لتنسيق بايثون فقط للقيم القريبة من نصف الخانة الأخيرة أو الكبيرة جدًا
+    (فالناتج مطابق حرفيًا). الأجزاء الثابتة تُجهز مرة واحدة لكل تنسيق.
+    """
+    decimals: int = 2
+    percent: bool = False
+    thousands: bool = True
+    arabic_digits: bool = False
+    missing: str = MISSING
+
+    # ---------------- الأجزاء المجهزة ----------------
+    @cached_property
+    def _spec(self) -> str:
+        return "{:" + ("," if self.thousands else "") + f".{self.decimals}f" + "}"
+
+    @cached_property
+    def _suffix(self) -> str:
+        if not self.percent:
+            return ""
+        return _ARABIC["%"] if self.arabic_digits else "%"
+
+    @cached_property
+    def _table(self) -> Dict[int, str]:
+        if not self.arabic_digits:
+            return {}
+        table = {ord(str(d)): chr(_ARABIC["digits"] + d) for d in range(10)}
+        table.update({ord("."): _ARABIC["."], ord(","): _ARABIC[","]})
+        return table
+
+    @cached_property
+    def _chars(self) -> Tuple[int, int, int]:
+        """(أساس الأرقام، الفاصلة العشرية، فاصل الآلاف) كنقاط ترميز."""
+        if self.arabic_digits:
+            return _ARABIC["digits"], ord(_ARABIC["."]), ord(_ARABIC[","])
+        return ord("0"), ord("."), ord(",")
+
+    # ---------------- التنسيق ----------------
+    def __call__(self, x) -> str:
+        if x is None or x != x:
+            return self.missing
+        text = self._spec.format(x * 100 if self.percent else x)
+        return text.translate(self._table) + self._suffix if self._table else text + self._suffix
+
+    @cached_property
+    def _groups(self) -> np.ndarray:
+        """حروف كل مجموعة من 3 أرقام (3 × 2001): 0-999 بأصفار بادئة، 1000-1999
+        المجموعة الأولى بمسافات بدل الأصفار، 2000 مسافات فقط."""
+        digit0 = self._chars[0]
+        table = np.full((3, 2001), ord(" "), dtype=np.uint32)
+        for i in range(1000):
+            padded = [digit0 + int(c) for c in f"{i:03d}"]
+            table[:, i] = padded
+            lead = len(str(i))
+            table[3 - lead:, 1000 + i] = padded[3 - lead:]
+        return table
+
+    @cached_property
+    def _fraction(self) -> np.ndarray:
+        """حروف الجزء العشري بأصفار بادئة (decimals × 10^decimals)."""
+        digit0 = self._chars[0]
+        d = self.decimals
+        return np.array([[digit0 + int(c) for c in f"{i:0{d}d}"] for i in range(10 ** d)],
+                        dtype=np.uint32).reshape(10 ** d, d).T
+
+    def many(self, values) -> np.ndarray:
+        """مصفوفة نصوص (dtype=str) بنفس شكل values؛ NaN ← missing."""
+        v = np.asarray(values, dtype=np.float64)
+        shape = v.shape
+        x = v.ravel() * 100 if self.percent else v.ravel()
+        scale = 10 ** self.decimals
+        n = len(x)
+
+        y = np.abs(x) * scale
+        valid = ~np.isnan(x)
+        with np.errstate(invalid="ignore"):
+            frac = y - np.floor(y)
+            tie = np.abs(frac - 0.5) <= y * 4e-16 + 1e-9   # التقريب قد يختلف عن التمثيل العشري الدقيق
+            slow = valid & ~(y < _FAST_LIMIT) | valid & tie   # يشمل ±inf
+        fast = valid & ~slow
+
+        q = np.rint(np.where(fast, y, 0)).astype(np.int64)
+        integer, fraction = np.divmod(q, scale)
+        n_int = 1 + np.searchsorted(_POWERS, integer, side="right")
+        n_groups = (n_int + 2) // 3
+        negative = np.signbit(x) & fast
+        suffix = [ord(c) for c in self._suffix]
+        tail = len(suffix) + (self.decimals + 1 if self.decimals else 0)
+        length = negative + n_int + ((n_int - 1) // 3 if self.thousands else 0) + tail
+
+        groups = int(n_groups.max(initial=1))
+        fallback = [self(float(t)) for t in v.ravel()[slow]] if slow.any() else []
+        width = max(tail + 3 * groups + (groups - 1 if self.thousands else 0) + 1,
+                    len(self.missing), *map(len, fallback))
+        digit0, point, comma = self._chars
+
+        # صف لكل موضع حرف (من اليمين) وعمود لكل قيمة: كل كتابة متصلة في الذاكرة،
+        # والأرقام تُؤخذ ثلاثة ثلاثة من جدول بدل قسمة لكل رقم
+        chars = np.full((width, n), ord(" "), dtype=np.uint32)
+        row = width
+        for ch in reversed(suffix):
+            row -= 1
+            chars[row] = ch
+        if self.decimals:
+            row -= self.decimals
+            if self.decimals <= 4:
+                chars[row:row + self.decimals] = np.take(self._fraction, fraction, axis=1)
+            else:
+                for k in range(self.decimals):
+                    chars[row + self.decimals - 1 - k] = digit0 + fraction // 10 ** k % 10
+            row -= 1
+            chars[row] = point
+        rest = integer
+        for g in range(groups):
+            if g and self.thousands:
+                row -= 1
+                chars[row] = np.where(n_groups > g, comma, ord(" "))
+            rest, part = np.divmod(rest, 1000)
+            # بعد آخر مجموعة part = 0 فيكفي الجمع: 1000 للأولى و2000 لما بعدها
+            part += 1000 * (n_groups == g + 1) + 2000 * (n_groups <= g)
+            row -= 3
+            chars[row:row + 3] = np.take(self._groups, part, axis=1)
+        neg = np.flatnonzero(negative)
+        chars[width - length[neg], neg] = ord("-")
+
+        # np.char (لا np.strings) ليعمل مع NumPy 1.x؛ astype يعيد العرض الكامل للرجوع و missing
+        text = np.char.lstrip(np.ascontiguousarray(chars.T).view(f"<U{width}").ravel()).astype(f"<U{width}")
+        text[slow] = fallback
+        text[~valid] = self.missing
+        return text.reshape(shape)
+
+
+@lru_cache(maxsize=None)
+def number_format(decimals: int = 2, percent: bool = False, thousands: bool = True,
+                  arabic_digits: bool = False, missing: str = MISSING) -> NumberFormat:
+    """نفس الكائن لنفس الخيارات، فأجزاؤه المجهزة لا تُبنى إلا مرة."""
+    return NumberFormat(decimals, percent, thousands, arabic_digits, missing)
+
+
+def format_numbers(values, percent: bool = False, decimals: int = 2, thousands: bool = True,
+                   arabic_digits: bool = False) -> np.ndarray:
+    """تنسيق مصفوفة/عمود أرقام كاملًا مثل fmt_number لكل قيمة (NaN ← —)."""
+    return number_format(decimals, percent, thousands, arabic_digits).many(values)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# panel.py
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ratios import FinancialInputs, FinancialInputsBatch, inputs_from_workbook
+from timing import timed
+
+COMPANY_COLUMN = "company"
+YEAR_COLUMN = "year"
+SECTOR_COLUMN = "sector"  # اختياري: قطاع الشركة لمقارنتها بنظيراتها (peers.py)
+DEFAULT_COMPANY = "الشركة"
+
+Key = Tuple[Hashable, Hashable]
+
+# حقل الفترة السابقة ← الحقل الذي يُؤخذ من السنة السابقة لنفس الشركة
+PRIOR_FIELDS = {
+    "prev_total_assets": "total_assets",
+    "prev_inventory": "inventory",
+    "prev_accounts_receivable": "accounts_receivable",
+    "prev_accounts_payable": "accounts_payable",
+}
+
+
+def add_prior_period(inputs: pd.DataFrame, companies, years) -> pd.DataFrame:
+    """تعبئة أعمدة prev_* من السنة السابقة لنفس الشركة بإزاحة واحدة مجمّعة.
+
+    تُعبأ القيمة فقط إذا كانت السنة السابقة هي year - 1 فعلًا؛ عند وجود
+    فجوة (مثل 2019 ثم 2021) تبقى NaN فيُستخدم رصيد نهاية الفترة كما في avg.
+    القيم الموجودة مسبقًا في أعمدة prev_* لا تُستبدل. الفترة المكررة تُؤخذ
+    من أول صف لها كما في Panel، وكل صفوفها تأخذ نفس قيم السنة السابقة.
+    """
+    sources = [src for src in PRIOR_FIELDS.values() if src in inputs.columns]
+    keyed = pd.DataFrame({
+        "company": np.asarray(companies),
+        "year": pd.to_numeric(pd.Series(np.asarray(years)), errors="coerce").to_numpy(),
+        **{src: inputs[src].to_numpy() for src in sources},
+    }).sort_values(["company", "year"], kind="stable")
+
+    # الترتيب ثابت فالصفوف المكررة متجاورة وأولها هو الأول في الملف
+    first = ~keyed.duplicated(["company", "year"], keep="first").to_numpy()
+    unique = keyed[first]
+    grouped = unique.groupby("company", sort=False)
+    prev = grouped[sources].shift(1)
+    consecutive = (unique["year"] - grouped["year"].shift(1)) == 1
+    prev[~consecutive] = np.nan
+    prev = prev.iloc[np.cumsum(first) - 1].set_axis(keyed.index)
+    prev = prev.sort_index()  # الرجوع لترتيب الصفوف الأصلي
+
+    out = inputs.copy()
+    for target, src in PRIOR_FIELDS.items():
+        if src not in sources:
+            continue
+        filled = prev[src].to_numpy()
+        if target in out.columns:
+            filled = out[target].fillna(pd.Series(filled, index=out.index)).to_numpy()
+        out[target] = filled
+    return out
+
+
+class Panel:
+    """بيانات عدة شركات × عدة سنوات مع فهرس جاهز (الشركة، السنة) ← رقم الصف.
+
+    يُبنى مرة واحدة لكل نسخة من البيانات؛ بعدها كل بحث عن فترة O(1) بدل
+    مسح الإطار كاملًا بـ df[df["year"] == year]. الصف المكرر لنفس المفتاح
+    يُتجاهل (يُعتمد الأول كما في ‎.iloc[0]‎).
+    """
+
+    @timed("panel")
+    def __init__(self, df: pd.DataFrame, default_company: Hashable = DEFAULT_COMPANY):
+        self.frame = df
+        if COMPANY_COLUMN in df.columns:
+            companies = df[COMPANY_COLUMN].to_numpy()
+        else:
+            companies = np.full(len(df), default_company, dtype=object)
+        years = df[YEAR_COLUMN].to_numpy()
+        if SECTOR_COLUMN in df.columns:
+            self.sectors = df[SECTOR_COLUMN].to_numpy(dtype=object)
+        else:
+            self.sectors = np.full(len(df), None, dtype=object)
+
+        self._pos: Dict[Key, int] = {}
+        self._years: Dict[Hashable, List[Hashable]] = {}
+        for i, key in enumerate(zip(companies.tolist(), years.tolist())):
+            if key not in self._pos:
+                self._pos[key] = i
+                self._years.setdefault(key[0], []).append(key[1])
+        self.companies: List[Hashable] = list(self._years)
+
+        self.inputs = add_prior_period(inputs_from_workbook(df), companies, years)
+        self.batch = FinancialInputsBatch.from_frame(self.inputs)
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._pos
+
+    def years(self, companies: Optional[Iterable[Hashable]] = None) -> List[Hashable]:
+        """سنوات الشركات المختارة بترتيب ظهورها في الملف، بلا تكرار."""
+        out: Dict[Hashable, None] = {}
+        for c in (self.companies if companies is None else companies):
+            out.update(dict.fromkeys(self._years.get(c, ())))
+        return list(out)
+
+    def keys(self, companies: Optional[Iterable[Hashable]] = None,
+             years: Optional[Iterable[Hashable]] = None) -> List[Key]:
+        """المفاتيح الموجودة فعلًا من حاصل ضرب الشركات × السنوات المختارة."""
+        companies = self.companies if companies is None else list(companies)
+        if years is None:
+            return [(c, y) for c in companies for y in self._years.get(c, ())]
+        years = list(years)
+        return [(c, y) for c in companies for y in years if (c, y) in self._pos]
+
+    def positions(self, keys: Iterable[Key]) -> np.ndarray:
+        """أرقام صفوف المفاتيح (بنفس ترتيبها) للتقطيع المتجه."""
+        keys = list(keys)
+        return np.fromiter((self._pos[k] for k in keys), dtype=np.intp, count=len(keys))
+
+    def sector(self, company: Hashable) -> Optional[Hashable]:
+        """قطاع الشركة كما في أول صف لها (None إن لم يوجد عمود القطاع)."""
+        year = self._years[company][0]
+        sector = self.sectors[self._pos[(company, year)]]
+        return None if pd.isna(sector) else sector
+
+    def row(self, company: Hashable, year: Hashable) -> pd.Series:
+        return self.frame.iloc[self._pos[(company, year)]]
+
+    @timed("financial_inputs")
+    def inputs_for(self, company: Hashable, year: Hashable) -> FinancialInputs:
+        return self.batch[self._pos[(company, year)]]
+
+    def select(self, companies: Optional[Iterable[Hashable]] = None,
+               years: Optional[Iterable[Hashable]] = None) -> pd.DataFrame:
+        """أعمدة حقول FinancialInputs للفترات المختارة بفهرس (company, year)،
+        جاهزة لـ compute_ratios_frame."""
+        keys = self.keys(companies, years)
+        index = pd.MultiIndex.from_tuples(keys, names=[COMPANY_COLUMN, YEAR_COLUMN])
+        return pd.DataFrame(self.batch[self.positions(keys)].columns, index=index)
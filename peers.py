@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# peers.py — مقارنة كل شركة بنظيراتها في نفس القطاع ونفس السنة
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from cube import RatioCube
+from panel import SECTOR_COLUMN, YEAR_COLUMN
+from ratios import Selection
+from timing import timed
+
+MIN_PEERS = 4            # أقل عدد شركات بقيمة للنسبة حتى يكون للترتيب معنى
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _group_ids(*keys: np.ndarray) -> np.ndarray:
+    """رقم مجموعة لكل صف من تركيبة المفاتيح (NaN إن كان أحدها مفقودًا)."""
+    n = len(keys[0])
+    combined = np.zeros(n, dtype=np.int64)
+    missing = np.zeros(n, dtype=bool)
+    for key in keys:
+        codes, uniques = pd.factorize(key)
+        missing |= codes < 0
+        combined = combined * (len(uniques) + 1) + codes
+    ids = pd.factorize(combined)[0].astype(np.float64)
+    ids[missing] = np.nan
+    return ids
+
+
+def _rank_and_quartiles(values: pd.DataFrame, groups: np.ndarray, min_peers: int):
+    """ترتيب مئوي (منتصف الرتبة) وربيعيات كل مجموعة، مصفوفة لكل منها بشكل values."""
+    if np.isnan(groups).all():  # لا مجموعات (مثلًا ملف بلا عمود قطاع)
+        empty = np.full(values.shape, np.nan)
+        return empty, np.zeros(values.shape, dtype=np.int32), [empty] * len(QUANTILES)
+    g = values.groupby(groups, sort=False)
+    counts = np.nan_to_num(g.transform("count").to_numpy(dtype=np.float64)).astype(np.int32)
+    enough = counts >= min_peers
+    pct = np.where(enough, (g.rank().to_numpy() - 0.5) / np.maximum(counts, 1) * 100, np.nan)
+    qs = [np.where(enough, g.quantile(q).reindex(groups).to_numpy(), np.nan) for q in QUANTILES]
+    return pct, counts, qs
+
+
+# ---------------- النتيجة لكل نسبة ----------------
+@dataclass(frozen=True)
+class PeerContext:
+    ratio: str
+    sector: Optional[Hashable]
+    peers: int                       # شركات القطاع في نفس السنة التي لها قيمة
+    percentile: Optional[float]      # 0-100 داخل القطاع
+    universe_percentile: Optional[float]  # 0-100 بين كل شركات السنة
+    q1: Optional[float]
+    median: Optional[float]
+    q3: Optional[float]
+
+    @property
+    def quartile(self) -> Optional[int]:
+        """1 (الربع الأدنى) إلى 4 (الأعلى) حسب الترتيب داخل القطاع."""
+        if self.percentile is None:
+            return None
+        return min(int(self.percentile // 25) + 1, 4)
+
+
+def _opt(x) -> Optional[float]:
+    return None if x != x else float(x)
+
+
+class PeerRanks:
+    """ترتيب كل (شركة، سنة) لكل نسبة مقابل شركات قطاعها وكل شركات السنة.
+
+    يُحسب مرة واحدة من مكعب النسب بعمليات groupby مجمّعة على كل الأعمدة معًا،
+    ويُخزن لكل نسخة من البيانات (data_loader.load_peers)، فالعرض مجرد فهرسة.
+    القطاع من عمود sector في الملف؛ بدونه يبقى الترتيب على مستوى السنة فقط.
+    المجموعة التي فيها أقل من min_peers قيمة لا تُرتب (NaN).
+    """
+
+    @timed("peer_ranks")
+    def __init__(self, cube: RatioCube, min_peers: int = MIN_PEERS):
+        self.cube = cube
+        self.min_peers = min_peers
+        panel = cube.panel
+        values = pd.DataFrame(cube.values, columns=list(cube.ratios))
+        years = panel.frame[YEAR_COLUMN].to_numpy()
+        by_sector = _group_ids(panel.sectors, years)
+        by_year = _group_ids(years)
+        # الصف المكرر لنفس (الشركة، السنة) ليس نظيرًا إضافيًا: يُعتمد الأول فقط كما في Panel
+        duplicate = np.ones(len(values), dtype=bool)
+        duplicate[panel.positions(panel.keys())] = False
+        by_sector[duplicate] = np.nan
+        by_year[duplicate] = np.nan
+
+        self.percentile, self.peers, (self.q1, self.median, self.q3) = _rank_and_quartiles(
+            values, by_sector, min_peers)
+        self.universe_percentile, self.universe_peers, _ = _rank_and_quartiles(values, by_year, min_peers)
+
+    def context(self, company: Hashable, year: Hashable, key: str) -> PeerContext:
+        i = self.cube.panel.positions([(company, year)])[0]
+        j = self.cube.ratios.index(key)
+        sector = self.cube.panel.sectors[i]
+        return PeerContext(
+            ratio=key,
+            sector=None if pd.isna(sector) else sector,
+            peers=int(self.peers[i, j]),
+            percentile=_opt(self.percentile[i, j]),
+            universe_percentile=_opt(self.universe_percentile[i, j]),
+            q1=_opt(self.q1[i, j]), median=_opt(self.median[i, j]), q3=_opt(self.q3[i, j]),
+        )
+
+    def long(self, companies: Optional[Iterable[Hashable]] = None, years: Optional[Iterable[Hashable]] = None,
+             select: Selection = None) -> pd.DataFrame:
+        """جدول cube.long مع القطاع والترتيب المئوي والربيعيات لكل صف."""
+        cube = self.cube
+        keys = cube.panel.keys(companies, years)
+        cols = cube.columns(select)
+        rows = cube.panel.positions(keys)
+        j = np.fromiter((cube.ratios.index(k) for k in cols), dtype=np.intp, count=len(cols))
+        out = cube.long(companies, years, select)
+        out.insert(1, SECTOR_COLUMN, pd.Index(cube.panel.sectors[rows]).repeat(len(cols)))
+        for name in ("percentile", "universe_percentile", "q1", "median", "q3"):
+            out[name] = getattr(self, name)[np.ix_(rows, j)].ravel()
+        out["peers"] = self.peers[np.ix_(rows, j)].ravel()
+        return out
@@ -1,10 +1,24 @@
 # -*- coding: utf-8 -*-
 # ratios.py
-from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from bisect import bisect_right
+from dataclasses import dataclass, field, fields
+from functools import cached_property, lru_cache
+from operator import itemgetter
+from string import Formatter
+from typing import Optional, Dict, Any, List, Mapping, Callable, Tuple, Iterable, Union
 
-@dataclass
+import numpy as np
+import pandas as pd
+
+from timing import timed
+
+_NAN_KEY = ("nan",)  # NaN != NaN، فنستبدله بقيمة ثابتة داخل مفتاح التجزئة
+
+
+@dataclass(frozen=True, slots=True, eq=False)
 class FinancialInputs:
+    """مدخلات فترة واحدة. غير قابلة للتعديل وتُقارن وتُجزأ بالقيمة،
+    لذلك تصلح مفتاحًا للتخزين المؤقت (انظر compute_ratios_cached)."""
     sales: float = 0.0
     cogs: float = 0.0
     opex: float = 0.0
@@ -29,6 +43,30 @@ class FinancialInputs:
 
     cfo: float = 0.0
 
+    def _key(self) -> tuple:
+        return tuple(_NAN_KEY if v != v else v for v in (getattr(self, n) for n in INPUT_FIELDS))
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+
+INPUT_FIELDS = tuple(f.name for f in fields(FinancialInputs))
+OPTIONAL_FIELDS = frozenset(f.name for f in fields(FinancialInputs) if f.default is None)
+
+
+def inputs_from_values(values: Mapping[str, Any]) -> FinancialInputs:
+    """بناء FinancialInputs من قيم خام؛ NaN في الحقول الاختيارية يعني None."""
+    kw = {}
+    for name in INPUT_FIELDS:
+        if name in values:
+            v = values[name]
+            kw[name] = None if name in OPTIONAL_FIELDS and v is not None and v != v else v
+    return FinancialInputs(**kw)
 
 # ---------------- أدوات مساعدة ----------------
 def safe_div(n, d) -> Optional[float]:
@@ -40,14 +78,24 @@ def safe_div(n, d) -> Optional[float]:
         return None
 
 def avg(curr: float, prev: Optional[float]) -> float:
-    if prev is None or prev == 0:
+    # NaN مثل None (قيمة سابقة غير متاحة) كما في avg_array
+    if prev is None or prev != prev or prev == 0:
         return curr
     return (curr + prev) / 2.0
 
-def compute_derived(fi: FinancialInputs) -> Dict[str, float]:
-    ebit = (fi.sales - fi.cogs - fi.opex)
-    net_income = fi.net_income if fi.net_income is not None else (ebit - fi.interest_expense - fi.tax_expense)
-    return {"ebit": ebit, "net_income": net_income}
+def safe_div_array(n, d) -> np.ndarray:
+    """مثل safe_div لكن على مصفوفات: المقام الصفري يعطي NaN بدل None."""
+    n, d = np.broadcast_arrays(np.asarray(n, dtype=np.float64), np.asarray(d, dtype=np.float64))
+    out = np.full(n.shape, np.nan)
+    np.divide(n, d, out=out, where=(d != 0))
+    return out
+
+
+def avg_array(curr, prev) -> np.ndarray:
+    """مثل avg: القيمة السابقة المفقودة (NaN) أو الصفرية تُهمل."""
+    curr = np.asarray(curr, dtype=np.float64)
+    prev = np.asarray(prev, dtype=np.float64)
+    return np.where(np.isnan(prev) | (prev == 0), curr, (curr + prev) / 2.0)
 
 # ---------------- تنسيق الأرقام ----------------
 def fmt_number(x: Optional[float], is_percent: bool = False) -> str:
@@ -65,282 +113,900 @@ def format_equation(ar: str, en: str, numbers: str) -> Dict[str, str]:
     }
 
 # ---------------- التفسيرات ----------------
-def interpret_current_ratio(x): 
-    if x is None: return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    if x < 1: return ("منخفضة (<1).", "Low (<1).")
-    if 1 <= x <= 2: return ("ضمن النطاق (1–2).", "Acceptable (1–2).")
-    return ("مرتفعة (>2).", "High (>2).")
+_NO_DATA = ("لا يمكن تقييم النسبة.", "Not enough data.")
+
+
+@dataclass(frozen=True)
+class BandTable:
+    """فئات تفسير نسبة: حدود تصاعدية ونص عربي/إنجليزي لكل فئة.
+
+    upper[i] تحدد أين تقع القيمة المساوية للحد edges[i]: True في الفئة
+    الأعلى (x >= حد)، وFalse في الأدنى (x <= حد). scale تضرب القيمة قبل
+    المقارنة (الهوامش تُقارن كنسب مئوية). missing نص القيمة غير المتاحة.
+
+    التصنيف يعيد رموزًا صغيرة (int8، ‎-1 لغير المتاح)؛ النص يُجلب من labels
+    فقط عند العرض (label، texts، categorical).
+    """
+    edges: Tuple[float, ...]
+    upper: Tuple[bool, ...]
+    labels: Tuple[Tuple[str, str], ...]
+    scale: float = 1.0
+    missing: Tuple[str, str] = _NO_DATA
+
+    @classmethod
+    def fixed(cls, ar: str, en: str) -> "BandTable":
+        """تفسير ثابت بلا حدود (فئة واحدة، ونفس النص حتى بلا قيمة)."""
+        return cls((), (), ((ar, en),), missing=(ar, en))
+
+    def code(self, x: Optional[float]) -> int:
+        """رقم الفئة (0 للأدنى)، و-1 إن كانت القيمة غير متاحة."""
+        if x is None or x != x:
+            return -1
+        x = x * self.scale
+        # عدد الحدود <= x، ثم الحد المساوي لـ x يُرجع للفئة الأدنى إن لم يكن upper
+        code = bisect_right(self.edges, x)
+        if code and x == self.edges[code - 1] and not self.upper[code - 1]:
+            code -= 1
+        return code
+
+    def codes(self, values) -> np.ndarray:
+        """نفس code() على مصفوفة كاملة بـ searchsorted: int8 و-1 مكان NaN."""
+        v = np.asarray(values, dtype=np.float64)
+        if self.scale != 1:
+            v = v * self.scale
+        # عدد الحدود <= x، ثم الحد المساوي لـ x يُرجع للفئة الأدنى إن لم يكن upper
+        out = np.searchsorted(np.asarray(self.edges, dtype=np.float64), v, side="right").astype(np.int8)
+        for e, up in zip(self.edges, self.upper):
+            if not up:
+                out -= v == e
+        out[np.isnan(v)] = -1
+        return out
+
+    def label(self, code: int) -> Tuple[str, str]:
+        return self.missing if code < 0 else self.labels[code]
+
+    def _lookup(self, lang: str) -> np.ndarray:
+        i = {"ar": 0, "en": 1}[lang]
+        return np.array([l[i] for l in self.labels] + [self.missing[i]], dtype=object)
+
+    def texts(self, codes, lang: str = "ar") -> np.ndarray:
+        """نصوص رموز codes (لغة واحدة) بفهرسة واحدة؛ ‎-1 يقع على نص missing الأخير."""
+        return self._lookup(lang)[np.asarray(codes)]
+
+    def categorical(self, codes, lang: str = "ar") -> pd.Categorical:
+        """الرموز كـ Categorical (النصوص مخزنة مرة واحدة فقط)؛ ‎-1 ← نص missing."""
+        positions, categories = pd.factorize(self._lookup(lang))  # النص المكرر فئة واحدة
+        return pd.Categorical.from_codes(positions[np.asarray(codes)], categories)
+
+    def __call__(self, x: Optional[float]) -> Tuple[str, str]:
+        code = self.code(x)
+        return self.missing if code < 0 else self.labels[code]
+
+    def named(self, ar: str, en: str) -> "BandTable":
+        """نسخة بنصوص مسبوقة باسم النسبة (قوالب {ar}/{en})."""
+        labels = tuple((a.format(ar=ar), b.format(en=en)) for a, b in self.labels)
+        missing = (self.missing[0].format(ar=ar), self.missing[1].format(en=en))
+        return BandTable(self.edges, self.upper, labels, self.scale, missing)
+
+
+CURRENT_RATIO_BANDS = BandTable(
+    (1, 2), (True, False),
+    (("منخفضة (<1).", "Low (<1)."),
+     ("ضمن النطاق (1–2).", "Acceptable (1–2)."),
+     ("مرتفعة (>2).", "High (>2).")))
+
+QUICK_RATIO_BANDS = BandTable(
+    (0.8, 1), (True, True),
+    (("ضعيفة (<0.8).", "Weak (<0.8)."),
+     ("متوسطة (≈1).", "Moderate (≈1)."),
+     ("جيدة (≥1).", "Good (≥1).")))
+
+CASH_RATIO_BANDS = BandTable(
+    (0.2, 0.5), (True, True),
+    (("ضعيفة (<0.2).", "Weak (<0.2)."),
+     ("متوسطة (0.2–0.5).", "Moderate (0.2–0.5)."),
+     ("مطمئنة (≥0.5).", "Comfortable (≥0.5).")))
+
+DEBT_RATIO_BANDS = BandTable(
+    (0.4, 0.6), (True, False),
+    (("منخفضة (<40%).", "Low (<40%)."),
+     ("متوازنة (40–60%).", "Balanced (40–60%)."),
+     ("مرتفعة (>60%).", "High (>60%).")))
+
+DTE_BANDS = BandTable(
+    (1, 2), (True, False),
+    (("منخفضة (<1).", "Low (<1)."),
+     ("متوسطة (1–2).", "Moderate (1–2)."),
+     ("مرتفعة (>2).", "High (>2).")))
+
+MARGIN_BANDS = BandTable(
+    (25, 30, 35), (True, True, False),
+    (("{ar} ضعيف (<25%).", "{en} Weak (<25%)."),
+     ("{ar} متوسط (25–30%).", "{en} Moderate (25–30%)."),
+     ("{ar} جيد (30–35%).", "{en} Good (30–35%)."),
+     ("{ar} ممتاز (>35%).", "{en} Excellent (>35%).")),
+    scale=100)
+
+
+def interpret_current_ratio(x):
+    return CURRENT_RATIO_BANDS(x)
 
 def interpret_quick_ratio(x):
-    if x is None: return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    if x < 0.8: return ("ضعيفة (<0.8).", "Weak (<0.8).")
-    if 0.8 <= x < 1: return ("متوسطة (≈1).", "Moderate (≈1).")
-    return ("جيدة (≥1).", "Good (≥1).")
+    return QUICK_RATIO_BANDS(x)
 
 def interpret_cash_ratio(x):
-    if x is None: return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    if x < 0.2: return ("ضعيفة (<0.2).", "Weak (<0.2).")
-    if 0.2 <= x < 0.5: return ("متوسطة (0.2–0.5).", "Moderate (0.2–0.5).")
-    return ("مطمئنة (≥0.5).", "Comfortable (≥0.5).")
+    return CASH_RATIO_BANDS(x)
 
 def interpret_debt_ratio(x):
-    if x is None: return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    if x > 0.6: return ("مرتفعة (>60%).", "High (>60%).")
-    if 0.4 <= x <= 0.6: return ("متوازنة (40–60%).", "Balanced (40–60%).")
-    return ("منخفضة (<40%).", "Low (<40%).")
+    return DEBT_RATIO_BANDS(x)
 
 def interpret_dte(x):
-    if x is None: return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    if x > 2: return ("مرتفعة (>2).", "High (>2).")
-    if 1 <= x <= 2: return ("متوسطة (1–2).", "Moderate (1–2).")
-    return ("منخفضة (<1).", "Low (<1).")
+    return DTE_BANDS(x)
 
 def interpret_margin(x, ar, en):
-    if x is None:
-        return ("لا يمكن تقييم النسبة.", "Not enough data.")
-    
-    pct = x * 100
+    return MARGIN_BANDS.named(ar, en)(x)
 
-    if pct < 25:
-        return (f"{ar} ضعيف (<25%).", f"{en} Weak (<25%).")
-    elif 25 <= pct < 30:
-        return (f"{ar} متوسط (25–30%).", f"{en} Moderate (25–30%).")
-    elif 30 <= pct <= 35:
-        return (f"{ar} جيد (30–35%).", f"{en} Good (30–35%).")
-    else:
-        return (f"{ar} ممتاز (>35%).", f"{en} Excellent (>35%).")
 
 
+# ---------------- العمليات: قيم مفردة أو مصفوفات ----------------
+class ScalarOps:
+    """عمليات المسار الفردي: None (أو NaN) تعني قيمة غير متاحة."""
+    div = staticmethod(safe_div)
+    avg = staticmethod(avg)
+
+    @staticmethod
+    def coalesce(value, fallback):
+        return value if value is not None and value == value else fallback
+
+
+class ArrayOps:
+    """نفس العمليات على مصفوفات NumPy: NaN تعني قيمة غير متاحة."""
+    div = staticmethod(safe_div_array)
+    avg = staticmethod(avg_array)
+
+    @staticmethod
+    def coalesce(value, fallback):
+        return np.where(np.isnan(value), fallback, value)
+
+
+# ---------------- سجل النسب ----------------
+def _ratio_of(ops, numerator, denominator):
+    return ops.div(numerator, denominator)
+
+
+@dataclass(frozen=True)
+class Node:
+    """قيمة وسيطة مشتركة (مثل EBIT أو المتوسطات) تُحسب مرة واحدة لكل تقييم.
+
+    fn تستقبل ops (ScalarOps أو ArrayOps) ثم قيم inputs بالترتيب، لذا
+    يجب أن تعمل على الأرقام والمصفوفات معًا.
+    """
+    name: str
+    inputs: Tuple[str, ...]
+    fn: Callable[..., Any]
+
+
+@dataclass(frozen=True)
+class RatioSpec:
+    """تعريف نسبة: المعادلة ومدخلاتها ومجموعتها وتفسيرها ونصوصها بالعربية والإنجليزية.
+
+    formula تستقبل ops ثم قيم inputs (الافتراضي: الأول ÷ الثاني). قالب
+    substitution يشير إلى أسماء حقول أو قيم وسيطة بين {}. analysis دالة
+    تفسير، أو BandTable عندما يقوم التفسير على حدود رقمية.
+    """
+    group: str
+    name: str
+    name_en: str
+    equation: str
+    equation_en: str
+    substitution: str
+    explain: str
+    explain_en: str
+    analysis: Callable[[Optional[float]], Tuple[str, str]]
+    is_percent: bool = False
+    inputs: Tuple[str, ...] = ()
+    formula: Callable[..., Any] = _ratio_of
+
+    @property
+    def key(self) -> str:
+        return self.name_en
+
+    @property
+    def table(self) -> Optional[BandTable]:
+        """جدول التفسير إن كان التحليل BandTable (كل نسب السجل المدمجة)."""
+        return self.analysis if isinstance(self.analysis, BandTable) else None
+
+    @property
+    def bands(self) -> Optional[BandTable]:
+        """فئات التفسير إن كان التحليل مبنيًا على حدود رقمية."""
+        table = self.table
+        return table if table is not None and table.edges else None
+
+    @cached_property
+    def text_inputs(self) -> Tuple[str, ...]:
+        """الأسماء المستخدمة في قالب التعويض (تلزم فقط عند عرض المعادلة).
+
+        يُفكك القالب مرة واحدة لكل نسبة (أول مرة عند التسجيل في register).
+        """
+        return tuple(f for _, f, _, _ in Formatter().parse(self.substitution) if f)
+
+    @cached_property
+    def _equation_template(self) -> Tuple[str, Callable[[Mapping[str, str]], tuple], str, str, str, str]:
+        """ناتج format_equation لهذه النسبة مجهزًا مرة واحدة: قالب التعويض بصيغة
+        %s مع دالة تجلب أرقامه بالترتيب، ثم بداية ونهاية كل لغة حول نص التعويض."""
+        parts = list(Formatter().parse(self.substitution))
+        template = "".join(text.replace("%", "%%") + ("%s" if name else "") for text, name, _, _ in parts)
+        mark = "\x00"
+        eq = format_equation(self.equation, self.equation_en, mark)
+        ar_head, ar_tail = eq["ar"].split(mark)
+        en_head, en_tail = eq["en"].split(mark)
+        return template, _getter(tuple(name for _, name, _, _ in parts if name)), ar_head, ar_tail, en_head, en_tail
+
+
+Selection = Union[None, str, Iterable[str]]
+
+
+def _getter(names: Tuple[str, ...]) -> Callable[[Mapping[str, Any]], tuple]:
+    """دالة تعيد قيم names من القاموس كصف دائمًا (itemgetter بعنصر واحد يعيد القيمة نفسها)."""
+    if len(names) == 1:
+        get = itemgetter(names[0])
+        return lambda ns: (get(ns),)
+    return itemgetter(*names) if names else lambda ns: ()
+
+
+class RatioRegistry:
+    """النسب والقيم الوسيطة كرسم اعتماديات (DAG).
+
+    plan() يرتب العقد المطلوبة طوبولوجيًا مرة واحدة ويخزن الخطة، وevaluate()
+    يمر عليها بالترتيب فتُحسب كل قيمة وسيطة مرة واحدة مهما تكرر استخدامها.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, Node] = {}
+        self.ratios: Dict[str, RatioSpec] = {}
+        # مخازن مشتقة من العقد والنسب؛ تُفرغ معًا عند أي إضافة (_invalidate)
+        self._plans: Dict[Tuple[Optional[Tuple[str, ...]], bool], Tuple[Tuple[Node, ...], Tuple[RatioSpec, ...]]] = {}
+        self._node_plans: Dict[Tuple[str, ...], Tuple[Node, ...]] = {}
+        self._steps: Dict[Tuple[Optional[Tuple[str, ...]], bool], Tuple[tuple, tuple]] = {}
+        self._fields: Dict[Tuple[Optional[Tuple[str, ...]], bool], Tuple[str, ...]] = {}
+        self._substitution_names: Dict[Optional[Tuple[str, ...]], Tuple[str, ...]] = {}
+        self._deps: Optional[Dict[str, Tuple[str, ...]]] = None
+
+    def _invalidate(self) -> None:
+        self._plans.clear()
+        self._node_plans.clear()
+        self._steps.clear()
+        self._fields.clear()
+        self._substitution_names.clear()
+        self._deps = None
+
+    def node(self, name: str, inputs: Tuple[str, ...], fn: Callable[..., Any]) -> None:
+        if name in INPUT_FIELDS or name in self.nodes:
+            raise ValueError(f"الاسم مستخدم مسبقًا: {name}")
+        self._check_known(name, inputs)
+        self.nodes[name] = Node(name, tuple(inputs), fn)
+        self._invalidate()
+
+    def register(self, spec: RatioSpec) -> RatioSpec:
+        if spec.key in self.ratios:
+            raise ValueError(f"النسبة معرّفة مسبقًا: {spec.key}")
+        self._check_known(spec.key, spec.inputs + spec.text_inputs)
+        self.ratios[spec.key] = spec
+        self._invalidate()
+        return spec
+
+    def _check_known(self, owner: str, names: Tuple[str, ...]) -> None:
+        unknown = [n for n in names if n not in INPUT_FIELDS and n not in self.nodes]
+        if unknown:
+            raise ValueError(f"{owner}: مدخلات غير معروفة {unknown}")
+
+    def _order(self, roots) -> Tuple[Node, ...]:
+        """العقد الوسيطة اللازمة لـ roots مرتبة بحيث تأتي كل عقدة بعد مدخلاتها."""
+        order: List[Node] = []
+        seen = set(INPUT_FIELDS)
+
+        def visit(name: str) -> None:
+            if name in seen:
+                return
+            seen.add(name)
+            n = self.nodes[name]
+            for dep in n.inputs:
+                visit(dep)
+            order.append(n)
+
+        for name in roots:
+            visit(name)
+        return tuple(order)
+
+    def plan(self, keys: Optional[Tuple[str, ...]] = None,
+             with_text: bool = False) -> Tuple[Tuple[Node, ...], Tuple[RatioSpec, ...]]:
+        """العقد الوسيطة اللازمة للنسب المطلوبة (بترتيب الحساب) ثم النسب نفسها."""
+        cache_key = (keys, with_text)
+        if cache_key not in self._plans:
+            specs = tuple(self.ratios[k] for k in (self.ratios if keys is None else keys))
+            roots = [dep for s in specs for dep in s.inputs + (s.text_inputs if with_text else ())]
+            self._plans[cache_key] = (self._order(roots), specs)
+        return self._plans[cache_key]
+
+    def derive(self, values: Mapping[str, Any], names: Tuple[str, ...], ops=ScalarOps) -> Dict[str, Any]:
+        """قيم وسيطة محددة فقط (مثل ebit) دون حساب أي نسبة."""
+        order = self._node_plans.get(names)
+        if order is None:
+            order = self._node_plans[names] = self._order(names)
+        ns = dict(values)
+        for n in order:
+            ns[n.name] = n.fn(ops, *[ns[i] for i in n.inputs])
+        return {name: ns[name] for name in names}
+
+    def resolve(self, selection: Selection) -> Optional[Tuple[str, ...]]:
+        """تحويل اختيار المستخدم إلى مفاتيح نسب بترتيب السجل.
+
+        يقبل الاسم الإنجليزي أو العربي لنسبة، أو اسم مجموعة (مثل "نسب المديونية")،
+        أو قائمة منها. None تعني كل النسب.
+        """
+        if selection is None:
+            return None
+        if isinstance(selection, str):
+            selection = (selection,)
+        wanted = set()
+        for item in selection:
+            matched = [s.key for s in self.ratios.values() if item in (s.key, s.name, s.group)]
+            if not matched:
+                raise KeyError(f"نسبة أو مجموعة غير معروفة: {item}")
+            wanted.update(matched)
+        return tuple(k for k in self.ratios if k in wanted)
+
+    def required_fields(self, keys: Optional[Tuple[str, ...]] = None, with_text: bool = False) -> Tuple[str, ...]:
+        """حقول FinancialInputs التي تحتاجها النسب المختارة فعلًا (مخزنة مثل plan)."""
+        cache_key = (keys, with_text)
+        cached = self._fields.get(cache_key)
+        if cached is None:
+            nodes, specs = self.plan(keys, with_text)
+            used = {i for n in nodes for i in n.inputs}
+            used.update(i for s in specs for i in s.inputs + (s.text_inputs if with_text else ()))
+            cached = self._fields[cache_key] = tuple(name for name in INPUT_FIELDS if name in used)
+        return cached
+
+    def substitution_names(self, keys: Optional[Tuple[str, ...]] = None) -> Tuple[str, ...]:
+        """كل الأسماء في قوالب التعويض للنسب المختارة (ما تنسقه FormattedOperands)."""
+        cached = self._substitution_names.get(keys)
+        if cached is None:
+            specs = self.plan(keys)[1]
+            cached = self._substitution_names[keys] = tuple(dict.fromkeys(n for s in specs for n in s.text_inputs))
+        return cached
+
+    def field_dependencies(self) -> Dict[str, Tuple[str, ...]]:
+        """حقل الإدخال ← النسب التي تتغير قيمتها أو معادلتها المعروضة إذا تغير."""
+        if self._deps is None:
+            deps: Dict[str, List[str]] = {name: [] for name in INPUT_FIELDS}
+            for key in self.ratios:
+                for name in self.required_fields((key,), with_text=True):
+                    deps[name].append(key)
+            self._deps = {name: tuple(keys) for name, keys in deps.items()}
+        return self._deps
+
+    def affected_by(self, changed: Iterable[str]) -> Tuple[str, ...]:
+        """النسب المتأثرة بتغيير الحقول المعطاة، بترتيب السجل."""
+        deps = self.field_dependencies()
+        hit = {key for name in changed for key in deps[name]}
+        return tuple(k for k in self.ratios if k in hit)
+
+    def evaluate(self, values: Mapping[str, Any], ops=ScalarOps,
+                 keys: Optional[Tuple[str, ...]] = None, with_text: bool = False
+                 ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(القيم الوسيطة مع المدخلات، النسب) لمجموعة مدخلات واحدة أو أعمدة كاملة."""
+        steps = self._steps.get((keys, with_text))
+        if steps is None:
+            nodes, specs = self.plan(keys, with_text)
+            steps = self._steps[(keys, with_text)] = (
+                tuple((n.name, n.fn, _getter(n.inputs)) for n in nodes),
+                tuple((s.key, s.formula, _getter(s.inputs)) for s in specs),
+            )
+        node_steps, ratio_steps = steps
+        ns = dict(values)
+        for name, fn, get in node_steps:
+            ns[name] = fn(ops, *get(ns))
+        out = {key: formula(ops, *get(ns)) for key, formula, get in ratio_steps}
+        return ns, out
+
+
+REGISTRY = RatioRegistry()
+
+# --- القيم الوسيطة المشتركة ---
+REGISTRY.node("ebit", ("sales", "cogs", "opex"), lambda ops, s, c, o: s - c - o)
+REGISTRY.node("net_profit", ("net_income", "ebit", "interest_expense", "tax_expense"),
+              lambda ops, ni, ebit, i, t: ops.coalesce(ni, ebit - i - t))
+REGISTRY.node("gross_profit", ("sales", "cogs"), lambda ops, s, c: s - c)
+REGISTRY.node("quick_assets", ("current_assets", "inventory"), lambda ops, ca, inv: ca - inv)
+REGISTRY.node("fixed_assets", ("total_assets", "current_assets"), lambda ops, ta, ca: ta - ca)
+REGISTRY.node("avg_assets", ("total_assets", "prev_total_assets"), lambda ops, c, p: ops.avg(c, p))
+REGISTRY.node("avg_inventory", ("inventory", "prev_inventory"), lambda ops, c, p: ops.avg(c, p))
+REGISTRY.node("avg_receivables", ("accounts_receivable", "prev_accounts_receivable"), lambda ops, c, p: ops.avg(c, p))
+REGISTRY.node("avg_payables", ("accounts_payable", "prev_accounts_payable"), lambda ops, c, p: ops.avg(c, p))
+REGISTRY.node("shares", (), lambda ops: 1.0)  # عدّل 1 → عدد الأسهم الفعلي إذا متاح
+
+_HIGHER_IS_BETTER = BandTable.fixed("أعلى أفضل", "Higher is better")
+
+for _spec in [
+    # --- الأصول ---
+    RatioSpec("نسب الأصول", "نسبة التداول", "Current Ratio",
+              "الأصول المتداولة ÷ الخصوم المتداولة", "Current Assets ÷ Current Liabilities",
+              "{current_assets} ÷ {current_liabilities}",
+              "تقيس قدرة الشركة على سداد الالتزامات قصيرة الأجل.",
+              "Measures ability to pay short-term obligations.",
+              CURRENT_RATIO_BANDS,
+              inputs=("current_assets", "current_liabilities")),
+    RatioSpec("نسب الأصول", "النسبة السريعة", "Quick Ratio",
+              "(الأصول المتداولة − المخزون) ÷ الخصوم المتداولة",
+              "(Current Assets − Inventory) ÷ Current Liabilities",
+              "({current_assets} − {inventory}) ÷ {current_liabilities}",
+              "تستبعد المخزون لقياس السيولة الفورية.",
+              "Excludes inventory for immediate liquidity.",
+              QUICK_RATIO_BANDS,
+              inputs=("quick_assets", "current_liabilities")),
+    RatioSpec("نسب الأصول", "النسبة النقدية", "Cash Ratio",
+              "النقدية ÷ الخصوم المتداولة", "Cash ÷ Current Liabilities",
+              "{cash} ÷ {current_liabilities}",
+              "يقيس تغطية الخصوم بالنقد.",
+              "Covers liabilities with cash.",
+              CASH_RATIO_BANDS,
+              inputs=("cash", "current_liabilities")),
+    # --- الخصوم ---
+    RatioSpec("نسب الخصوم", "نسبة المديونية", "Debt Ratio",
+              "إجمالي الخصوم ÷ إجمالي الأصول", "Total Liabilities ÷ Total Assets",
+              "{total_liabilities} ÷ {total_assets}",
+              "نسبة تمويل الأصول بالديون.",
+              "Assets financed by debt.",
+              DEBT_RATIO_BANDS, is_percent=True,
+              inputs=("total_liabilities", "total_assets")),
+    # --- المبيعات ---
+    RatioSpec("نسب المبيعات", "هامش الربح الإجمالي", "Gross Margin",
+              "(المبيعات − تكلفة المبيعات) ÷ المبيعات", "(Sales − COGS) ÷ Sales",
+              "({sales} − {cogs}) ÷ {sales}",
+              "ربحية النشاط الأساسي.", "Core profitability.",
+              MARGIN_BANDS.named("هامش إجمالي", "Gross Margin"), is_percent=True,
+              inputs=("gross_profit", "sales")),
+    RatioSpec("نسب المبيعات", "هامش التشغيل", "Operating Margin",
+              "EBIT ÷ المبيعات", "EBIT ÷ Sales",
+              "{ebit} ÷ {sales}",
+              "كفاءة النشاط.", "Operating efficiency.",
+              MARGIN_BANDS.named("هامش التشغيل", "Operating Margin"), is_percent=True,
+              inputs=("ebit", "sales")),
+    # --- الربحية ---
+    RatioSpec("نسب الربحية", "هامش صافي الربح", "Net Profit Margin",
+              "صافي الربح ÷ المبيعات", "Net Income ÷ Sales",
+              "{net_profit} ÷ {sales}",
+              "نسبة الربح الصافي.", "Net profit ratio.",
+              MARGIN_BANDS.named("هامش صافي", "Net Margin"), is_percent=True,
+              inputs=("net_profit", "sales")),
+    RatioSpec("نسب الربحية", "العائد على حقوق الملكية (ROE)", "Return on Equity (ROE)",
+              "صافي الربح ÷ حقوق الملكية", "Net Income ÷ Equity",
+              "{net_profit} ÷ {equity}",
+              "عائد الملاك.", "Return on equity.",
+              _HIGHER_IS_BETTER, is_percent=True,
+              inputs=("net_profit", "equity")),
+    RatioSpec("نسب الربحية", "العائد على الأصول (ROA)", "Return on Assets (ROA)",
+              "صافي الربح ÷ متوسط إجمالي الأصول", "Net Income ÷ Avg Total Assets",
+              "{net_profit} ÷ {avg_assets}",
+              "يقيس كفاءة الأصول في توليد الأرباح.",
+              "Efficiency of assets in generating profit.",
+              _HIGHER_IS_BETTER, is_percent=True,
+              inputs=("net_profit", "avg_assets")),
+    RatioSpec("نسب الربحية", "مؤشر كفاءة الربح (BEP)", "Basic Earnings Power Ratio",
+              "EBIT ÷ إجمالي الأصول", "EBIT ÷ Total Assets",
+              "{ebit} ÷ {total_assets}",
+              "يبين قدرة الأصول على توليد أرباح تشغيلية بغض النظر عن الضرائب والفوائد.",
+              "Ability of assets to generate EBIT regardless of tax/interest.",
+              _HIGHER_IS_BETTER, is_percent=True,
+              inputs=("ebit", "total_assets")),
+    # --- المديونية ---
+    RatioSpec("نسب المديونية", "نسبة الدين إلى حقوق الملكية", "Debt to Equity Ratio (D/E)",
+              "إجمالي الخصوم ÷ حقوق الملكية", "Total Liabilities ÷ Equity",
+              "{total_liabilities} ÷ {equity}",
+              "يقيس اعتماد الشركة على الديون مقابل حقوق الملكية.",
+              "Measures reliance on debt vs equity.",
+              DTE_BANDS,
+              inputs=("total_liabilities", "equity")),
+    RatioSpec("نسب المديونية", "تغطية الفوائد", "Interest Coverage",
+              "EBIT ÷ مصروف الفوائد", "EBIT ÷ Interest Expense",
+              "{ebit} ÷ {interest_expense}",
+              "يبين قدرة الأرباح التشغيلية على تغطية مصروف الفوائد.",
+              "Ability of EBIT to cover interest expense.",
+              BandTable.fixed(">1 آمن، <1 خطر", ">1 safe, <1 risky"),
+              inputs=("ebit", "interest_expense")),
+    # --- الأصول ---
+    RatioSpec("نسب الأصول", "دوران المخزون", "Inventory Turnover Ratio",
+              "تكلفة المبيعات ÷ متوسط المخزون", "COGS ÷ Avg Inventory",
+              "{cogs} ÷ {avg_inventory}",
+              "عدد مرات بيع وتجديد المخزون خلال الفترة.",
+              "Times inventory is sold and replaced.",
+              _HIGHER_IS_BETTER,
+              inputs=("cogs", "avg_inventory")),
+    RatioSpec("نسب الأصول", "دوران الذمم المدينة", "Accounts Receivable Turnover",
+              "المبيعات ÷ متوسط الذمم المدينة", "Sales ÷ Avg Accounts Receivable",
+              "{sales} ÷ {avg_receivables}",
+              "عدد مرات تحصيل الذمم خلال الفترة.",
+              "Times receivables collected during period.",
+              _HIGHER_IS_BETTER,
+              inputs=("sales", "avg_receivables")),
+    RatioSpec("نسب الأصول", "دوران الأصول الثابتة", "Fixed Assets Turnover Ratio",
+              "المبيعات ÷ الأصول الثابتة", "Sales ÷ Fixed Assets",
+              "{sales} ÷ {fixed_assets}",
+              "كفاءة الأصول الثابتة في توليد المبيعات.",
+              "Efficiency of fixed assets in generating sales.",
+              _HIGHER_IS_BETTER,
+              inputs=("sales", "fixed_assets")),
+    # --- السوق ---
+    RatioSpec("نسب السوق", "ربحية السهم (EPS)", "Earnings per Share (EPS) Ratio",
+              "صافي الربح ÷ عدد الأسهم", "Net Income ÷ Shares Outstanding",
+              "{net_profit} ÷ {shares}",
+              "يبين نصيب السهم الواحد من صافي الربح.",
+              "Shows net income per share.",
+              _HIGHER_IS_BETTER,
+              inputs=("net_profit", "shares")),
+    RatioSpec("نسب السوق", "نسبة التوزيعات", "Payout Ratio",
+              "الأرباح الموزعة ÷ صافي الربح", "Dividends ÷ Net Income",
+              "{cfo} ÷ {net_profit}",
+              "يبين نسبة صافي الربح التي توزع كأرباح نقدية.",
+              "Portion of net income paid as dividends.",
+              BandTable.fixed("40-60% مناسب", "40-60% reasonable"), is_percent=True,
+              inputs=("cfo", "net_profit")),
+]:
+    REGISTRY.register(_spec)
+
+
+class _lazy:
+    """مثل cached_property لكن بلا قفل (بايثون 3.11 يقفل عند أول قراءة لكل
+    كائن، وهي كلفة ملحوظة مع كائن نتيجة لكل نسبة في كل فترة)."""
+    def __init__(self, fn):
+        self.fn = fn
+        self.name = fn.__name__
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.name] = self.fn(obj)
+        return value
+
+
+class FormattedOperands:
+    """أرقام التعويض لفترة واحدة: تُنسق كلها مرة واحدة عند أول معادلة تُطلب،
+    وتشترك فيها نتائج الفترة فلا يُنسق المدخل المشترك (المبيعات...) لكل نسبة."""
+    __slots__ = ("values", "names", "_text")
+
+    def __init__(self, values: Mapping[str, Any], names: Tuple[str, ...]):
+        self.values, self.names, self._text = values, names, None
+
+    def text(self) -> Dict[str, str]:
+        if self._text is None:
+            values = self.values
+            # NaN من المدخلات ← "—" كما في RatioCube (الذي يحوّلها إلى None)
+            self._text = {name: fmt_number(None if v != v else v)
+                          for name, v in zip(self.names, map(values.__getitem__, self.names))}
+        return self._text
+
+
+@dataclass
+class RatioResult:
+    """قيمة النسبة رقمية خام؛ النصوص (المعادلة، التحليل) تُبنى عند أول طلب فقط."""
+    spec: RatioSpec
+    value: Optional[float]
+    operands: Mapping[str, Any] = field(repr=False, compare=False)
+    numbers: Optional[FormattedOperands] = field(default=None, repr=False, compare=False)  # مشتركة بين نتائج الفترة
+
+    @property
+    def group(self) -> str:
+        return self.spec.group
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def name_en(self) -> str:
+        return self.spec.name_en
+
+    @property
+    def is_percent(self) -> bool:
+        return self.spec.is_percent
+
+    @_lazy
+    def display(self) -> str:
+        return fmt_number(self.value, self.spec.is_percent)
+
+    @property
+    def explain(self) -> str:
+        return self.spec.explain
+
+    @property
+    def explain_en(self) -> str:
+        return self.spec.explain_en
+
+    # اللغتان تُبنيان معًا ويُحفظ النصان كسمتين عاديتين فلا يمر ما بعد أول قراءة بأي دالة
+    def _equation(self) -> Tuple[str, str]:
+        spec = self.spec
+        template, get, ar_head, ar_tail, en_head, en_tail = spec._equation_template
+        numbers = template % get((self.numbers or FormattedOperands(self.operands, spec.text_inputs)).text())
+        ar, en = f"{ar_head}{numbers}{ar_tail}", f"{en_head}{numbers}{en_tail}"
+        self.__dict__.update(equation=ar, equation_en=en)
+        return ar, en
+
+    @_lazy
+    def equation(self) -> str:
+        return self._equation()[0]
+
+    @_lazy
+    def equation_en(self) -> str:
+        return self._equation()[1]
+
+    def _analysis(self) -> Tuple[str, str]:
+        ar, en = self.spec.analysis(self.value)
+        self.__dict__.update(analysis=ar, analysis_en=en)
+        return ar, en
+
+    @_lazy
+    def analysis(self) -> str:
+        return self._analysis()[0]
+
+    @_lazy
+    def analysis_en(self) -> str:
+        return self._analysis()[1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """الشكل القديم (قاموس بقيمة منسقة) لمن يحتاج نصًا جاهزًا."""
+        spec = self.spec
+        return {
+            "group": spec.group, "name": spec.name, "name_en": spec.name_en,
+            "value": self.display,
+            "equation": self.equation, "equation_en": self.equation_en,
+            "explain": spec.explain, "explain_en": spec.explain_en,
+            "analysis": self.analysis, "analysis_en": self.analysis_en,
+        }
+
 
 # ---------------- الحساب ----------------
-def compute_ratios(fi: FinancialInputs) -> List[Dict[str, Any]]:
-    d = compute_derived(fi)
-    ebit, net_income = d["ebit"], d["net_income"]
+def _values_of(fi: FinancialInputs, names: Tuple[str, ...] = INPUT_FIELDS) -> Dict[str, Any]:
+    return {name: getattr(fi, name) for name in names}
 
-    avg_assets = avg(fi.total_assets, fi.prev_total_assets)
-    avg_inv = avg(fi.inventory, fi.prev_inventory)
-    avg_ar = avg(fi.accounts_receivable, fi.prev_accounts_receivable)
-    avg_ap = avg(fi.accounts_payable, fi.prev_accounts_payable)
 
-    current_ratio = safe_div(fi.current_assets, fi.current_liabilities)
-    quick_ratio = safe_div(fi.current_assets - fi.inventory, fi.current_liabilities)
-    cash_ratio = safe_div(fi.cash, fi.current_liabilities)
+def compute_derived(fi: FinancialInputs) -> Dict[str, float]:
+    d = REGISTRY.derive(_values_of(fi), ("ebit", "net_profit"))
+    return {"ebit": d["ebit"], "net_income": d["net_profit"]}
 
-    debt_ratio = safe_div(fi.total_liabilities, fi.total_assets)
-    dte = safe_div(fi.total_liabilities, fi.equity)
-    interest_cov = safe_div(ebit, fi.interest_expense)
 
-    gross_margin = safe_div((fi.sales - fi.cogs), fi.sales)
-    operating_margin = safe_div(ebit, fi.sales)
-    net_margin = safe_div(net_income, fi.sales)
+def compute_values(fi: FinancialInputs, select: Selection = None,
+                   registry: RatioRegistry = REGISTRY) -> Dict[str, Optional[float]]:
+    """القيم الرقمية فقط (بالاسم الإنجليزي)، بلا أي تنسيق.
 
-    roa = safe_div(net_income, avg_assets)
-    roe = safe_div(net_income, fi.equity)
-    cash_conv_ratio = safe_div(fi.cfo, net_income)
+    select يحدد نسبًا أو مجموعات بعينها (انظر RatioRegistry.resolve)؛ عندها لا
+    تُحسب إلا هي والقيم الوسيطة التي تعتمد عليها.
+    """
+    keys = registry.resolve(select)
+    return registry.evaluate(_values_of(fi, registry.required_fields(keys)), keys=keys)[1]
 
-    results = []
 
-    # --- الأصول ---
-    eq = format_equation("الأصول المتداولة ÷ الخصوم المتداولة", "Current Assets ÷ Current Liabilities",
-                         f"{fmt_number(fi.current_assets)} ÷ {fmt_number(fi.current_liabilities)}")
-    ar, en = interpret_current_ratio(current_ratio)
-    results.append({
-        "group":"نسب الأصول","name":"نسبة التداول","name_en":"Current Ratio",
-        "value": fmt_number(current_ratio),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"تقيس قدرة الشركة على سداد الالتزامات قصيرة الأجل.",
-        "explain_en":"Measures ability to pay short-term obligations.",
-        "analysis":ar,"analysis_en":en
-    })
-
-    eq = format_equation("(الأصول المتداولة − المخزون) ÷ الخصوم المتداولة",
-                         "(Current Assets − Inventory) ÷ Current Liabilities",
-                         f"({fmt_number(fi.current_assets)} − {fmt_number(fi.inventory)}) ÷ {fmt_number(fi.current_liabilities)}")
-    ar, en = interpret_quick_ratio(quick_ratio)
-    results.append({
-        "group":"نسب الأصول","name":"النسبة السريعة","name_en":"Quick Ratio",
-        "value": fmt_number(quick_ratio),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"تستبعد المخزون لقياس السيولة الفورية.",
-        "explain_en":"Excludes inventory for immediate liquidity.",
-        "analysis":ar,"analysis_en":en
-    })
-
-    eq = format_equation("النقدية ÷ الخصوم المتداولة","Cash ÷ Current Liabilities",
-                         f"{fmt_number(fi.cash)} ÷ {fmt_number(fi.current_liabilities)}")
-    ar, en = interpret_cash_ratio(cash_ratio)
-    results.append({
-        "group":"نسب الأصول","name":"النسبة النقدية","name_en":"Cash Ratio",
-        "value": fmt_number(cash_ratio),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يقيس تغطية الخصوم بالنقد.",
-        "explain_en":"Covers liabilities with cash.",
-        "analysis":ar,"analysis_en":en
-    })
+@timed()
+def compute_ratios(fi: FinancialInputs, select: Selection = None,
+                   registry: RatioRegistry = REGISTRY) -> List[RatioResult]:
+    keys = registry.resolve(select)
+    values = _values_of(fi, registry.required_fields(keys, with_text=True))
+    operands, out = registry.evaluate(values, keys=keys, with_text=True)
+    numbers = FormattedOperands(operands, registry.substitution_names(keys))
+    # NaN من المدخلات ← None (نفس ما يفعله RatioCube.results) فيظهر "—" لا "nan"
+    return [RatioResult(registry.ratios[key], None if value is None or value != value else float(value),
+                        operands, numbers)
+            for key, value in out.items()]
 
-    # --- الخصوم ---
-    eq = format_equation("إجمالي الخصوم ÷ إجمالي الأصول", "Total Liabilities ÷ Total Assets",
-                         f"{fmt_number(fi.total_liabilities)} ÷ {fmt_number(fi.total_assets)}")
-    ar, en = interpret_debt_ratio(debt_ratio)
-    results.append({
-        "group":"نسب الخصوم","name":"نسبة المديونية","name_en":"Debt Ratio",
-        "value": fmt_number(debt_ratio, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"نسبة تمويل الأصول بالديون.",
-        "explain_en":"Assets financed by debt.",
-        "analysis":ar,"analysis_en":en
-    })
 
-    # --- المبيعات ---
-    eq = format_equation("(المبيعات − تكلفة المبيعات) ÷ المبيعات",
-                         "(Sales − COGS) ÷ Sales",
-                         f"({fmt_number(fi.sales)} − {fmt_number(fi.cogs)}) ÷ {fmt_number(fi.sales)}")
-    ar, en = interpret_margin(gross_margin,"هامش إجمالي","Gross Margin")
-    results.append({
-        "group":"نسب المبيعات","name":"هامش الربح الإجمالي","name_en":"Gross Margin",
-        "value": fmt_number(gross_margin, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"ربحية النشاط الأساسي.","explain_en":"Core profitability.",
-        "analysis":ar,"analysis_en":en
-    })
-
-    eq = format_equation("EBIT ÷ المبيعات","EBIT ÷ Sales",
-                         f"{fmt_number(ebit)} ÷ {fmt_number(fi.sales)}")
-    ar, en = interpret_margin(operating_margin,"هامش التشغيل","Operating Margin")
-    results.append({
-        "group":"نسب المبيعات","name":"هامش التشغيل","name_en":"Operating Margin",
-        "value": fmt_number(operating_margin, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"كفاءة النشاط.","explain_en":"Operating efficiency.",
-        "analysis":ar,"analysis_en":en
-    })
+def register_ratio(spec: RatioSpec) -> RatioSpec:
+    """إضافة نسبة مخصصة إلى السجل الافتراضي دون تعديل المحرك."""
+    REGISTRY.register(spec)
+    memo_clear()
+    return spec
 
-    # --- الربحية ---
-    eq = format_equation("صافي الربح ÷ المبيعات","Net Income ÷ Sales",
-                         f"{fmt_number(net_income)} ÷ {fmt_number(fi.sales)}")
-    ar, en = interpret_margin(net_margin,"هامش صافي","Net Margin")
-    results.append({
-        "group":"نسب الربحية","name":"هامش صافي الربح","name_en":"Net Profit Margin",
-        "value": fmt_number(net_margin, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"نسبة الربح الصافي.","explain_en":"Net profit ratio.",
-        "analysis":ar,"analysis_en":en
-    })
-
-    eq = format_equation("صافي الربح ÷ حقوق الملكية","Net Income ÷ Equity",
-                         f"{fmt_number(net_income)} ÷ {fmt_number(fi.equity)}")
-    results.append({
-        "group":"نسب الربحية","name":"العائد على حقوق الملكية (ROE)","name_en":"Return on Equity (ROE)",
-        "value": fmt_number(roe, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"عائد الملاك.","explain_en":"Return on equity.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
-
-    # --- الربحية (تكملة) ---
-    eq = format_equation("صافي الربح ÷ إجمالي الأصول","Net Income ÷ Total Assets",
-                         f"{fmt_number(net_income)} ÷ {fmt_number(fi.total_assets)}")
-    results.append({
-        "group":"نسب الربحية","name":"العائد على الأصول (ROA)","name_en":"Return on Assets (ROA)",
-        "value": fmt_number(roa, is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يقيس كفاءة الأصول في توليد الأرباح.",
-        "explain_en":"Efficiency of assets in generating profit.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
-
-    eq = format_equation("EBIT ÷ إجمالي الأصول","EBIT ÷ Total Assets",
-                         f"{fmt_number(ebit)} ÷ {fmt_number(fi.total_assets)}")
-    results.append({
-        "group":"نسب الربحية","name":"مؤشر كفاءة الربح (BEP)","name_en":"Basic Earnings Power Ratio",
-        "value": fmt_number(safe_div(ebit, fi.total_assets), is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يبين قدرة الأصول على توليد أرباح تشغيلية بغض النظر عن الضرائب والفوائد.",
-        "explain_en":"Ability of assets to generate EBIT regardless of tax/interest.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
 
-    # --- المديونية ---
-    eq = format_equation("إجمالي الخصوم ÷ حقوق الملكية","Total Liabilities ÷ Equity",
-                         f"{fmt_number(fi.total_liabilities)} ÷ {fmt_number(fi.equity)}")
-    ar, en = interpret_dte(dte)
-    results.append({
-        "group":"نسب المديونية","name":"نسبة الدين إلى حقوق الملكية","name_en":"Debt to Equity Ratio (D/E)",
-        "value": fmt_number(dte),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يقيس اعتماد الشركة على الديون مقابل حقوق الملكية.",
-        "explain_en":"Measures reliance on debt vs equity.",
-        "analysis":ar,"analysis_en":en
-    })
-
-    eq = format_equation("EBIT ÷ مصروف الفوائد","EBIT ÷ Interest Expense",
-                         f"{fmt_number(ebit)} ÷ {fmt_number(fi.interest_expense)}")
-    results.append({
-        "group":"نسب المديونية","name":"تغطية الفوائد","name_en":"Interest Coverage",
-        "value": fmt_number(interest_cov),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يبين قدرة الأرباح التشغيلية على تغطية مصروف الفوائد.",
-        "explain_en":"Ability of EBIT to cover interest expense.",
-        "analysis":">1 آمن، <1 خطر","analysis_en":">1 safe, <1 risky"
-    })
+# ---------------- التخزين المؤقت (LRU) ----------------
+MEMO_SIZE = 4096
 
-    # --- الأصول ---
-    eq = format_equation("تكلفة المبيعات ÷ متوسط المخزون","COGS ÷ Avg Inventory",
-                         f"{fmt_number(fi.cogs)} ÷ {fmt_number(avg_inv)}")
-    results.append({
-        "group":"نسب الأصول","name":"دوران المخزون","name_en":"Inventory Turnover Ratio",
-        "value": fmt_number(safe_div(fi.cogs, avg_inv)),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"عدد مرات بيع وتجديد المخزون خلال الفترة.",
-        "explain_en":"Times inventory is sold and replaced.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
-
-    eq = format_equation("المبيعات ÷ متوسط الذمم المدينة","Sales ÷ Avg Accounts Receivable",
-                         f"{fmt_number(fi.sales)} ÷ {fmt_number(avg_ar)}")
-    results.append({
-        "group":"نسب الأصول","name":"دوران الذمم المدينة","name_en":"Accounts Receivable Turnover",
-        "value": fmt_number(safe_div(fi.sales, avg_ar)),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"عدد مرات تحصيل الذمم خلال الفترة.",
-        "explain_en":"Times receivables collected during period.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
-
-    eq = format_equation("المبيعات ÷ الأصول الثابتة","Sales ÷ Fixed Assets",
-                         f"{fmt_number(fi.sales)} ÷ {fmt_number(fi.total_assets - fi.current_assets)}")
-    results.append({
-        "group":"نسب الأصول","name":"دوران الأصول الثابتة","name_en":"Fixed Assets Turnover Ratio",
-        "value": fmt_number(safe_div(fi.sales, fi.total_assets - fi.current_assets)),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"كفاءة الأصول الثابتة في توليد المبيعات.",
-        "explain_en":"Efficiency of fixed assets in generating sales.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
 
-    # --- السوق ---
-    eq = format_equation("صافي الربح ÷ عدد الأسهم","Net Income ÷ Shares Outstanding",
-                         f"{fmt_number(net_income)} ÷ {fmt_number(1)}")
-    results.append({
-        "group":"نسب السوق","name":"ربحية السهم (EPS)","name_en":"Earnings per Share (EPS) Ratio",
-        "value": fmt_number(safe_div(net_income, 1)),  # عدّل 1 → عدد الأسهم الفعلي إذا متاح
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يبين نصيب السهم الواحد من صافي الربح.",
-        "explain_en":"Shows net income per share.",
-        "analysis":"أعلى أفضل","analysis_en":"Higher is better"
-    })
-
-    eq = format_equation("الأرباح الموزعة ÷ صافي الربح","Dividends ÷ Net Income",
-                         f"{fmt_number(fi.cfo)} ÷ {fmt_number(net_income)}")
-    results.append({
-        "group":"نسب السوق","name":"نسبة التوزيعات","name_en":"Payout Ratio",
-        "value": fmt_number(safe_div(fi.cfo, net_income), is_percent=True),
-        "equation":eq["ar"],"equation_en":eq["en"],
-        "explain":"يبين نسبة صافي الربح التي توزع كأرباح نقدية.",
-        "explain_en":"Portion of net income paid as dividends.",
-        "analysis":"40-60% مناسب","analysis_en":"40-60% reasonable"
-    })
-
-    return results
+@lru_cache(maxsize=MEMO_SIZE)
+def _memo_ratios(fi: FinancialInputs, keys: Optional[Tuple[str, ...]]) -> Tuple[RatioResult, ...]:
+    return tuple(compute_ratios(fi, keys))
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _memo_derived(fi: FinancialInputs) -> Tuple[Tuple[str, float], ...]:
+    return tuple(compute_derived(fi).items())
+
+
+def compute_ratios_cached(fi: FinancialInputs, select: Selection = None) -> List[RatioResult]:
+    """مثل compute_ratios، لكن المدخلات المتطابقة تُحسب مرة واحدة فقط
+    (ومعها نصوص العرض التي بُنيت مسبقًا). النتائج مشتركة؛ لا تعدّلها."""
+    return list(_memo_ratios(fi, REGISTRY.resolve(select)))
+
+
+def compute_derived_cached(fi: FinancialInputs) -> Dict[str, float]:
+    return dict(_memo_derived(fi))
+
+
+def memo_info() -> Dict[str, Dict[str, int]]:
+    """عدادات الإصابة/الإخفاق والحجم لكل ذاكرة مؤقتة."""
+    return {
+        "compute_ratios": _memo_ratios.cache_info()._asdict(),
+        "compute_derived": _memo_derived.cache_info()._asdict(),
+    }
 
 
+def memo_clear() -> None:
+    _memo_ratios.cache_clear()
+    _memo_derived.cache_clear()
+
+
+# ---------------- الحساب المتجه (دفعة كاملة) ----------------
+# أعمدة ملف البيانات ← حقول FinancialInputs (نفس الربط المستخدم في app.py)
+WORKBOOK_COLUMNS = {
+    "sales": "Revenue",
+    "cogs": "Cost of goods sold",
+    "opex": "Total Operating expenses",
+    "interest_expense": "Financial charges",
+    "tax_expense": "Zakat",
+    "net_income": "Profit/(Loss) for the period",
+    "current_assets": "Current assets",
+    "inventory": "Inventory",
+    "cash": "Cash and Bank balances",
+    "accounts_receivable": "Trade Receivable",
+    "accounts_payable": "Current liabilities",
+    "current_liabilities": "Current liabilities",
+    "total_assets": "Total assets",
+    "total_liabilities": "Total liabilities",
+    "equity": "Owners' equity",
+    "cfo": "Cash flow",
+}
+
+
+def inputs_from_workbook(df: pd.DataFrame) -> pd.DataFrame:
+    """تحويل أعمدة ملف البيانات إلى أعمدة بأسماء حقول FinancialInputs."""
+    out = pd.DataFrame(index=df.index)
+    for name, column in WORKBOOK_COLUMNS.items():
+        if column in df.columns:
+            out[name] = df[column]
+    return out
+
+
+def _field_default(name: str) -> float:
+    default = FinancialInputs.__dataclass_fields__[name].default
+    return np.nan if default is None else float(default)
+
+
+def input_arrays(df: pd.DataFrame, dtype=np.float64,
+                 names: Tuple[str, ...] = INPUT_FIELDS) -> Dict[str, np.ndarray]:
+    """مصفوفة لكل حقل؛ الحقل الغائب يأخذ قيمته الافتراضية (None ← NaN).
+
+    العمود الموجود بالنوع المطلوب يُعاد كما هو دون نسخ، والحقل الغائب
+    مصفوفة بثّ (broadcast) للقراءة فقط لا تحجز ذاكرة لكل صف.
+    """
+    n = len(df)
+    cols = {}
+    for name in names:
+        if name in df.columns:
+            col = df[name]
+            if col.dtype != dtype:
+                col = pd.to_numeric(col, errors="coerce")
+            cols[name] = col.to_numpy(dtype=dtype, copy=False)
+        else:
+            cols[name] = np.broadcast_to(np.asarray(_field_default(name), dtype=dtype), (n,))
+    return cols
+
+
+def _ratio_arrays(c: Mapping[str, np.ndarray], keys: Optional[Tuple[str, ...]] = None) -> Dict[str, np.ndarray]:
+    """نفس رسم اعتماديات compute_ratios مطبقًا على أعمدة كاملة."""
+    return REGISTRY.evaluate(c, ArrayOps, keys)[1]
+
+
+@timed()
+def compute_ratios_frame(df: pd.DataFrame, select: Selection = None) -> pd.DataFrame:
+    """حساب كل النسب لكل صفوف الإطار دفعة واحدة.
+
+    الأعمدة بأسماء حقول FinancialInputs (انظر inputs_from_workbook). القيمة
+    المفقودة NaN تقابل None في المسار الفردي، والنسبة غير المعرّفة تعود NaN.
+    الناتج عمود لكل نسبة (باسمها الإنجليزي) بنفس فهرس الإدخال. مع select
+    لا تُحوَّل إلا الأعمدة التي تحتاجها النسب المختارة.
+    """
+    keys = REGISTRY.resolve(select)
+    cols = input_arrays(df, names=REGISTRY.required_fields(keys))
+    return pd.DataFrame(_ratio_arrays(cols, keys), index=df.index)
+
+
+def interpret_frame(values: pd.DataFrame, lang: Optional[str] = None) -> pd.DataFrame:
+    """فئة التفسير لكل قيمة في ناتج compute_ratios_frame دفعة واحدة.
+
+    بدون lang رموز int8 (‎-1 لغير المتاح)؛ مع "ar" أو "en" أعمدة Categorical
+    بالنص. الأعمدة التي ليست نسبًا لها جدول تفسير لا تظهر في الناتج.
+    """
+    out = {}
+    for key in values.columns:
+        spec = REGISTRY.ratios.get(key)
+        table = spec.table if spec is not None else None
+        if table is None:
+            continue
+        codes = table.codes(values[key].to_numpy(dtype=np.float64))
+        out[key] = codes if lang is None else table.categorical(codes, lang)
+    return pd.DataFrame(out, index=values.index)
+
+
+# ---------------- دفعة مدخلات (عمود لكل حقل) ----------------
+class FinancialInputsBatch:
+    """مدخلات عدة فترات مخزنة كمصفوفة NumPy متصلة لكل حقل بدل كائن لكل صف.
+
+    الحقول متاحة كخصائص (batch.sales ...)، والتقطيع batch[a:b] يعيد دفعة
+    من مشاهد (views) بلا نسخ، وbatch[i] يعيد FinancialInputs للصف i.
+    """
+    __slots__ = ("columns", "index")
+
+    def __init__(self, columns: Mapping[str, np.ndarray], index: Optional[pd.Index] = None):
+        missing = [name for name in INPUT_FIELDS if name not in columns]
+        if missing:
+            raise ValueError(f"حقول ناقصة في الدفعة: {missing}")
+        lengths = {len(columns[name]) for name in INPUT_FIELDS}
+        if len(lengths) > 1:
+            raise ValueError("كل حقول الدفعة يجب أن تكون بنفس الطول.")
+        self.columns: Dict[str, np.ndarray] = {name: columns[name] for name in INPUT_FIELDS}
+        n = lengths.pop() if lengths else 0
+        self.index = pd.RangeIndex(n) if index is None else index
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> "FinancialInputsBatch":
+        """بدون نسخ للأعمدة التي هي أصلًا من النوع المطلوب (انظر input_arrays)."""
+        return cls(input_arrays(df, dtype), df.index)
+
+    @classmethod
+    def from_inputs(cls, items: List[FinancialInputs], dtype=np.float64) -> "FinancialInputsBatch":
+        cols = {}
+        for name in INPUT_FIELDS:
+            values = (getattr(fi, name) for fi in items)
+            cols[name] = np.fromiter((np.nan if v is None else v for v in values), dtype=dtype, count=len(items))
+        return cls(cols)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # لا يُستدعى إلا إن فشل البحث العادي: الخانات غير المعبأة بعد (أثناء
+        # pickle/copy) والأسماء الخاصة لا تمر على columns وإلا تكررت بلا نهاية
+        if name in FinancialInputsBatch.__slots__ or name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __reduce__(self):
+        # للإرسال بين العمليات (ProcessPoolExecutor) وcopy: نفس الأعمدة والفهرس
+        return FinancialInputsBatch, (self.columns, self.index)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return inputs_from_values({name: col[item] for name, col in self.columns.items()})
+        return FinancialInputsBatch({name: col[item] for name, col in self.columns.items()}, self.index[item])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        # مصفوفات البث (strides == 0) لا تحجز ذاكرة لكل صف
+        return sum(col.nbytes for col in self.columns.values() if col.strides != (0,))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns, index=self.index)
+
+
+def compute_ratios_batch(batch: FinancialInputsBatch, select: Selection = None) -> Dict[str, np.ndarray]:
+    """نفس نتيجة compute_ratios_frame لكن مصفوفات خام بلا بناء DataFrame."""
+    return _ratio_arrays(batch.columns, REGISTRY.resolve(select))
+
+
+if __name__ == "__main__":  # python -m ratios batch <dir>
+    from cli import main
+    raise SystemExit(main())
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+# render.py — نصوص وبطاقات HTML لتبويب النتائج (بدون Streamlit)
+from typing import Iterable, Optional
+
+from peers import PeerContext
+from ratios import RatioResult, fmt_number
+
+
+simplified_views = {
+    "Current Ratio": {
+        "ar": "👥 تبسيط: هذه النسبة توضح إذا كانت الشركة تملك ما يكفي من الأصول المتداولة (النقدية + المدينون + المخزون) لسداد التزاماتها القصيرة (الدائنون + القروض قصيرة الأجل). كلما ارتفعت كان الوضع أفضل.",
+        "en": "👥 Simple view: Measures if current assets (cash + receivables + inventory) are enough to cover short-term liabilities (payables + short-term loans). The higher, the safer."
+    },
+    "Quick Ratio": {
+        "ar": "👥 تبسيط: مثل نسبة التداول لكن تستبعد المخزون (لأنه قد يستغرق وقتًا للتحويل لنقد). تقيس قدرة الشركة على الوفاء بالتزاماتها باستخدام النقدية والذمم المدينة فقط.",
+        "en": "👥 Simple view: Like Current Ratio but excludes inventory (as it may take time to convert). Focuses on cash and receivables to cover short-term obligations."
+    },
+    "Cash Ratio": {
+        "ar": "👥 تبسيط: أدق مقياس للسيولة، يقارن النقد والنقد المعادل (Cash & Cash Equivalents) فقط مع الخصوم المتداولة. إذا كان منخفض جدًا فهذا يشير إلى مخاطر في السداد الفوري.",
+        "en": "👥 Simple view: Strict liquidity test, compares only cash and cash equivalents with current liabilities. Very low ratio may indicate immediate liquidity risk."
+    },
+    "Debt Ratio": {
+        "ar": "👥 تبسيط: يقيس نسبة الأصول الممولة بالديون (القروض قصيرة وطويلة الأجل) مقارنة بإجمالي الأصول. إذا زادت عن 60% فهذا قد يشكل عبء مالي على الشركة.",
+        "en": "👥 Simple view: Shows how much of assets are financed by debt (short & long-term loans). Above 60% can be financially risky."
+    },
+    "Debt to Equity Ratio (D/E)": {
+        "ar": "👥 تبسيط: يقيس اعتماد الشركة على الديون (Loans) مقارنة بحقوق الملاك (Equity). ارتفاعه يعني مخاطر أكبر على الاستقرار المالي.",
+        "en": "👥 Simple view: Measures reliance on debt vs equity. Higher ratio means higher financial risk."
+    },
+    "Interest Coverage": {
+        "ar": "👥 تبسيط: يوضح إذا كانت أرباح التشغيل (Operating Profit) تكفي لتغطية مصروفات الفوائد (Interest Expense). إذا كان أقل من 1 فالشركة في خطر كبير.",
+        "en": "👥 Simple view: Tells if operating profits are enough to cover interest expenses. Below 1 means financial distress."
+    },
+    "Gross Profit Margin": {
+        "ar": "👥 تبسيط: يقيس الربح الإجمالي (الإيرادات - تكلفة المبيعات) مقارنة بالمبيعات. ارتفاعه يعني كفاءة في التسعير أو الإنتاج.",
+        "en": "👥 Simple view: Gross profit (revenue - cost of goods sold) compared to sales. Higher margin = better pricing or efficiency."
+    },
+    "Operating Margin": {
+        "ar": "👥 تبسيط: يقيس نسبة الربح بعد خصم المصاريف التشغيلية (الإيجارات + الرواتب + المصاريف الإدارية). يعطي فكرة عن كفاءة الإدارة.",
+        "en": "👥 Simple view: Profit after operating expenses (rent + salaries + admin expenses). Reflects management efficiency."
+    },
+    "Net Profit Margin": {
+        "ar": "👥 تبسيط: النسبة النهائية للربح بعد جميع المصاريف (التشغيلية + التمويلية + الضريبة). توضح كم يبقى من كل 1 ريال مبيعات كربح صافٍ.",
+        "en": "👥 Simple view: Final profit after all expenses (operating + financing + taxes). Shows how much remains from each $1 of sales."
+    },
+    "Return on Assets (ROA)": {
+        "ar": "👥 تبسيط: هل الأصول (المباني + المعدات + النقدية) تحقق عائد جيد؟ كلما ارتفعت النسبة زادت كفاءة استغلال الأصول.",
+        "en": "👥 Simple view: Are assets (buildings + equipment + cash) generating good return? Higher means more efficient use of assets."
+    },
+    "Return on Equity (ROE)": {
+        "ar": "👥 تبسيط: يقيس العائد الذي يحصل عليه الملاك (Equity Holders) على استثماراتهم. ارتفاعه مؤشر إيجابي للمستثمرين.",
+        "en": "👥 Simple view: Measures return shareholders get on their equity investment. Higher is better for investors."
+    },
+    "Cash Conversion Ratio": {
+        "ar": "👥 تبسيط: يقارن بين الأرباح المحاسبية (Net Income) والتدفق النقدي من التشغيل (Operating Cash Flow). إذا كان منخفض فقد يعني أن الأرباح ليست نقدية فعلًا.",
+        "en": "👥 Simple view: Compares net income vs operating cash flow. Low ratio may mean profits are not turning into actual cash."
+    },
+    "Basic Earnings Power Ratio": {
+        "ar": "👥 تبسيط: يقيس قدرة الأصول (المباني + المعدات) على توليد أرباح تشغيلية قبل الفوائد والضرائب. يعطي صورة عن قوة النشاط الأساسي.",
+        "en": "👥 Simple view: Measures assets’ ability (buildings + equipment) to generate operating profit before interest and tax."
+    },
+    "Inventory Turnover Ratio": {
+        "ar": "👥 تبسيط: يوضح كم مرة يتم بيع وتجديد المخزون خلال السنة. كلما ارتفع يعني أن البضاعة تتحرك بسرعة.",
+        "en": "👥 Simple view: Shows how many times inventory is sold and replaced in a year. Higher = faster sales cycle."
+    },
+    "Accounts Receivable Turnover": {
+        "ar": "👥 تبسيط: يقيس سرعة تحصيل المدينين (العملاء). ارتفاعه يعني أن الشركة تجمع أموالها بسرعة.",
+        "en": "👥 Simple view: Measures how fast receivables (customers) are collected. Higher = faster collection."
+    },
+    "Fixed Assets Turnover Ratio": {
+        "ar": "👥 تبسيط: يقيس كفاءة الأصول الثابتة (المصانع + المعدات) في توليد المبيعات.",
+        "en": "👥 Simple view: Efficiency of fixed assets (plants + equipment) in generating sales."
+    },
+    "Earnings per Share (EPS) Ratio": {
+        "ar": "👥 تبسيط: نصيب كل سهم من صافي الربح. يساعد المستثمرين في تقييم العائد من امتلاك سهم واحد.",
+        "en": "👥 Simple view: Portion of net income allocated to each share. Useful for investors to assess return per share."
+    },
+    "Payout Ratio": {
+        "ar": "👥 تبسيط: يوضح نسبة الأرباح الموزعة نقدًا على المساهمين من صافي الربح. كلما ارتفعت زاد رضا المساهمين، لكن يقل التمويل المتاح للنمو.",
+        "en": "👥 Simple view: Shows portion of net income paid as dividends. Higher = happier shareholders but less reinvestment."
+    }
+}
+
+
+
+# 📌 تحسينات مقترحة لكل نسبة
+improvements = {
+    "Current Ratio": {
+        "ar": "زيادة الأصول المتداولة (النقدية + المدينون + المخزون) أو خفض الخصوم قصيرة الأجل (الدائنون + القروض قصيرة الأجل).",
+        "en": "Increase current assets (cash + receivables + inventory) or reduce short-term liabilities (payables + short-term loans)."
+    },
+    "Quick Ratio": {
+        "ar": "زيادة النقدية أو الذمم المدينة لتغطية الخصوم الفورية، مع تقليل الاعتماد على المخزون.",
+        "en": "Improve cash or receivables to cover immediate liabilities, reduce reliance on inventory."
+    },
+    "Cash Ratio": {
+        "ar": "الحفاظ على احتياطي نقدي كافٍ (Cash Reserves) لتغطية الالتزامات السريعة.",
+        "en": "Maintain sufficient cash reserves to meet urgent obligations."
+    },
+    "Debt Ratio": {
+        "ar": "تقليل الاعتماد على الديون (Loans) وزيادة التمويل الذاتي (Equity Financing).",
+        "en": "Reduce reliance on debt (loans) and increase equity financing."
+    },
+    "Debt to Equity Ratio (D/E)": {
+        "ar": "خفض الديون أو زيادة حقوق الملكية لتحقيق توازن أفضل بين الالتزامات والملاك.",
+        "en": "Lower debt or raise equity for a healthier balance."
+    },
+    "Interest Coverage": {
+        "ar": "زيادة الأرباح التشغيلية (Operating Profit) أو خفض مصروف الفوائد (Interest Expense).",
+        "en": "Boost operating profits or reduce interest expenses."
+    },
+    "Gross Profit Margin": {
+        "ar": "تحسين المبيعات (Revenue) أو خفض تكلفة المبيعات (COGS).",
+        "en": "Enhance sales (revenue) or reduce cost of goods sold (COGS)."
+    },
+    "Operating Margin": {
+        "ar": "تقليل المصاريف التشغيلية (الإيجارات + الرواتب + الإدارية) أو زيادة كفاءة التشغيل.",
+        "en": "Reduce operating expenses (rent + salaries + admin) or improve operational efficiency."
+    },
+    "Net Profit Margin": {
+        "ar": "زيادة الإيرادات أو التحكم في جميع المصروفات (التشغيلية + التمويلية + الضرائب).",
+        "en": "Increase revenues or control all expenses (operating + financing + taxes)."
+    },
+    "Return on Assets (ROA)": {
+        "ar": "زيادة الأرباح أو تحسين استغلال الأصول (المباني + المعدات + النقدية).",
+        "en": "Increase profits or utilize assets (buildings + equipment + cash) more effectively."
+    },
+    "Return on Equity (ROE)": {
+        "ar": "زيادة العائد للملاك عن طريق تحسين الربحية ورفع كفاءة إدارة الموارد.",
+        "en": "Increase shareholder return by improving profitability and resource efficiency."
+    },
+    "Cash Conversion Ratio": {
+        "ar": "تحسين التدفقات النقدية عبر تحصيل أسرع (Receivables Collection) وإدارة نفقات أفضل.",
+        "en": "Improve cash flow through faster receivables collection and better expense management."
+    },
+        "Basic Earnings Power Ratio": {
+        "ar": "زيادة كفاءة استخدام الأصول الثابتة (المصانع + المعدات) لرفع الأرباح التشغيلية.",
+        "en": "Improve utilization of fixed assets (plants + equipment) to increase operating profit."
+    },
+    "Inventory Turnover Ratio": {
+        "ar": "تحسين إدارة المخزون وتقليل البضاعة الراكدة لزيادة سرعة الدوران.",
+        "en": "Enhance inventory management, reduce obsolete stock to increase turnover speed."
+    },
+    "Accounts Receivable Turnover": {
+        "ar": "تسريع تحصيل العملاء وتقليل فترات الائتمان لتحسين التدفقات النقدية.",
+        "en": "Speed up customer collections, shorten credit terms to improve cash flow."
+    },
+    "Fixed Assets Turnover Ratio": {
+        "ar": "زيادة المبيعات أو تحسين استغلال الأصول الثابتة لرفع كفاءة الدوران.",
+        "en": "Increase sales or use fixed assets more efficiently to boost turnover."
+    },
+    "Earnings per Share (EPS) Ratio": {
+        "ar": "زيادة صافي الربح أو إعادة شراء الأسهم لرفع نصيب السهم من الأرباح.",
+        "en": "Increase net income or repurchase shares to raise EPS."
+    },
+    "Payout Ratio": {
+        "ar": "تحقيق توازن بين توزيع أرباح مناسبة للمساهمين والاحتفاظ بأرباح كافية للنمو.",
+        "en": "Balance between distributing dividends and retaining earnings for growth."
+    }
+}
+
+
+# 🟢 أيقونات لكل مجموعة نسب
+icons = {
+    "نسب الأصول": "🏦",
+    "نسب الخصوم": "💳",
+    "نسب المبيعات": "🛒",
+    "نسب الربحية": "📈",
+}
+
+# أنماط البطاقات (التطبيق والتقارير الثابتة في reports.py)
+CARD_CSS = """
+    /* الخطوط */
+    @import url('https://fonts.googleapis.com/css2?family=Cairo:wght@400;600;700&display=swap');
+    @import url('https://fonts.googleapis.com/css2?family=Tajawal:wght@500&display=swap');
+
+    html, body, [class*="css"] {
+        font-family: 'Cairo', sans-serif !important;
+        background-color: #ffffff !important;  /* خلفية فاتحة دائمًا */
+    }
+
+    /* نصوص عربية */
+    .arabic {
+        direction: rtl !important;
+        text-align: right !important;
+        font-family: 'Cairo', 'Tajawal', sans-serif;
+        font-size: 16px;
+        color: #212529 !important;  /* أسود */
+    }
+
+    /* نصوص إنجليزية */
+    .english {
+        direction: ltr;
+        text-align: left;
+        font-family: 'Cairo', sans-serif;
+        font-size: 15px;
+        color: #212529 !important;  /* أسود */
+    }
+
+    /* 📌 صندوق الشرح */
+    .explanation-box {
+        background: #FFCDD2 !important;   /* أحمر فاتح */
+        color: #B71C1C !important;        /* أحمر غامق */
+        padding: 12px;
+        border-radius: 8px;
+        margin: 6px 0;
+        box-shadow: inset 0px 1px 3px rgba(0,0,0,0.1);
+    }
+
+    /* 📐 المعادلات */
+    .equation-ar, .equation-en {
+        background: #BBDEFB !important;   /* أزرق فاتح */
+        color: #0D47A1 !important;        /* أزرق داكن */
+        padding: 12px;
+        border-radius: 8px;
+        font-weight: 600;
+        margin: 6px 0;
+        direction: rtl !important;
+        text-align: right !important;
+    }
+
+    /* 🧾 التحليل */
+    .analysis-box {
+        background: #C8E6C9 !important;   /* أخضر فاتح */
+        color: #1B5E20 !important;        /* أخضر غامق */
+        padding: 12px;
+        border-radius: 8px;
+        margin: 6px 0;
+        font-weight: 600;
+    }
+
+    /* 👥 التبسيط */
+    .simplified-box {
+        background: #FFE0B2 !important;   /* برتقالي فاتح */
+        color: #E65100 !important;        /* برتقالي غامق */
+        padding: 12px;
+        border-radius: 8px;
+        margin: 6px 0;
+    }
+
+    /* 🚀 التحسين */
+    .improvement-box {
+        display: block;
+        width: 100% !important;
+        box-sizing: border-box;
+        padding: 20px;
+        margin: 15px 0;
+        border-radius: 10px;
+        
+        background: linear-gradient(90deg, #FFECB3, #FFE082) !important;  /* أصفر برتقالي جذاب */
+        border: 2px solid #F57C00 !important;
+        color: #212121 !important;   /* أسود */
+        font-weight: 700;
+        font-size: 16px;
+        text-align: center;
+        font-family: 'Cairo', 'Tajawal', sans-serif !important;
+    }
+
+    .improvement-box p { margin: 5px 0; }
+ 
+    .improvement-ar {
+        direction: rtl !important;
+        text-align: right !important;
+        font-family: 'Cairo', 'Tajawal', sans-serif !important;
+    }
+    
+    .improvement-en {
+        direction: ltr !important;
+        text-align: left !important;
+        font-family: 'Cairo', sans-serif !important;
+    }
+
+    .glow-text {
+    font-size: 32px;
+    font-weight: bold;
+    color: #c43939;  /* بنفسجي */
+    text-align: center;
+    text-shadow: 
+        0 0 5px #004461,
+        0 0 10px #9B59B6,
+        0 0 20px #6b4c12,
+        0 0 30px #000000;
+    }
+
+    /* 📄 البطاقات المختصرة (العرض صفحةً صفحة) */
+    .ratio-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
+        gap: 10px;
+        margin: 8px 0 16px;
+    }
+    .ratio-card {
+        background: #F4F6F7;
+        border: 1px solid #D5D8DC;
+        border-radius: 10px;
+        padding: 12px;
+        text-align: center;
+        font-family: 'Cairo', 'Tajawal', sans-serif;
+        color: #212529;
+    }
+    .ratio-card-name { font-weight: 700; }
+    .ratio-card-value { font-size: 26px; font-weight: 700; color: #c43939; margin: 6px 0; }
+    .ratio-card-analysis { font-size: 13px; }
+    .card-cols { display: flex; gap: 16px; }
+    .card-col { flex: 1; min-width: 0; }
+"""
+
+# المجموعات المعروضة في تبويب النتائج بالترتيب
+RESULT_GROUPS = ["نسب الأصول", "نسب الخصوم", "نسب المبيعات", "نسب الربحية"]
+
+
+# ---------------- البطاقات ----------------
+def card_title(r: RatioResult) -> str:
+    return f"{r.name} | {r.name_en} — {r.display}"
+
+
+def card_summary_html(r: RatioResult) -> str:
+    """بطاقة مختصرة: الاسم والقيمة والتحليل فقط (النصوص تُبنى هنا عند أول طلب)."""
+    return (
+        f"<div class='ratio-card'><div class='ratio-card-name'>{r.name}<br><small>{r.name_en}</small></div>"
+        f"<div class='ratio-card-value'>{r.display}</div>"
+        f"<div class='ratio-card-analysis'>{r.analysis}<br><small>{r.analysis_en}</small></div></div>"
+    )
+
+
+def cards_grid_html(results: Iterable[RatioResult]) -> str:
+    """كل بطاقات مجموعة في كتلة HTML واحدة (عنصر واحد بدل عشرات العناصر)."""
+    return "<div class='ratio-grid'>" + "".join(card_summary_html(r) for r in results) + "</div>"
+
+
+def peer_html(r: RatioResult, peer: Optional[PeerContext]) -> str:
+    """موقع النسبة بين شركات القطاع (أو كل شركات السنة) وربيعيات القطاع؛ فارغ إن لم يكفِ النظراء."""
+    if peer is None:
+        return ""
+    if peer.percentile is not None:
+        sector = peer.sector if peer.sector is not None else "—"
+        quartiles = " / ".join(fmt_number(q, r.is_percent) for q in (peer.q1, peer.median, peer.q3))
+        return (
+            "<div class='improvement-box'>"
+            f"<p class='improvement-ar'>👥 <b>مقارنة بالقطاع ({sector}، {peer.peers} شركة):</b> "
+            f"أعلى من {peer.percentile:.0f}% من الشركات — الربع {peer.quartile}. "
+            f"الربيعيات (الأدنى / الوسيط / الأعلى): {quartiles}</p>"
+            f"<p class='improvement-en'>👥 <b>Sector peers ({sector}, {peer.peers} companies):</b> "
+            f"above {peer.percentile:.0f}% of peers — quartile {peer.quartile}. "
+            f"Quartiles (Q1 / median / Q3): {quartiles}</p></div>"
+        )
+    if peer.universe_percentile is not None:
+        return (
+            "<div class='improvement-box'>"
+            f"<p class='improvement-ar'>👥 <b>مقارنة بكل الشركات:</b> أعلى من {peer.universe_percentile:.0f}% "
+            "من شركات نفس السنة</p>"
+            f"<p class='improvement-en'>👥 <b>All companies:</b> above {peer.universe_percentile:.0f}% "
+            "of companies in the same year</p></div>"
+        )
+    return ""
+
+
+def card_detail_html(r: RatioResult, peer: Optional[PeerContext] = None) -> str:
+    """نفس محتوى البطاقة الكاملة (الشرح، المعادلة، التحليل، التبسيط، التحسين) في كتلة واحدة،
+    ومعها موقع الشركة بين نظيراتها إن مُرر peer."""
+    simple = simplified_views.get(r.name_en)
+    improve = improvements.get(r.name_en)
+    ar = (
+        f"<div class='explanation-box arabic'><b>📌 الشرح:</b> {r.explain}</div>"
+        f"<div class='equation-ar'>📐 {r.equation}</div>"
+        f"<div class='analysis-box arabic'><b>🧾 التحليل:</b> {r.analysis}</div>"
+        + (f"<div class='simplified-box arabic'>{simple['ar']}</div>" if simple else "")
+    )
+    en = (
+        f"<div class='explanation-box english'><b>📌 Explanation:</b> {r.explain_en}</div>"
+        f"<div class='equation-en'>📐 {r.equation_en}</div>"
+        f"<div class='analysis-box english'><b>🧾 Analysis:</b> {r.analysis_en}</div>"
+        + (f"<div class='simplified-box english'>{simple['en']}</div>" if simple else "")
+    )
+    box = (
+        "<div class='improvement-box'>"
+        f"<p class='improvement-ar'>📌 <b>لتحسين النسبة  :</b> {improve['ar']}</p>"
+        f"<p class='improvement-en'>📌 <b>Improvement :</b> {improve['en']}</p></div>"
+    ) if improve else ""
+    return (
+        f"<div class='glow-text'>{card_title(r)}</div>"
+        f"<div class='card-cols'><div class='card-col'>{en}</div><div class='card-col'>{ar}</div></div>"
+        + box + peer_html(r, peer)
+    )
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# reports.py — تقرير HTML ثابت لكل (شركة، سنة) مخزن على القرص بمفتاح من بصمة المدخلات
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from dataclasses import astuple, dataclass
+from functools import lru_cache
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
+
+from cube import RatioCube
+from ratios import REGISTRY, FinancialInputs, RatioRegistry, RatioResult, RatioSpec
+from render import CARD_CSS, RESULT_GROUPS, card_detail_html, cards_grid_html, icons, improvements, simplified_views
+from timing import timed
+
+TEMPLATE_VERSION = 1  # ارفعه عند تغيير بنية التقرير؛ النصوص والأنماط داخلة في البصمة تلقائيًا
+CACHE_ENV = "RATIOS_REPORT_CACHE"  # مجلد التخزين؛ الافتراضي DEFAULT_CACHE_DIR
+DEFAULT_CACHE_DIR = ".report_cache"
+
+REPORT_CSS = """
+    body { max-width: 1100px; margin: 0 auto; padding: 24px; background: #ffffff; }
+    h2 { font-family: 'Cairo', 'Tajawal', sans-serif; color: #2C3E50; border-bottom: 2px solid #D5D8DC; }
+    .ratio-detail { padding: 8px 0 16px; border-bottom: 1px dashed #D5D8DC; }
+"""
+
+
+# ---------------- المفتاح ----------------
+@lru_cache(maxsize=8)
+def _fingerprint(specs: Tuple[RatioSpec, ...]) -> str:
+    def analysis(s: RatioSpec) -> str:
+        return repr(s.table) if s.table is not None else getattr(s.analysis, "__qualname__", "")
+
+    template = [
+        TEMPLATE_VERSION, CARD_CSS, REPORT_CSS, RESULT_GROUPS, icons, simplified_views, improvements,
+        [[s.group, s.name, s.name_en, s.equation, s.equation_en, s.substitution, s.explain, s.explain_en,
+          s.is_percent, analysis(s)] for s in specs],
+    ]
+    return hashlib.sha256(json.dumps(template, ensure_ascii=False).encode()).hexdigest()
+
+
+def template_fingerprint(registry: RatioRegistry = REGISTRY) -> str:
+    """بصمة كل ما يدخل في شكل التقرير: الإصدار والأنماط ونصوص النسب والبطاقات."""
+    return _fingerprint(tuple(registry.ratios.values()))
+
+
+def report_key(company: Hashable, year: Hashable, inputs: FinancialInputs,
+               registry: RatioRegistry = REGISTRY) -> str:
+    """sha256 لمدخلات الفترة + بصمة القالب: نفس المفتاح ⇔ نفس التقرير حرفيًا."""
+    values = [None if v is None or v != v else float(v) for v in astuple(inputs)]
+    payload = [template_fingerprint(registry), str(company), str(year), values]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+# ---------------- القالب ----------------
+def render_report(company: Hashable, year: Hashable, results: List[RatioResult]) -> str:
+    """صفحة HTML مستقلة: البطاقات المختصرة ثم التفاصيل الكاملة لكل مجموعة."""
+    title = f"📅 السنة: {html.escape(str(year))} — 🏢 {html.escape(str(company))}"
+    groups = list(dict.fromkeys([*RESULT_GROUPS, *(r.group for r in results)]))
+    body = []
+    for group in groups:
+        items = [r for r in results if r.group == group]
+        if not items:
+            continue
+        body.append(f"<h2 class='arabic'>{icons.get(group, '')} {group}</h2>")
+        body.append(cards_grid_html(items))
+        body.extend(f"<section class='ratio-detail'>{card_detail_html(r)}</section>" for r in items)
+    return (
+        "<!DOCTYPE html><html lang='ar' dir='rtl'><head><meta charset='utf-8'>"
+        f"<title>{html.escape(str(company))} {html.escape(str(year))}</title>"
+        f"<style>{CARD_CSS}{REPORT_CSS}</style></head><body>"
+        f"<div class='glow-text'>{title}</div>" + "".join(body) + "</body></html>"
+    )
+
+
+# ---------------- التخزين ----------------
+def cache_dir(root: Optional[str] = None) -> str:
+    return root or os.environ.get(CACHE_ENV) or DEFAULT_CACHE_DIR
+
+
+def cache_path(key: str, root: Optional[str] = None) -> str:
+    return os.path.join(cache_dir(root), key[:2], f"{key}.html")
+
+
+def _store(path: str, text: str) -> bool:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)  # القارئ يرى الملف كاملًا أو لا يراه
+        return True
+    except OSError:
+        # مجلد للقراءة فقط: نكتفي بالتقرير في الذاكرة
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def _load(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+@timed("report")
+def cached_report(cube: RatioCube, company: Hashable, year: Hashable, root: Optional[str] = None) -> str:
+    """تقرير الفترة من المخزن إن وُجد، وإلا يُبنى من المكعب ويُحفظ."""
+    key = report_key(company, year, cube.panel.inputs_for(company, year), cube.registry)
+    path = cache_path(key, root)
+    text = _load(path)
+    if text is None:
+        text = render_report(company, year, cube.results(company, year))
+        _store(path, text)
+    return text
+
+
+# ---------------- البناء المجمّع ----------------
+@dataclass
+class BuildStats:
+    built: int = 0
+    cached: int = 0
+    seconds: float = 0.0
+
+
+def report_filename(company: Hashable, year: Hashable) -> str:
+    """اسم ملف مقروء للنسخة المصدّرة (بدون حروف ممنوعة في أنظمة الملفات)."""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", f"{company}_{year}") + ".html"
+
+
+def build_reports(cube: RatioCube, companies: Optional[Iterable[Hashable]] = None,
+                  years: Optional[Iterable[Hashable]] = None, root: Optional[str] = None,
+                  out_dir: Optional[str] = None,
+                  progress: Optional[Callable[[int, int], None]] = None) -> BuildStats:
+    """بناء تقارير كل الفترات المختارة في المخزن مسبقًا (ما هو موجود لا يُعاد).
+
+    out_dir (اختياري) ينسخ كل تقرير باسم مقروء للتوزيع.
+    """
+    start = time.perf_counter()
+    stats = BuildStats()
+    keys = cube.panel.keys(companies, years)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    for done, (company, year) in enumerate(keys, 1):
+        key = report_key(company, year, cube.panel.inputs_for(company, year), cube.registry)
+        path = cache_path(key, root)
+        if os.path.exists(path):
+            stats.cached += 1
+            text = _load(path) if out_dir else None
+        else:
+            text = render_report(company, year, cube.results(company, year))
+            _store(path, text)
+            stats.built += 1
+        if out_dir:
+            with open(os.path.join(out_dir, report_filename(company, year)), "w", encoding="utf-8") as f:
+                f.write(text)
+        if progress is not None:
+            progress(done, len(keys))
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# scenarios.py
+from dataclasses import dataclass, replace
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ratios import (INPUT_FIELDS, REGISTRY, ArrayOps, FinancialInputs, RatioRegistry, RatioResult,
+                    Selection, compute_ratios)
+from timing import timed
+
+
+# ---------------- ماذا لو (إعادة حساب جزئية) ----------------
+def _same(a, b) -> bool:
+    return a == b or (a != a and b != b)  # NaN == NaN هنا
+
+
+class WhatIf:
+    """سيناريو تفاعلي فوق فترة أساس واحدة.
+
+    عند تغيير حقل يُعاد حساب النسب المعتمدة عليه فقط (عبر
+    RatioRegistry.affected_by)، وتبقى نتائج بقية النسب كما هي دون لمس.
+    """
+
+    def __init__(self, base: FinancialInputs, registry: RatioRegistry = REGISTRY):
+        self.registry = registry
+        self.base = base
+        self.inputs = base
+        self.base_results: Dict[str, RatioResult] = {r.name_en: r for r in compute_ratios(base, registry=registry)}
+        self.results: Dict[str, RatioResult] = dict(self.base_results)
+
+    def update(self, **changes) -> Tuple[str, ...]:
+        """تطبيق قيم جديدة لحقول المدخلات؛ يعيد مفاتيح النسب التي أعيد حسابها."""
+        changed = {k: v for k, v in changes.items() if not _same(getattr(self.inputs, k), v)}
+        if not changed:
+            return ()
+        self.inputs = replace(self.inputs, **changed)
+        keys = self.registry.affected_by(changed)
+        if keys:
+            for r in compute_ratios(self.inputs, keys, registry=self.registry):
+                self.results[r.name_en] = r
+        return keys
+
+    def reset(self) -> Tuple[str, ...]:
+        """العودة إلى الأساس؛ يعيد مفاتيح النسب التي تغيرت."""
+        changed = tuple(k for k, r in self.results.items() if r is not self.base_results[k])
+        self.inputs = self.base
+        self.results = dict(self.base_results)
+        return changed
+
+    def delta(self, key: str) -> Optional[float]:
+        """الفرق بين قيمة السيناريو وقيمة الأساس (None إذا تعذر الحساب)."""
+        new, old = self.results[key].value, self.base_results[key].value
+        if new is None or old is None:
+            return None
+        return new - old
+
+
+# ---------------- شبكة الحساسية (حساب متجه واحد) ----------------
+def _base_arrays(base: FinancialInputs) -> Dict[str, np.ndarray]:
+    return {name: np.float64(np.nan if getattr(base, name) is None else getattr(base, name))
+            for name in INPUT_FIELDS}
+
+
+@dataclass
+class SensitivityGrid:
+    """قيم النسب على كل نقاط الشبكة: values[key] مصفوفة بأبعاد len(axes[i]) لكل حقل."""
+    fields: Tuple[str, ...]
+    axes: Tuple[np.ndarray, ...]
+    values: Dict[str, np.ndarray]
+    base: Dict[str, float]
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(a) for a in self.axes)
+
+    def heatmap(self, key: str, x: str, y: str, at: Optional[Mapping[str, float]] = None) -> pd.DataFrame:
+        """مقطع ثنائي الأبعاد (y × x) لنسبة واحدة؛ بقية الحقول عند المضاعف الأقرب
+        إلى at[field] (الافتراضي 1.0 أي قيمة الأساس)."""
+        at = at or {}
+        index = []
+        for name, axis in zip(self.fields, self.axes):
+            if name in (x, y):
+                index.append(slice(None))
+            else:
+                index.append(int(np.abs(axis - at.get(name, 1.0)).argmin()))
+        plane = self.values[key][tuple(index)]
+        if self.fields.index(x) < self.fields.index(y):
+            plane = plane.T
+        return pd.DataFrame(plane, index=self.axes[self.fields.index(y)], columns=self.axes[self.fields.index(x)])
+
+
+def _evaluate(values: Mapping[str, np.ndarray], keys, registry: RatioRegistry) -> Dict[str, np.ndarray]:
+    with np.errstate(invalid="ignore", over="ignore"):
+        return registry.evaluate(values, ArrayOps, keys)[1]
+
+
+@timed()
+def sensitivity_grid(base: FinancialInputs, ranges: Mapping[str, Sequence[float]],
+                     select: Selection = None, registry: RatioRegistry = REGISTRY) -> SensitivityGrid:
+    """تقييم الشبكة الكاملة (حاصل الضرب الديكارتي للمضاعفات) بعملية بث واحدة.
+
+    ranges: حقل ← مضاعفات قيمة الأساس، مثل {"sales": np.linspace(0.7, 1.1, 41),
+    "interest_expense": np.linspace(1, 3, 21)}. كل حقل يأخذ محورًا مستقلًا،
+    فلا تُبنى مصفوفات المدخلات بحجم الشبكة، والنسب التي لا تعتمد على حقل
+    تُبث على محوره دون نسخ. select يقلل الذاكرة عند الشبكات الكبيرة جدًا.
+    """
+    keys = registry.resolve(select)
+    fields = tuple(ranges)
+    axes = tuple(np.asarray(ranges[f], dtype=np.float64) for f in fields)
+    shape = tuple(len(a) for a in axes)
+
+    values = _base_arrays(base)
+    base_ratios = {k: float(v) for k, v in _evaluate(values, keys, registry).items()}
+    for i, (name, axis) in enumerate(zip(fields, axes)):
+        dims = [1] * len(fields)
+        dims[i] = len(axis)
+        values[name] = values[name] * axis.reshape(dims)
+
+    grid = {k: np.broadcast_to(v, shape) for k, v in _evaluate(values, keys, registry).items()}
+    return SensitivityGrid(fields, axes, grid, base_ratios)
+
+
+def tornado(base: FinancialInputs, ranges: Mapping[str, Sequence[float]], key: str,
+            registry: RatioRegistry = REGISTRY) -> pd.DataFrame:
+    """أثر كل حقل منفردًا (بقية الحقول عند الأساس) على نسبة واحدة، مرتبًا بالأثر."""
+    rows = []
+    keys = registry.resolve(key)
+    values = _base_arrays(base)
+    base_value = float(_evaluate(values, keys, registry)[keys[0]])
+    for name, axis in ranges.items():
+        axis = np.asarray(axis, dtype=np.float64)
+        out = _evaluate({**values, name: values[name] * axis}, keys, registry)[keys[0]]
+        out = np.broadcast_to(out, axis.shape)
+        rows.append({
+            "field": name,
+            "low": float(np.nanmin(out)) if np.isfinite(out).any() else np.nan,
+            "high": float(np.nanmax(out)) if np.isfinite(out).any() else np.nan,
+            "base": base_value,
+        })
+    df = pd.DataFrame(rows, columns=["field", "low", "high", "base"])
+    df["swing"] = df["high"] - df["low"]
+    return df.sort_values("swing", ascending=False, na_position="last").reset_index(drop=True)
+
+
+# ---------------- محاكاة مونت كارلو ----------------
+DISTRIBUTIONS = ("normal", "lognormal", "uniform")
+
+
+@dataclass(frozen=True)
+class FieldDist:
+    """توزيع مضاعف قيمة الأساس لحقل واحد (المتوسط 1 أي قيمة الأساس).
+
+    normal: انحراف معياري spread، lognormal: sigma = spread، uniform: بين
+    1 − spread و1 + spread.
+    """
+    kind: str = "normal"
+    spread: float = 0.1
+
+    def __post_init__(self):
+        if self.kind not in DISTRIBUTIONS:
+            raise ValueError(f"توزيع غير معروف: {self.kind} (المتاح: {DISTRIBUTIONS})")
+        if self.spread < 0:
+            raise ValueError("spread يجب ألا يكون سالبًا.")
+
+    def multipliers(self, z: np.ndarray) -> np.ndarray:
+        """تحويل سحب طبيعي معياري (ربما مترابط) إلى مضاعفات بهذا التوزيع."""
+        if self.kind == "normal":
+            return 1 + self.spread * z
+        if self.kind == "lognormal":
+            return np.exp(self.spread * z - self.spread ** 2 / 2)
+        return 1 + self.spread * (2 * _norm_cdf(z) - 1)
+
+
+def _norm_cdf(z: np.ndarray) -> np.ndarray:
+    """دالة التوزيع الطبيعي المعياري (تقريب Abramowitz–Stegun 7.1.26، خطأ < 1.5e-7)."""
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+
+def _cholesky(fields: Tuple[str, ...], corr: Optional[Mapping[Tuple[str, str], float]]) -> Optional[np.ndarray]:
+    if not corr:
+        return None
+    pos = {name: i for i, name in enumerate(fields)}
+    c = np.eye(len(fields))
+    for (a, b), rho in corr.items():
+        if a not in pos or b not in pos:
+            raise KeyError(f"ارتباط بحقل بلا توزيع: {a}، {b}")
+        c[pos[a], pos[b]] = c[pos[b], pos[a]] = rho
+    try:
+        return np.linalg.cholesky(c)
+    except np.linalg.LinAlgError:
+        raise ValueError("مصفوفة الارتباط ليست موجبة التعريف.") from None
+
+
+@dataclass
+class MonteCarloResult:
+    """سحوبات كل نسبة (float32) مع عدّ الفئات لكل نسبة لها BandTable.
+
+    band_counts[key][0] عدد السحوبات بلا قيمة (قسمة على صفر مثلًا)، ثم
+    عدد كل فئة بالترتيب. الاحتمالات من إجمالي n سحبة.
+    """
+    n: int
+    base: Dict[str, float]
+    values: Dict[str, np.ndarray]
+    band_counts: Dict[str, np.ndarray]
+
+    def percentiles(self, q: Sequence[float] = (5, 25, 50, 75, 95)) -> pd.DataFrame:
+        """نسبة × مئين (تُستبعد السحوبات بلا قيمة)."""
+        rows = {}
+        with np.errstate(invalid="ignore"):
+            for key, v in self.values.items():
+                rows[key] = (np.nanpercentile(v, q) if not np.isnan(v).all()
+                             else np.full(len(q), np.nan))
+        return pd.DataFrame.from_dict(rows, orient="index", columns=[f"p{x:g}" for x in q])
+
+    def probability(self, key: str, below: Optional[float] = None, above: Optional[float] = None) -> float:
+        """P(x < below) أو P(x > above) أو كلاهما معًا، مثل probability("Current Ratio", below=1)."""
+        v = self.values[key]
+        hit = np.ones(v.shape, dtype=bool)
+        if below is not None:
+            hit &= v < np.float32(below)
+        if above is not None:
+            hit &= v > np.float32(above)
+        return float(np.count_nonzero(hit)) / self.n
+
+    def band_probabilities(self, key: str, registry: RatioRegistry = REGISTRY) -> pd.DataFrame:
+        """احتمال كل فئة تفسير (أول صف: بلا قيمة)."""
+        bands = registry.ratios[key].bands
+        labels = [bands.label(code) for code in range(-1, len(bands.labels))]
+        return pd.DataFrame({
+            "band": [ar for ar, _ in labels],
+            "band_en": [en for _, en in labels],
+            "probability": self.band_counts[key] / self.n,
+        })
+
+
+@timed()
+def monte_carlo(base: FinancialInputs, dists: Mapping[str, FieldDist], n: int = 100_000,
+                corr: Optional[Mapping[Tuple[str, str], float]] = None, seed: Optional[int] = None,
+                chunk_size: int = 100_000, select: Selection = None,
+                registry: RatioRegistry = REGISTRY) -> MonteCarloResult:
+    """سحب n سيناريو لمدخلات فترة واحدة وحساب توزيع النسب.
+
+    dists: حقل ← FieldDist، وcorr: (حقل، حقل) ← معامل ارتباط (عبر Cholesky
+    على سحوبات طبيعية، ثم تحويل كل عمود إلى توزيعه). السحب على دفعات من
+    chunk_size حتى لا تتجاوز المصفوفات الوسيطة حجم دفعة واحدة، ولا تُحسب
+    في كل دفعة إلا النسب المعتمدة على حقل عشوائي؛ البقية ثابتة عند الأساس.
+    نفس seed يعطي نفس النتائج مهما كان chunk_size.
+    """
+    keys = registry.resolve(select) or tuple(registry.ratios)
+    fields = tuple(dists)
+    unknown = [name for name in fields if name not in INPUT_FIELDS]
+    if unknown:
+        raise KeyError(f"حقول غير معروفة: {unknown}")
+    chol = _cholesky(fields, corr)
+    rng = np.random.default_rng(seed)
+
+    values = _base_arrays(base)
+    base_ratios = {k: float(v) for k, v in _evaluate(values, keys, registry).items()}
+    moving = set(registry.affected_by(fields)) if fields else set()
+    live = tuple(k for k in keys if k in moving)
+
+    banded = {k: registry.ratios[k].bands for k in keys if registry.ratios[k].bands is not None}
+    counts = {k: np.zeros(len(b.labels) + 1, dtype=np.int64) for k, b in banded.items()}
+    out = {k: np.empty(n, dtype=np.float32) for k in live}
+
+    for start in range(0, n, chunk_size):
+        m = min(chunk_size, n - start)
+        z = rng.standard_normal((m, len(fields)))
+        if chol is not None:
+            z = z @ chol.T
+        draw = dict(values)
+        for i, name in enumerate(fields):
+            draw[name] = values[name] * dists[name].multipliers(z[:, i])
+        ratios = _evaluate(draw, live, registry) if live else {}
+        for k in live:
+            v = np.broadcast_to(ratios[k], (m,))
+            out[k][start:start + m] = v
+            if k in counts:
+                counts[k] += np.bincount(banded[k].codes(v) + 1, minlength=len(counts[k]))
+
+    for k in keys:
+        if k not in out:  # لا يعتمد على أي حقل عشوائي
+            out[k] = np.broadcast_to(np.float32(base_ratios[k]), (n,))
+            if k in counts:
+                counts[k][banded[k].code(base_ratios[k]) + 1] = n
+    return MonteCarloResult(n, base_ratios, {k: out[k] for k in keys}, counts)
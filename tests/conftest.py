@@ -0,0 +1,5 @@
+# الوحدات في جذر المستودع مباشرة
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from ratios import (CASH_RATIO_BANDS, CURRENT_RATIO_BANDS, DEBT_RATIO_BANDS, DTE_BANDS, MARGIN_BANDS,
+                    QUICK_RATIO_BANDS, interpret_cash_ratio, interpret_current_ratio, interpret_debt_ratio,
+                    interpret_dte, interpret_margin, interpret_quick_ratio)
+
+NO_DATA = ("لا يمكن تقييم النسبة.", "Not enough data.")
+
+
+# ---------------- المرجع: شروط if الأصلية قبل BandTable ----------------
+def _current(x):
+    if x < 1: return ("منخفضة (<1).", "Low (<1).")
+    if 1 <= x <= 2: return ("ضمن النطاق (1–2).", "Acceptable (1–2).")
+    return ("مرتفعة (>2).", "High (>2).")
+
+
+def _quick(x):
+    if x < 0.8: return ("ضعيفة (<0.8).", "Weak (<0.8).")
+    if 0.8 <= x < 1: return ("متوسطة (≈1).", "Moderate (≈1).")
+    return ("جيدة (≥1).", "Good (≥1).")
+
+
+def _cash(x):
+    if x < 0.2: return ("ضعيفة (<0.2).", "Weak (<0.2).")
+    if 0.2 <= x < 0.5: return ("متوسطة (0.2–0.5).", "Moderate (0.2–0.5).")
+    return ("مطمئنة (≥0.5).", "Comfortable (≥0.5).")
+
+
+def _debt(x):
+    if x > 0.6: return ("مرتفعة (>60%).", "High (>60%).")
+    if 0.4 <= x <= 0.6: return ("متوازنة (40–60%).", "Balanced (40–60%).")
+    return ("منخفضة (<40%).", "Low (<40%).")
+
+
+def _dte(x):
+    if x > 2: return ("مرتفعة (>2).", "High (>2).")
+    if 1 <= x <= 2: return ("متوسطة (1–2).", "Moderate (1–2).")
+    return ("منخفضة (<1).", "Low (<1).")
+
+
+def _margin(x, ar="هامش", en="Margin"):
+    pct = x * 100
+    if pct < 25: return (f"{ar} ضعيف (<25%).", f"{en} Weak (<25%).")
+    if 25 <= pct < 30: return (f"{ar} متوسط (25–30%).", f"{en} Moderate (25–30%).")
+    if 30 <= pct <= 35: return (f"{ar} جيد (30–35%).", f"{en} Good (30–35%).")
+    return (f"{ar} ممتاز (>35%).", f"{en} Excellent (>35%).")
+
+
+def _around(*edges):
+    """كل حد وما قبله وبعده مباشرة، وقيم بعيدة في الطرفين."""
+    points = [-1e9, -1.0, 0.0, 1e9]
+    for e in edges:
+        points += [np.nextafter(e, -np.inf), e, np.nextafter(e, np.inf)]
+    return points
+
+
+CASES = [
+    (interpret_current_ratio, CURRENT_RATIO_BANDS, _current, _around(1, 2)),
+    (interpret_quick_ratio, QUICK_RATIO_BANDS, _quick, _around(0.8, 1)),
+    (interpret_cash_ratio, CASH_RATIO_BANDS, _cash, _around(0.2, 0.5)),
+    (interpret_debt_ratio, DEBT_RATIO_BANDS, _debt, _around(0.4, 0.6)),
+    (interpret_dte, DTE_BANDS, _dte, _around(1, 2)),
+    (lambda x: interpret_margin(x, "هامش", "Margin"), MARGIN_BANDS.named("هامش", "Margin"), _margin,
+     _around(0.25, 0.3, 0.35) + [25 / 100, 30 / 100, 35 / 100, 0.2999999, 0.3500001]),
+]
+
+
+@pytest.mark.parametrize("interpret, table, reference, points", CASES)
+def test_interpret_matches_original_thresholds(interpret, table, reference, points):
+    for x in points:
+        assert interpret(x) == reference(x), x
+    assert interpret(None) == table(None) == NO_DATA
+
+
+@pytest.mark.parametrize("interpret, table, reference, points", CASES)
+def test_codes_match_scalar_interpretation(interpret, table, reference, points):
+    codes = table.codes(np.array(points + [np.nan]))
+    assert codes[-1] == -1
+    assert list(codes[:-1]) == [table.code(x) for x in points]
+    for lang, i in (("ar", 0), ("en", 1)):
+        assert list(table.texts(codes[:-1], lang)) == [reference(x)[i] for x in points]
+        assert table.texts(codes[-1:], lang)[0] == NO_DATA[i]
+        assert list(table.categorical(codes[:-1], lang)) == [reference(x)[i] for x in points]
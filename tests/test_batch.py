@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from ratios import INPUT_FIELDS, FinancialInputsBatch
+
+
+def _batch(n: int = 5) -> FinancialInputsBatch:
+    rng = np.random.default_rng(0)
+    return FinancialInputsBatch({name: rng.normal(100, 10, n) for name in INPUT_FIELDS})
+
+
+@pytest.mark.parametrize("clone", [lambda b: pickle.loads(pickle.dumps(b)), copy.copy, copy.deepcopy])
+def test_batch_survives_pickle_and_copy(clone):
+    batch = _batch()
+    other = clone(batch)
+    assert len(other) == len(batch)
+    assert other.index.equals(batch.index)
+    for name in INPUT_FIELDS:
+        np.testing.assert_array_equal(getattr(other, name), getattr(batch, name))
+
+
+def test_unknown_attribute_raises_attribute_error():
+    batch = _batch()
+    with pytest.raises(AttributeError):
+        batch.not_a_field
+    assert not hasattr(batch, "__array__")
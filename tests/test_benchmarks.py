@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from benchmarks import BENCHMARKS, _cases, run_benchmarks, synthetic_statements
+
+
+def test_every_benchmark_has_a_case(tmp_path):
+    assert tuple(_cases(synthetic_statements(10), str(tmp_path))) == BENCHMARKS
+
+
+def test_run_selected_benchmarks():
+    results = run_benchmarks([20], repeat=1, only=["compute_ratios_frame", "ratio_cube"])
+    assert [r.name for r in results] == ["compute_ratios_frame", "ratio_cube"]
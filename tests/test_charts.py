@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import WEBGL_THRESHOLD, downsample_indices, downsample_long, trend_figure
+
+
+@pytest.mark.parametrize("n, max_points", [(1_000, 400), (1_001, 7), (401, 400), (50, 4), (10, 3)])
+def test_downsample_keeps_endpoints_and_extremes(n, max_points):
+    y = np.random.default_rng(n).normal(size=n)
+    keep = downsample_indices(y, max_points)
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert len(keep) <= max(max_points, 2)
+    assert (np.diff(keep) > 0).all()
+    if max_points >= 4:
+        assert {int(np.argmin(y)), int(np.argmax(y))} <= set(keep.tolist())
+
+
+def test_short_series_are_untouched():
+    np.testing.assert_array_equal(downsample_indices(np.arange(5.0), 5), np.arange(5))
+
+
+def test_downsample_long_per_line():
+    x = np.arange(1_000)
+    df = pd.concat([
+        pd.DataFrame({"line": "long", "x": x[::-1], "y": np.sin(x / 20)}),  # غير مرتب: يُرتب حسب x أولًا
+        pd.DataFrame({"line": "short", "x": x[:5], "y": np.arange(5.0)}),
+    ])
+    out = downsample_long(df, "x", "y", ["line"], max_points=50)
+    long, short = out[out["line"] == "long"], out[out["line"] == "short"]
+    assert len(long) <= 50 and (long["x"].iloc[0], long["x"].iloc[-1]) == (0, 999)
+    assert long["x"].is_monotonic_increasing
+    assert short["y"].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_trend_figure_drops_missing_and_switches_to_webgl():
+    years = np.arange(3_000)
+    long = pd.DataFrame({"Year": np.tile(years, 2), "Ratio (EN)": np.repeat(["a", "b"], len(years)),
+                         "Value": np.where(years % 7 == 0, np.nan, np.cos(years / 50.0)).tolist() * 2})
+    fig = trend_figure(long, max_points=3_000)
+    assert len(fig.data) == 2 and all(t.type == "scattergl" for t in fig.data)
+    assert all(not np.isnan(np.asarray(t.y, dtype=float)).any() for t in fig.data)
+    small = trend_figure(long[long["Year"] < 20])
+    assert all(t.type == "scatter" for t in small.data) and sum(len(t.x) for t in small.data) < WEBGL_THRESHOLD
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_statements
+from cli import main
+
+
+@pytest.fixture
+def books(tmp_path):
+    folder = tmp_path / "books"
+    folder.mkdir()
+    synthetic_statements(6, seed=1).to_csv(folder / "a.csv", index=False)
+    synthetic_statements(4, seed=2).to_csv(folder / "b.csv", index=False)
+    return folder
+
+
+# ---------------- batch ----------------
+def test_batch_ok(books, tmp_path):
+    out = tmp_path / "out.csv"
+    assert main(["batch", str(books), "-o", str(out), "-j", "1", "-q"]) == 0
+    assert len(pd.read_csv(out)) == 10
+
+
+def test_batch_with_a_failed_file(books, tmp_path):
+    (books / "broken.xlsx").write_bytes(b"not a workbook")
+    out, errors = tmp_path / "out.csv", tmp_path / "errors.csv"
+    assert main(["batch", str(books), "-o", str(out), "-j", "1", "-q", "--errors", str(errors)]) == 1
+    assert len(pd.read_csv(out)) == 10  # الملفات السليمة تُكتب رغم الفشل
+    assert pd.read_csv(errors)["path"].str.endswith("broken.xlsx").tolist() == [True]
+
+
+def test_batch_empty_directory(tmp_path, capsys):
+    assert main(["batch", str(tmp_path), "-o", str(tmp_path / "out.csv")]) == 1
+    assert "no workbooks found" in capsys.readouterr().err
+
+
+# ---------------- export ----------------
+@pytest.mark.parametrize("stream", [[], ["--stream"]])
+def test_export_ok_and_no_matching_period(books, tmp_path, stream):
+    out = tmp_path / "out.csv"
+    assert main(["export", str(books / "a.csv"), "-o", str(out), "-s", "Current Ratio", *stream]) == 0
+    assert len(pd.read_csv(out)) == 6
+    assert main(["export", str(books / "a.csv"), "-o", str(out), "--company", "nobody", *stream]) == 1
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["{tmp}/missing.csv"], "No such file"),
+    (["{books}/a.csv", "-s", "Nope"], "Nope"),
+    (["{books}/a.csv", "-o", "{tmp}/out.txt"], "txt"),
+])
+def test_export_errors_exit_1_without_traceback(books, tmp_path, capsys, argv, message):
+    argv = [a.format(books=books, tmp=tmp_path) for a in argv]
+    if "-o" not in argv:
+        argv += ["-o", str(tmp_path / "out.csv")]
+    assert main(["export", *argv]) == 1
+    err = capsys.readouterr().err
+    assert err.startswith("error: ") and message in err and "Traceback" not in err
+
+
+def test_bad_arguments_exit_2(capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["export"])
+    assert exc.value.code == 2
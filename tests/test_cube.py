@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic_statements
+from cube import NO_CODE, RatioCube
+from panel import Panel
+from ratios import REGISTRY, compute_ratios, compute_ratios_frame
+
+
+def _cube(n: int = 60, missing: float = 0.1) -> RatioCube:
+    df = synthetic_statements(n, seed=3, years=5, missing=missing)
+    # صف مكرر لنفس (الشركة، السنة) بقيم مختلفة: Panel يعتمد الأول
+    df = pd.concat([df, df.iloc[[7]].assign(sales=1.0)], ignore_index=True)
+    return RatioCube(Panel(df))
+
+
+def test_results_match_compute_ratios():
+    cube = _cube()
+    for company, year in cube.panel.keys():
+        expected = compute_ratios(cube.panel.inputs_for(company, year))
+        got = cube.results(company, year)
+        assert [r.spec.key for r in got] == [r.spec.key for r in expected]
+        for a, b in zip(got, expected):
+            assert a.value == b.value or (a.value is None and b.value is None)
+            assert a.as_dict() == b.as_dict()
+
+
+def test_values_and_codes_match_frame_and_tables():
+    cube = _cube()
+    wide = cube.frame()
+    expected = compute_ratios_frame(cube.panel.select())
+    np.testing.assert_allclose(wide.to_numpy(), expected[wide.columns].to_numpy(), rtol=1e-12, equal_nan=True)
+    for j, key in enumerate(cube.ratios):
+        table = REGISTRY.ratios[key].table
+        for i, value in enumerate(cube.values[:, j]):
+            code = table.code(value) if table is not None and value == value else None
+            assert cube.codes[i, j] == (NO_CODE if code is None else code)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_loader
+from benchmarks import synthetic_statements
+from cube import RatioCube
+from panel import DEFAULT_COMPANY, Panel
+from ratios import inputs_from_workbook
+
+
+def test_slow_parse_does_not_block_other_files(tmp_path, monkeypatch):
+    slow, fast = tmp_path / "slow.xlsx", tmp_path / "fast.xlsx"
+    slow.write_bytes(b"slow")
+    fast.write_bytes(b"fast")
+    started, release = threading.Event(), threading.Event()
+
+    def read_source(path, version, sidecar=True):
+        if path.endswith("slow.xlsx"):
+            started.set()
+            release.wait(5)
+        return pd.DataFrame({"year": [2020]})
+
+    monkeypatch.setattr(data_loader, "read_source", read_source)
+    data_loader.clear_cache()
+    worker = threading.Thread(target=data_loader.load_workbook, args=(str(slow),))
+    worker.start()
+    try:
+        assert started.wait(5)
+        t = time.perf_counter()
+        data_loader.load_workbook(str(fast))
+        assert time.perf_counter() - t < 1  # لم ينتظر قراءة الملف الآخر
+    finally:
+        release.set()
+        worker.join()
+        data_loader.clear_cache()
+
+
+def test_same_file_is_parsed_once(tmp_path, monkeypatch):
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(b"book")
+    calls = []
+
+    def read_source(path, version, sidecar=True):
+        calls.append(path)
+        time.sleep(0.05)
+        return pd.DataFrame({"year": [2020]})
+
+    monkeypatch.setattr(data_loader, "read_source", read_source)
+    data_loader.clear_cache()
+    threads = [threading.Thread(target=data_loader.load_workbook, args=(str(path),)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    data_loader.clear_cache()
+    assert len(calls) == 1
+
+
+def test_panel_is_keyed_on_the_version_it_was_built_from(tmp_path, monkeypatch):
+    # الملف يتغير بين قراءة الإطار وبناء Panel: لا يُخزن Panel القديم تحت البصمة الجديدة
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(b"book")
+    versions = iter(["v1", "v2", "v2", "v2", "v2"])
+    monkeypatch.setattr(data_loader, "data_version", lambda key: next(versions))
+    monkeypatch.setattr(data_loader, "read_source",
+                        lambda path, version, sidecar=True: pd.DataFrame({"year": [2020 if version == "v1" else 2021]}))
+    data_loader.clear_cache()
+    try:
+        assert data_loader.load_panel(str(path)).years() == [2020]
+        assert data_loader.load_panel(str(path)).years() == [2021]
+    finally:
+        data_loader.clear_cache()
+
+
+def test_ratio_chunks_carry_the_prior_year_across_chunks(tmp_path):
+    # ROA والدوران تستخدم متوسط السنة السابقة: الدفعات الصغيرة تعطي نفس قيم التحميل الكامل
+    df = synthetic_statements(30, seed=1)
+    for name, frame in (("asc", df), ("desc", df.iloc[::-1]), ("gap", df.drop(index=[4, 15]))):
+        path = tmp_path / f"{name}.csv"
+        frame.to_csv(path, index=False)
+        expected = RatioCube(Panel(pd.read_csv(path))).frame()
+        got = pd.concat(data_loader.iter_ratio_chunks(str(path), chunk_size=4)).set_index(["company", "year"])
+        pd.testing.assert_frame_equal(got.sort_index(), expected.sort_index())
+
+
+def test_ratio_chunks_without_company_column_use_the_default(tmp_path):
+    path = tmp_path / "single.csv"
+    synthetic_statements(6).drop(columns=["company", "sector"]).to_csv(path, index=False)
+    chunks = list(data_loader.iter_ratio_chunks(str(path), chunk_size=2))
+    assert all(list(c.columns[:2]) == ["company", "year"] for c in chunks)
+    assert set(pd.concat(chunks)["company"]) == {DEFAULT_COMPANY}
+
+
+# ---------------- الملف الجانبي ----------------
+def _workbook_with_sidecar(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "book.xlsx")
+    synthetic_statements(8, seed=2).to_excel(path, index=False)
+    reads = []
+    read_excel = pd.read_excel
+    monkeypatch.setattr(data_loader.pd, "read_excel", lambda p: reads.append(p) or read_excel(p))
+    df = data_loader.read_source(path, data_loader.data_version(path))
+    assert os.path.exists(data_loader.sidecar_path(path)) and len(reads) == 1
+    return path, df, reads
+
+
+def test_sidecar_is_used_while_the_workbook_is_unchanged(tmp_path, monkeypatch):
+    path, df, reads = _workbook_with_sidecar(tmp_path, monkeypatch)
+    pd.testing.assert_frame_equal(data_loader.read_source(path, data_loader.data_version(path)), df)
+    assert len(reads) == 1
+
+
+def test_stale_sidecar_is_ignored_and_rewritten(tmp_path, monkeypatch):
+    path, df, reads = _workbook_with_sidecar(tmp_path, monkeypatch)
+    synthetic_statements(8, seed=3).to_excel(path, index=False)
+    version = data_loader.data_version(path)
+    fresh = data_loader.read_source(path, version)
+    assert len(reads) == 2 and not fresh.equals(df)
+    assert data_loader._read_sidecar(path, version) is not None  # كُتب من جديد بالبصمة الجديدة
+    pd.testing.assert_frame_equal(data_loader.read_source(path, version), fresh)
+    assert len(reads) == 2
+
+
+@pytest.mark.parametrize("damage", [lambda b: b"not a feather file", lambda b: b[:len(b) // 2], lambda b: b""])
+def test_corrupt_sidecar_falls_back_to_the_workbook(tmp_path, monkeypatch, damage):
+    path, df, reads = _workbook_with_sidecar(tmp_path, monkeypatch)
+    side = data_loader.sidecar_path(path)
+    with open(side, "rb") as f:
+        data = f.read()
+    with open(side, "wb") as f:
+        f.write(damage(data))
+    version = data_loader.data_version(path)
+    pd.testing.assert_frame_equal(data_loader.read_source(path, version), df)
+    assert len(reads) == 2
+    assert data_loader._read_sidecar(path, version) is not None
+
+
+# ---------------- القراءة المتدفقة ----------------
+def test_xlsx_stream_matches_read_excel_with_duplicate_headers(tmp_path):
+    df = synthetic_statements(11, seed=4, missing=0.1)
+    header = [*df.columns, "Total assets", "Notes"]  # عمود مكرر: pandas يسميه "Total assets.1"
+    path = str(tmp_path / "dup.xlsx")
+    wb = openpyxl.Workbook()
+    first = wb.active
+    first.title = "first"
+    first.append(header)
+    for row in df.itertuples(index=False):
+        first.append([None if v != v else v for v in row] + [-1.0, "x"])
+    second = wb.create_sheet("second")
+    second.append(header)
+    second.append([None if v != v else v for v in df.iloc[0]] + [-1.0, "y"])
+    wb.save(path)
+
+    raw = pd.read_excel(path, sheet_name="first")
+    assert "Total assets.1" in raw.columns
+    expected = inputs_from_workbook(raw).join(raw[["company", "year"]])
+    chunks = list(data_loader.iter_input_chunks(path, chunk_size=4, sheets=["first"]))
+    assert [len(c) for c in chunks] == [4, 4, 3]
+    got = pd.concat(chunks, ignore_index=True).drop(columns="sheet")
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+
+    both = pd.concat(data_loader.iter_input_chunks(path, chunk_size=4), ignore_index=True)
+    assert both["sheet"].tolist() == ["first"] * 11 + ["second"]
+    assert (both["total_assets"] != -1).all()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic_statements
+from cube import RatioCube
+from export import cube_chunks, file_chunks, write_report
+from panel import Panel
+from ratios import WORKBOOK_COLUMNS
+
+
+def test_file_chunks_accepts_generators(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({column: rng.normal(1_000, 100, 12) for column in WORKBOOK_COLUMNS.values()})
+    df.insert(0, "year", np.arange(2000, 2012))
+    path = tmp_path / "statements.csv"
+    df.to_csv(path, index=False)
+
+    years = (y for y in range(2000, 2012, 2))
+    chunks = list(file_chunks(str(path), years=years, chunk_size=3))
+    assert pd.concat(chunks)["year"].tolist() == list(range(2000, 2012, 2))
+
+
+def test_streamed_export_matches_the_cube_export(tmp_path):
+    source = tmp_path / "statements.csv"
+    synthetic_statements(40, seed=2).iloc[::-1].to_csv(source, index=False)  # سنوات تنازلية كملف البيانات
+    cube = RatioCube(Panel(pd.read_csv(source)))
+    write_report(cube_chunks(cube), str(tmp_path / "cube.csv"))
+    write_report(file_chunks(str(source), chunk_size=3), str(tmp_path / "stream.csv"))
+
+    keys = ["company", "year", "ratio_en"]
+    expected = pd.read_csv(tmp_path / "cube.csv").sort_values(keys, ignore_index=True)
+    got = pd.read_csv(tmp_path / "stream.csv").sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+import pytest
+
+from formatting import NumberFormat, format_numbers
+from ratios import fmt_number
+
+VALUES = np.array([
+    0.0, -0.0, 1.0, -1.0, 0.5, 0.125, 0.005, 0.015, 2.675, -2.675, 1.005, 999.995, 999_999.995,
+    0.000_4, -0.000_4, 123.456, 1_234.5, 12_345_678.9, -98_765.4321, 1e11, 1e12, 1e15, -1e15, 1e20,
+    np.nan, np.inf, -np.inf,
+])
+OPTIONS = list(itertools.product(range(0, 6), (False, True), (False, True), (False, True)))
+
+
+def _values() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    random = np.concatenate([rng.normal(0, 1, 500), rng.lognormal(5, 4, 500) * rng.choice([-1, 1], 500)])
+    return np.concatenate([VALUES, random])
+
+
+@pytest.mark.parametrize("decimals,percent,thousands,arabic_digits", OPTIONS)
+def test_many_matches_scalar(decimals, percent, thousands, arabic_digits):
+    fmt = NumberFormat(decimals, percent, thousands, arabic_digits)
+    values = _values()
+    assert fmt.many(values).tolist() == [fmt(v) for v in values.tolist()]
+
+
+def test_many_keeps_shape_and_handles_empty():
+    fmt = NumberFormat()
+    assert fmt.many(np.arange(6.0).reshape(2, 3)).shape == (2, 3)
+    assert fmt.many([]).tolist() == []
+    assert fmt.many([np.nan, np.nan]).tolist() == ["—", "—"]
+
+
+def test_format_numbers_matches_fmt_number():
+    values = _values()
+    for percent in (False, True):
+        expected = [fmt_number(None if v != v else v, percent) for v in values.tolist()]
+        assert format_numbers(values, percent=percent).tolist() == expected
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from panel import add_prior_period
+
+
+def _inputs(total_assets):
+    return pd.DataFrame({"total_assets": np.asarray(total_assets, dtype=np.float64)})
+
+
+def test_prior_period_uses_previous_consecutive_year():
+    out = add_prior_period(_inputs([10, 20, 40, 5]), ["a", "a", "a", "b"], [2019, 2020, 2022, 2020])
+    np.testing.assert_array_equal(out["prev_total_assets"].to_numpy(), [np.nan, 10, np.nan, np.nan])
+
+
+def test_duplicate_period_keeps_first_row():
+    # 2020 مكررة [1, 9]: Panel يعرض الأول، فالسنة 2021 تأخذ 1 لا 9
+    out = add_prior_period(_inputs([5, 1, 9, 30]), ["a"] * 4, [2019, 2020, 2020, 2021])
+    np.testing.assert_array_equal(out["prev_total_assets"].to_numpy(), [np.nan, 5, 5, 1])
+
+
+def test_existing_prior_values_are_kept():
+    df = _inputs([10, 20]).assign(prev_total_assets=[np.nan, 7.0])
+    out = add_prior_period(df, ["a", "a"], [2019, 2020])
+    np.testing.assert_array_equal(out["prev_total_assets"].to_numpy(), [np.nan, 7])
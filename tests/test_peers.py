@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from cube import RatioCube
+from panel import Panel
+from peers import PeerRanks
+
+
+def _panel(rows):
+    """(شركة، سنة، قطاع، نسبة التداول) ← Panel بأصول متداولة = النسبة × 100."""
+    return Panel(pd.DataFrame({
+        "company": [r[0] for r in rows], "year": [r[1] for r in rows], "sector": [r[2] for r in rows],
+        "Current assets": [r[3] * 100.0 for r in rows], "Current liabilities": 100.0,
+    }))
+
+
+ROWS = [("A", 2020, "S", 1.0), ("B", 2020, "S", 2.0), ("C", 2020, "S", 3.0), ("D", 2020, "S", 4.0),
+        ("E", 2020, "S", 5.0), ("F", 2020, "T", 10.0)]
+
+
+def test_percentiles_and_quartiles_within_sector():
+    peers = PeerRanks(RatioCube(_panel(ROWS)))
+    contexts = [peers.context(c, 2020, "Current Ratio") for c in "ABCDE"]
+    assert [c.peers for c in contexts] == [5] * 5
+    assert [c.percentile for c in contexts] == pytest.approx([10, 30, 50, 70, 90])
+    assert [c.quartile for c in contexts] == [1, 2, 3, 3, 4]
+    assert (contexts[0].q1, contexts[0].median, contexts[0].q3) == pytest.approx((2, 3, 4))
+    # F وحدها في قطاعها: أقل من MIN_PEERS فلا ترتيب داخل القطاع، لكنها ضمن شركات السنة
+    f = peers.context("F", 2020, "Current Ratio")
+    assert (f.peers, f.percentile, f.median) == (1, None, None)
+    assert f.universe_percentile == pytest.approx(5.5 / 6 * 100)
+
+
+def test_duplicate_company_year_rows_are_not_extra_peers():
+    clean = PeerRanks(RatioCube(_panel(ROWS)))
+    dup = PeerRanks(RatioCube(_panel(ROWS + [("E", 2020, "S", 100.0), ("A", 2020, "S", 0.5)])))
+    for c in "ABCDEF":
+        assert dup.context(c, 2020, "Current Ratio") == clean.context(c, 2020, "Current Ratio")
+    assert dup.long()["peers"].tolist() == clean.long()["peers"].tolist()
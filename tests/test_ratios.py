@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from ratios import INPUT_FIELDS, OPTIONAL_FIELDS, FinancialInputs, compute_ratios, compute_ratios_frame
+
+DENOMINATORS = ("sales", "current_liabilities", "total_assets", "equity", "inventory", "cogs",
+                "interest_expense", "prev_total_assets", "prev_inventory")
+
+
+def _inputs(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    """مدخلات عشوائية فيها NaN (في كل الحقول) وأصفار في المقامات."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({name: rng.normal(1_000, 500, n) for name in INPUT_FIELDS})
+    for name in INPUT_FIELDS:
+        df.loc[rng.random(n) < (0.3 if name in OPTIONAL_FIELDS else 0.05), name] = np.nan
+    for name in DENOMINATORS:
+        df.loc[rng.random(n) < 0.1, name] = 0.0
+    return df
+
+
+def _scalar(df: pd.DataFrame) -> pd.DataFrame:
+    # FinancialInputs مبنية مباشرة من الصف (NaN كما هي) مثل app.py الأصلي
+    rows = []
+    for values in df.to_dict("records"):
+        results = compute_ratios(FinancialInputs(**values))
+        rows.append({r.name_en: np.nan if r.value is None else r.value for r in results})
+    return pd.DataFrame(rows, index=df.index)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_scalar_and_frame_paths_agree(seed):
+    df = _inputs(seed=seed)
+    frame = compute_ratios_frame(df)
+    scalar = _scalar(df)[frame.columns]
+    np.testing.assert_allclose(scalar.to_numpy(dtype=np.float64), frame.to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+def test_nan_optional_fields_act_as_missing():
+    base = dict(sales=1_000.0, cogs=600.0, opex=200.0, interest_expense=50.0, tax_expense=30.0,
+                total_assets=5_000.0, equity=2_000.0, inventory=400.0)
+    with_nan = {r.name_en: r.value for r in compute_ratios(FinancialInputs(
+        **base, net_income=np.nan, prev_total_assets=np.nan, prev_inventory=np.nan))}
+    with_none = {r.name_en: r.value for r in compute_ratios(FinancialInputs(**base))}
+    assert with_nan == with_none
+
+
+def test_zero_denominators_give_missing():
+    values = {r.name_en: r.value for r in compute_ratios(FinancialInputs())}
+    frame = compute_ratios_frame(pd.DataFrame([{}], index=[0]))
+    for key, value in values.items():
+        if value is None:
+            assert np.isnan(frame.loc[0, key])
+
+
+def test_nan_operands_give_none_value():
+    fi = FinancialInputs(sales=np.nan, total_assets=np.nan, equity=1_000.0)
+    results = compute_ratios(fi)
+    assert all(r.value is None or (isinstance(r.value, float) and r.value == r.value) for r in results)
+    margin = next(r for r in results if r.name_en == "Gross Margin")
+    assert margin.value is None and margin.display == "—"
+
+
+def test_registry_caches_reset_on_register():
+    from ratios import RatioRegistry, RatioSpec
+
+    registry = RatioRegistry()
+    registry.node("ebit", ("sales", "cogs", "opex"), lambda ops, s, c, o: s - c - o)
+    assert registry.derive({"sales": 10.0, "cogs": 4.0, "opex": 1.0}, ("ebit",)) == {"ebit": 5.0}
+    assert registry.field_dependencies()["sales"] == ()
+
+    registry.register(RatioSpec("g", "م", "EBIT Margin", "", "", "", "", "", lambda x: ("", ""),
+                                inputs=("ebit", "sales")))
+    assert registry.field_dependencies()["sales"] == ("EBIT Margin",)
+    assert registry.evaluate({"sales": 10.0, "cogs": 4.0, "opex": 1.0})[1] == {"EBIT Margin": 0.5}
+
+
+def test_resolve_by_name_group_and_unknown():
+    from ratios import REGISTRY
+
+    assert REGISTRY.resolve(None) is None
+    assert REGISTRY.resolve("Current Ratio") == ("Current Ratio",)
+    assert REGISTRY.resolve("نسبة التداول") == ("Current Ratio",)
+    group = REGISTRY.resolve("نسب الأصول")
+    assert group and all(REGISTRY.ratios[k].group == "نسب الأصول" for k in group)
+    assert list(group) == [k for k in REGISTRY.ratios if k in group]  # بترتيب السجل
+    assert REGISTRY.resolve(["Gross Margin", "Current Ratio"]) == ("Current Ratio", "Gross Margin")
+    with pytest.raises(KeyError):
+        REGISTRY.resolve("No Such Ratio")
+
+
+def test_selected_ratios_match_full_computation():
+    fi = FinancialInputs(sales=1_000.0, cogs=600.0, current_assets=500.0, current_liabilities=250.0,
+                         total_assets=2_000.0, equity=900.0)
+    full = {r.name_en: r.value for r in compute_ratios(fi)}
+    part = compute_ratios(fi, "نسب الأصول")
+    assert part and {r.name_en: r.value for r in part} == {k: full[k] for k in (r.name_en for r in part)}
+
+
+def test_required_fields_are_cached_until_registry_changes():
+    from ratios import RatioRegistry, RatioSpec
+
+    registry = RatioRegistry()
+    spec = RatioSpec("g", "م", "Margin", "", "", "{sales}", "", "", lambda x: ("", ""), inputs=("cogs", "sales"))
+    registry.register(spec)
+    assert registry.required_fields() == ("sales", "cogs")
+    assert registry.required_fields() is registry.required_fields()
+    registry.register(RatioSpec("g", "ن", "Cash", "", "", "{cash}", "", "", lambda x: ("", ""),
+                                inputs=("cash", "equity")))
+    assert registry.required_fields(with_text=True) == ("sales", "cogs", "cash", "equity")
+
+
+def test_memo_hits_equal_inputs_with_nan_and_clears():
+    from ratios import compute_derived_cached, compute_ratios_cached, memo_clear, memo_info
+
+    def inputs(nan):
+        return FinancialInputs(sales=1_000.0, cogs=600.0, net_income=nan, prev_total_assets=nan,
+                               current_assets=500.0, current_liabilities=250.0, total_assets=2_000.0)
+
+    memo_clear()
+    first = compute_ratios_cached(inputs(float("nan")))
+    # كائن NaN مختلف (NaN != NaN) ومع ذلك نفس المفتاح
+    assert all(a is b for a, b in zip(compute_ratios_cached(inputs(np.nan)), first))
+    assert compute_derived_cached(inputs(np.nan)) == compute_derived_cached(inputs(float("nan")))
+    info = memo_info()
+    assert (info["compute_ratios"]["hits"], info["compute_ratios"]["misses"]) == (1, 1)
+    assert (info["compute_derived"]["hits"], info["compute_derived"]["misses"]) == (1, 1)
+    assert [r.as_dict() for r in first] == [r.as_dict() for r in compute_ratios(inputs(np.nan))]
+
+    compute_ratios_cached(inputs(np.nan), "Current Ratio")  # اختيار مختلف ← مفتاح مختلف
+    assert memo_info()["compute_ratios"]["misses"] == 2
+    compute_ratios_cached(inputs(0.0))
+    assert memo_info()["compute_ratios"]["misses"] == 3
+
+    memo_clear()
+    assert all(v["currsize"] == 0 and v["hits"] == 0 for v in memo_info().values())
+    assert compute_ratios_cached(inputs(np.nan))[0] is not first[0]
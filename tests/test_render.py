@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import re
+
+import pytest
+
+from benchmarks import synthetic_statements
+from cube import RatioCube
+from panel import Panel
+from render import card_detail_html, card_summary_html, card_title, cards_grid_html, improvements, simplified_views
+
+
+def _squash(html: str) -> str:
+    """بدون المسافات حول الوسوم (الكتل القديمة كانت نصوصًا متعددة الأسطر)."""
+    return re.sub(r">\s+", ">", re.sub(r"\s+<", "<", html)).strip()
+
+
+def _old_blocks(r):
+    """ما كان app.py يرسله لكل بطاقة قبل render.py: العنوان ثم عمود EN ثم AR ثم التحسين."""
+    title = f"{r.name} | {r.name_en} — {r.display}"
+    en = [f"<div class='explanation-box english'><b>📌 Explanation:</b> {r.explain_en}</div>",
+          f"<div class='equation-en'>📐 {r.equation_en}</div>",
+          f"<div class='analysis-box english'><b>🧾 Analysis:</b> {r.analysis_en}</div>"]
+    ar = [f"<div class='explanation-box arabic'><b>📌 الشرح:</b> {r.explain}</div>",
+          f"<div class='equation-ar'>📐 {r.equation}</div>",
+          f"<div class='analysis-box arabic'><b>🧾 التحليل:</b> {r.analysis}</div>"]
+    if r.name_en in simplified_views:
+        en.append(f"<div class='simplified-box english'>{simplified_views[r.name_en]['en']}</div>")
+        ar.append(f"<div class='simplified-box arabic'>{simplified_views[r.name_en]['ar']}</div>")
+    box = []
+    if r.name_en in improvements:
+        box.append(f"""
+            <div class="improvement-box">
+                <p class="improvement-ar">📌 <b>لتحسين النسبة  :</b> {improvements[r.name_en]['ar']}</p>
+                <p class="improvement-en">📌 <b>Improvement :</b> {improvements[r.name_en]['en']}</p>
+            </div>
+            """)
+    glow = f"""
+        <div class="glow-text">
+            {title}
+        </div>
+        """
+    return title, glow, en, ar, box
+
+
+def _periods():
+    df = synthetic_statements(6, seed=9, years=3, missing=0.3)  # قيم مفقودة ← "—" وعدم كفاية البيانات
+    cube = RatioCube(Panel(df))
+    return [cube.results(*key) for key in cube.panel.keys()]
+
+
+@pytest.mark.parametrize("results", _periods())
+def test_detail_html_matches_the_old_card(results):
+    for r in results:
+        title, glow, en, ar, box = _old_blocks(r)
+        assert card_title(r) == title
+        # st.columns(2) كان يضع EN في العمود الأول وAR في الثاني
+        expected = (glow + "<div class='card-cols'><div class='card-col'>" + "".join(en)
+                    + "</div><div class='card-col'>" + "".join(ar) + "</div></div>" + "".join(box))
+        assert _squash(card_detail_html(r)).replace('"', "'") == _squash(expected).replace('"', "'")
+
+
+def test_summary_cards_show_value_and_analysis():
+    results = _periods()[0]
+    grid = cards_grid_html(results)
+    assert grid.startswith("<div class='ratio-grid'>") and grid.count("class='ratio-card'") == len(results)
+    for r in results:
+        card = card_summary_html(r)
+        assert card in grid
+        assert f"<div class='ratio-card-value'>{r.display}</div>" in card
+        assert r.analysis in card and r.analysis_en in card
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+import reports
+from benchmarks import synthetic_statements
+from cube import RatioCube
+from panel import Panel
+from ratios import REGISTRY, RatioRegistry
+from reports import build_reports, cache_path, cached_report, report_key
+
+
+def _cube(registry: RatioRegistry = REGISTRY, revenue=None) -> RatioCube:
+    df = synthetic_statements(6, seed=5, years=3)
+    if revenue is not None:  # المبيعات ليست من حقول السنة السابقة فلا يتغير إلا تقرير الصف الأول
+        df.loc[0, "Revenue"] = revenue
+    return RatioCube(Panel(df), registry)
+
+
+def _edited_registry() -> RatioRegistry:
+    registry = RatioRegistry()
+    registry.nodes = dict(REGISTRY.nodes)
+    for i, spec in enumerate(REGISTRY.ratios.values()):
+        registry.register(replace(spec, explain=spec.explain + " (معدّل)") if i == 0 else spec)
+    return registry
+
+
+def test_key_depends_on_inputs_period_and_template():
+    cube = _cube()
+    company, year = cube.panel.keys()[0]
+    fi = cube.panel.inputs_for(company, year)
+    key = report_key(company, year, fi)
+    assert report_key(company, year, replace(fi)) == key
+    assert report_key(company, year, replace(fi, net_income=np.nan)) == report_key(
+        company, year, replace(fi, net_income=None))  # NaN و None نفس القيمة المفقودة
+    assert report_key(company, year, replace(fi, sales=fi.sales + 1)) != key
+    assert report_key(company, year + 1, fi) != key
+    assert report_key(f"{company}x", year, fi) != key
+    assert report_key(company, year, fi, _edited_registry()) != key
+
+
+def test_cached_report_reuses_stored_page(tmp_path, monkeypatch):
+    cube = _cube()
+    company, year = cube.panel.keys()[0]
+    page = cached_report(cube, company, year, root=str(tmp_path))
+    path = cache_path(report_key(company, year, cube.panel.inputs_for(company, year)), str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == page
+
+    def fail(*args):
+        raise AssertionError("أعيد بناء تقرير موجود في المخزن")
+
+    monkeypatch.setattr(reports, "render_report", fail)
+    assert cached_report(cube, company, year, root=str(tmp_path)) == page
+    with pytest.raises(AssertionError):  # مدخلات مختلفة ← مفتاح جديد ← بناء جديد
+        cached_report(_cube(revenue=1.0), company, year, root=str(tmp_path))
+
+
+def test_changed_inputs_or_template_rebuild_only_affected_reports(tmp_path):
+    root = str(tmp_path)
+    first = build_reports(_cube(), root=root)
+    assert (first.built, first.cached) == (6, 0)
+    again = build_reports(_cube(), root=root)
+    assert (again.built, again.cached) == (0, 6)
+    edited = build_reports(_cube(revenue=1.0), root=root)
+    assert (edited.built, edited.cached) == (1, 5)
+    template = build_reports(_cube(_edited_registry()), root=root)
+    assert (template.built, template.cached) == (6, 0)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from ratios import DEBT_RATIO_BANDS, REGISTRY, FinancialInputs, compute_ratios, compute_values
+from scenarios import FieldDist, WhatIf, monte_carlo, sensitivity_grid, tornado
+
+BASE = FinancialInputs(sales=1_000, cogs=600, opex=100, interest_expense=50, tax_expense=10, current_assets=500,
+                       inventory=120, cash=80, accounts_receivable=90, current_liabilities=250,
+                       total_assets=2_000, total_liabilities=800, equity=1_200, prev_total_assets=1_800)
+
+
+def _scaled(**multipliers):
+    return compute_values(replace(BASE, **{k: getattr(BASE, k) * m for k, m in multipliers.items()}))
+
+
+# ---------------- ماذا لو ----------------
+def test_whatif_recomputes_only_affected_ratios():
+    scenario = WhatIf(BASE)
+    before = dict(scenario.results)
+    keys = scenario.update(cash=40.0, sales=BASE.sales)  # sales بنفس قيمتها لا تُحسب تغييرًا
+    assert set(keys) == {"Cash Ratio"} == set(REGISTRY.affected_by(["cash"]))
+    for key, result in scenario.results.items():
+        assert (result is before[key]) == (key not in keys)
+    expected = {r.name_en: r for r in compute_ratios(replace(BASE, cash=40.0))}
+    assert scenario.results["Cash Ratio"].as_dict() == expected["Cash Ratio"].as_dict()
+    assert scenario.delta("Cash Ratio") == pytest.approx(-40 / 250)
+    assert scenario.update(cash=40.0) == ()
+
+    keys = scenario.update(sales=1_100.0)
+    assert set(keys) == set(REGISTRY.affected_by(["sales"])) and "Cash Ratio" not in keys
+    expected = _scaled(sales=1.1)  # النسب المتأثرة بالمبيعات لا تعتمد على cash
+    for key in keys:
+        assert scenario.results[key].value == pytest.approx(expected[key])
+    assert set(scenario.reset()) == {"Cash Ratio", *keys}
+    assert all(scenario.results[k] is before[k] for k in before)
+
+
+# ---------------- شبكة الحساسية ----------------
+def test_grid_axes_follow_ranges_order():
+    sales, cogs = np.linspace(0.8, 1.2, 5), np.linspace(0.9, 1.1, 3)
+    grid = sensitivity_grid(BASE, {"sales": sales, "cogs": cogs}, "Gross Margin")
+    values = grid.values["Gross Margin"]
+    assert grid.shape == values.shape == (5, 3)
+    for i, a in enumerate(sales):
+        for j, b in enumerate(cogs):
+            assert values[i, j] == pytest.approx(_scaled(sales=a, cogs=b)["Gross Margin"])
+    assert grid.base["Gross Margin"] == pytest.approx(compute_values(BASE)["Gross Margin"])
+
+
+def test_heatmap_rows_are_y_and_columns_are_x():
+    sales, cogs = np.linspace(0.8, 1.2, 5), np.linspace(0.9, 1.1, 3)
+    grid = sensitivity_grid(BASE, {"sales": sales, "cogs": cogs, "opex": [0.5, 1.0, 2.0]})
+    for x, y in (("sales", "cogs"), ("cogs", "sales")):
+        plane = grid.heatmap("Operating Margin", x=x, y=y, at={"opex": 2.0})
+        assert list(plane.index) == list(grid.axes[grid.fields.index(y)])
+        assert list(plane.columns) == list(grid.axes[grid.fields.index(x)])
+        a, b = plane.columns[-1], plane.index[0]
+        expected = _scaled(opex=2.0, **{x: a, y: b})["Operating Margin"]
+        assert plane.iloc[0, -1] == pytest.approx(expected)
+
+
+# ---------------- مخطط الإعصار ----------------
+def test_tornado_sorted_by_swing_with_undefined_last():
+    ranges = {"interest_expense": [0.0], "cash": [0.5, 2.0], "sales": [0.9, 1.1], "cogs": [0.95, 1.05]}
+    df = tornado(BASE, ranges, "Interest Coverage")
+    assert list(df["field"]) == ["sales", "cogs", "cash", "interest_expense"]
+    swings = df["swing"].to_numpy()
+    assert (np.diff(swings[:3]) <= 0).all() and np.isnan(swings[3])
+    assert swings[2] == 0
+    sales = [_scaled(sales=m)["Interest Coverage"] for m in ranges["sales"]]
+    assert (df.loc[0, "low"], df.loc[0, "high"]) == pytest.approx((min(sales), max(sales)))
+    assert list(df["base"]) == pytest.approx([compute_values(BASE)["Interest Coverage"]] * 4)
+
+
+# ---------------- مونت كارلو ----------------
+DISTS = {"sales": FieldDist("normal", 0.15), "cogs": FieldDist("lognormal", 0.1), "cash": FieldDist("uniform", 0.5)}
+
+
+def _run(**kwargs):
+    return monte_carlo(BASE, DISTS, n=5_000, corr={("sales", "cogs"): 0.6}, **kwargs)
+
+
+def test_same_seed_same_draws_whatever_the_chunk_size():
+    a = _run(seed=7)
+    b = _run(seed=7, chunk_size=333)
+    for key in a.values:
+        np.testing.assert_array_equal(a.values[key], b.values[key])
+    for key in a.band_counts:
+        np.testing.assert_array_equal(a.band_counts[key], b.band_counts[key])
+    assert not np.array_equal(a.values["Gross Margin"], _run(seed=8).values["Gross Margin"])
+
+
+def test_band_probabilities_match_the_draws():
+    result = _run(seed=1)
+    for key in ("Gross Margin", "Cash Ratio", "Current Ratio"):
+        probs = result.band_probabilities(key)
+        assert probs["probability"].sum() == pytest.approx(1)
+        bands = REGISTRY.ratios[key].bands
+        expected = np.bincount(bands.codes(result.values[key]) + 1, minlength=len(probs)) / result.n
+        np.testing.assert_allclose(probs["probability"], expected, atol=2 / result.n)
+    # نسبة لا تعتمد على أي حقل عشوائي: كل السحوبات في فئة الأساس
+    debt = result.band_probabilities("Debt Ratio")["probability"].to_numpy()
+    assert debt[DEBT_RATIO_BANDS.code(result.base["Debt Ratio"]) + 1] == 1
+    assert result.probability("Debt Ratio", below=1) == 1
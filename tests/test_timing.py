@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+import timing
+from timing import append_jsonl, begin, current, end, span, timed
+
+
+@pytest.fixture(autouse=True)
+def _no_leftover_run():
+    end()
+    yield
+    end()
+
+
+def test_nested_spans_record_depth_and_finish_order():
+    begin("run")
+    with span("outer", rows=3):
+        with span("inner"):
+            pass
+        with span("inner"):
+            pass
+    t = end()
+    assert [(s.name, s.depth) for s in t.spans] == [("inner", 1), ("inner", 1), ("outer", 0)]
+    outer = t.spans[-1]
+    assert outer.meta == {"rows": 3}
+    for inner in t.spans[:2]:
+        assert outer.start_ms <= inner.start_ms and inner.start_ms + inner.ms <= outer.start_ms + outer.ms
+    assert t.total_ms >= outer.ms
+    assert t.summary().set_index("stage")["calls"].to_dict() == {"outer": 1, "inner": 2}
+
+
+def test_span_records_and_restores_depth_on_error():
+    begin()
+    with pytest.raises(ZeroDivisionError):
+        with span("outer"):
+            with span("fails"):
+                1 / 0
+    with span("after"):
+        pass
+    assert [(s.name, s.depth) for s in end().spans] == [("fails", 1), ("outer", 0), ("after", 0)]
+
+
+def test_without_a_run_spans_and_timed_do_nothing():
+    @timed()
+    def work(x):
+        return x * 2
+
+    assert current() is None
+    with span("ignored"):
+        assert work(2) == 4
+    assert end() is None
+
+
+def test_runs_are_isolated_per_thread():
+    barrier = threading.Barrier(2)
+    runs = {}
+
+    def session(name):
+        begin(name)
+        barrier.wait()  # الخيطان داخل تشغيليهما في الوقت نفسه
+        with span(f"{name}-stage"):
+            barrier.wait()
+        runs[name] = end()
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [s.name for s in runs["a"].spans] == ["a-stage"]
+    assert [s.name for s in runs["b"].spans] == ["b-stage"]
+    assert current() is None  # الخيط الرئيسي لم يبدأ تشغيلًا
+
+
+def test_append_jsonl_writes_one_line_per_run(tmp_path, monkeypatch):
+    path = tmp_path / "timing.jsonl"
+    monkeypatch.setenv(timing.LOG_ENV, str(path))
+    for label in ("first", "second"):
+        begin(label)
+        timed("stage")(lambda: None)()
+        append_jsonl(end(), version="v1")
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(r["label"], r["version"], [s["name"] for s in r["spans"]]) for r in records] == [
+        ("first", "v1", ["stage"]), ("second", "v1", ["stage"])]
+    monkeypatch.delenv(timing.LOG_ENV)
+    assert append_jsonl(begin()) is None
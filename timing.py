@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# timing.py
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+# مسار سجل JSON-lines (سطر لكل تشغيل)؛ بدون هذا المتغير لا يُكتب شيء
+LOG_ENV = "RATIOS_TIMING_LOG"
+
+_local = threading.local()  # كل جلسة Streamlit تعمل في خيطها الخاص
+
+
+# ---------------- التسجيل ----------------
+@dataclass
+class Span:
+    name: str
+    start_ms: float   # من بداية التشغيل
+    ms: float
+    depth: int
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+class Timings:
+    """فترات تشغيل واحد (إعادة تشغيل السكربت مثلًا) بترتيب انتهائها."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.started = datetime.now(timezone.utc)
+        self.spans: List[Span] = []
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self.total_ms: Optional[float] = None
+
+    def finish(self) -> "Timings":
+        self.total_ms = (time.perf_counter() - self._t0) * 1000
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """مرحلة ← عدد المرات والزمن الكلي والأقصى (ms)، الأبطأ أولًا."""
+        df = pd.DataFrame([(s.name, s.ms) for s in self.spans], columns=["stage", "ms"])
+        out = df.groupby("stage", sort=False)["ms"].agg(calls="count", total_ms="sum", max_ms="max")
+        return out.sort_values("total_ms", ascending=False).reset_index()
+
+    def to_record(self, **extra) -> Dict[str, Any]:
+        return {
+            "ts": self.started.isoformat(timespec="milliseconds"),
+            "label": self.label,
+            "total_ms": self.total_ms,
+            **extra,
+            "spans": [asdict(s) for s in self.spans],
+        }
+
+
+def begin(label: str = "") -> Timings:
+    """بدء تسجيل في الخيط الحالي؛ كل span() بعدها تُضاف إليه."""
+    _local.timings = Timings(label)
+    return _local.timings
+
+
+def end() -> Optional[Timings]:
+    timings = getattr(_local, "timings", None)
+    _local.timings = None
+    return timings.finish() if timings is not None else None
+
+
+def current() -> Optional[Timings]:
+    return getattr(_local, "timings", None)
+
+
+class span:
+    """with span("compute_ratios"): ... — لا تكلف شيئًا تقريبًا إن لم يبدأ تسجيل."""
+    __slots__ = ("name", "meta", "_timings", "_start")
+
+    def __init__(self, name: str, **meta):
+        self.name = name
+        self.meta = meta
+
+    def __enter__(self):
+        self._timings = getattr(_local, "timings", None)
+        if self._timings is not None:
+            self._timings._depth += 1
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        t = self._timings
+        if t is not None:
+            end_ = time.perf_counter()
+            t._depth -= 1
+            t.spans.append(Span(self.name, (self._start - t._t0) * 1000, (end_ - self._start) * 1000,
+                                t._depth, self.meta))
+        return False
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """مزخرف: كل استدعاء للدالة فترة باسمها (أو name)."""
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# ---------------- السجل ----------------
+_log_lock = threading.Lock()
+
+
+def append_jsonl(timings: Timings, path: Optional[str] = None, **extra) -> Optional[str]:
+    """إضافة التشغيل كسطر JSON إلى path (الافتراضي متغير البيئة RATIOS_TIMING_LOG)."""
+    path = path or os.environ.get(LOG_ENV)
+    if not path:
+        return None
+    line = json.dumps(timings.to_record(**extra), ensure_ascii=False, default=str)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+    return path